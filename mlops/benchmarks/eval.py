@@ -0,0 +1,218 @@
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple, TypedDict
+
+from mlops.benchmarks.synthetic import random_dt_gt_insts, random_img_ress
+from mlops.eval import (
+    COCO_IOU_THRES_LIST, EvalAccumulator, HistEvalAccumulator, match_dt_gt_multi_thres
+)
+from mlops.shapes.convert.mask2rle import masks2rles
+from mlops.shapes.ious import (
+    bboxes2ious, bboxes2ious_sparse, masks2ious, masks2ious_sparse,
+    rles2ious, rles2ious_sparse
+)
+
+
+class EvalBenchResultType(TypedDict):
+    """
+    - `name`: `str`, the timed function
+    - `params`: `Dict[str, Any]`, sizes the function was timed at
+    - `num_repeats`: `int`
+    - `elapsed_mean`: `float`, seconds
+    - `elapsed_min`: `float`, seconds
+    """
+    name: str
+    params: Dict[str, Any]
+    num_repeats: int
+    elapsed_mean: float
+    elapsed_min: float
+
+
+def _time_func(
+    name: str,
+    params: Dict[str, Any],
+    func: Callable[[], Any],
+    num_repeats: int,
+) -> EvalBenchResultType:
+    elapseds = []
+
+    for _ in range(num_repeats):
+        start_time = time.perf_counter()
+        func()
+        elapseds.append(time.perf_counter() - start_time)
+
+    bench_res: EvalBenchResultType = {
+        "name": name,
+        "params": params,
+        "num_repeats": num_repeats,
+        "elapsed_mean": sum(elapseds) / num_repeats,
+        "elapsed_min": min(elapseds),
+    }
+
+    return bench_res
+
+def bench_ious(
+    sizes: Sequence[int],
+    img_hw: Tuple[int, int],
+    size_range: Tuple[int, int],
+    mask_flag: bool,
+    num_repeats: int,
+    seed: int,
+) -> List[EvalBenchResultType]:
+    """
+    Time dense and sparse bbox ious, and mask and rle ious if `mask_flag`,
+    with `size` dts against `size` gts in one img.
+    """
+    bench_ress: List[EvalBenchResultType] = []
+
+    for size in sizes:
+        dt_insts, gt_insts = random_dt_gt_insts(
+            size, size, 1, img_hw, size_range, mask_flag, seed
+        )
+        params = {"num_dts": size, "num_gts": size, "img_hw": list(img_hw)}
+        funcs = {
+            "bboxes2ious": lambda: bboxes2ious(dt_insts.bboxes, gt_insts.bboxes),
+            "bboxes2ious_sparse": lambda: bboxes2ious_sparse(dt_insts.bboxes, gt_insts.bboxes),
+        }
+
+        if mask_flag:
+            dt_rles = list(masks2rles(dt_insts.masks))
+            gt_rles = list(masks2rles(gt_insts.masks))
+            funcs.update({
+                "masks2ious": lambda: masks2ious(dt_insts.masks, gt_insts.masks),
+                "masks2ious_sparse": lambda: masks2ious_sparse(dt_insts.masks, gt_insts.masks),
+                "rles2ious": lambda: rles2ious(dt_rles, gt_rles),
+                "rles2ious_sparse": lambda: rles2ious_sparse(dt_rles, gt_rles),
+            })
+
+        for name, func in funcs.items():
+            bench_ress.append(_time_func(name, params, func, num_repeats))
+
+    return bench_ress
+
+def bench_matching(
+    sizes: Sequence[int],
+    img_hw: Tuple[int, int],
+    size_range: Tuple[int, int],
+    num_repeats: int,
+    seed: int,
+) -> List[EvalBenchResultType]:
+    """
+    Time matching at the coco iou thresholds on dense and sparse bbox ious
+    """
+    bench_ress: List[EvalBenchResultType] = []
+
+    for size in sizes:
+        dt_insts, gt_insts = random_dt_gt_insts(
+            size, size, 1, img_hw, size_range, False, seed
+        )
+        dense_ious = bboxes2ious(dt_insts.bboxes, gt_insts.bboxes)
+        sparse_ious = bboxes2ious_sparse(dt_insts.bboxes, gt_insts.bboxes)
+        params = {"num_dts": size, "num_gts": size, "num_thres": len(COCO_IOU_THRES_LIST)}
+
+        bench_ress.append(_time_func(
+            "match_dt_gt_multi_thres", params,
+            lambda: match_dt_gt_multi_thres(dense_ious, COCO_IOU_THRES_LIST, False),
+            num_repeats
+        ))
+        bench_ress.append(_time_func(
+            "match_dt_gt_multi_thres_sparse", params,
+            lambda: match_dt_gt_multi_thres(sparse_ious, COCO_IOU_THRES_LIST, False),
+            num_repeats
+        ))
+
+    return bench_ress
+
+def bench_accumulate(
+    num_imgs: int,
+    num_dts_per_img: int,
+    num_gts_per_img: int,
+    num_cats: int,
+    num_repeats: int,
+    seed: int,
+) -> List[EvalBenchResultType]:
+    """
+    Time feeding `num_imgs` match results into the exact and the binned
+    accumulators, and computing their metrics.
+    """
+    num_thres = len(COCO_IOU_THRES_LIST)
+    img_ress = random_img_ress(
+        num_imgs, num_dts_per_img, num_gts_per_img, num_cats, num_thres, seed
+    )
+    cat_id_name_dict = {i: str(i) for i in range(num_cats)}
+    params = {
+        "num_imgs": num_imgs,
+        "num_dts": num_imgs * num_dts_per_img,
+        "num_cats": num_cats,
+        "num_thres": num_thres,
+    }
+    bench_ress: List[EvalBenchResultType] = []
+
+    for name, make_accumulator in [
+        ("EvalAccumulator", lambda: EvalAccumulator(num_cats, COCO_IOU_THRES_LIST)),
+        ("HistEvalAccumulator", lambda: HistEvalAccumulator(num_cats, COCO_IOU_THRES_LIST)),
+    ]:
+        accumulator = make_accumulator()
+
+        def _update() -> None:
+            nonlocal accumulator
+            accumulator = make_accumulator()
+
+            for img_res in img_ress:
+                accumulator.update(img_res)
+
+        bench_ress.append(_time_func(f"{name}.update", params, _update, num_repeats))
+        bench_ress.append(_time_func(
+            f"{name}.get_metrics", params,
+            lambda: accumulator.get_metrics(cat_id_name_dict), num_repeats
+        ))
+
+    return bench_ress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 100, 300, 1000])
+    parser.add_argument("--img-hw", type = int, nargs = 2, default = [1024, 1024])
+    parser.add_argument("--size-range", type = int, nargs = 2, default = [10, 60])
+    parser.add_argument("--skip-masks", action = "store_true")
+    parser.add_argument("--num-imgs", type = int, default = 10000)
+    parser.add_argument("--num-dts-per-img", type = int, default = 50)
+    parser.add_argument("--num-gts-per-img", type = int, default = 30)
+    parser.add_argument("--num-cats", type = int, default = 80)
+    parser.add_argument("--num-repeats", type = int, default = 3)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--export-json-p", type = str, default = None)
+    args = parser.parse_args()
+
+    img_hw = tuple(args.img_hw)
+    size_range = tuple(args.size_range)
+
+    bench_ress = bench_ious(
+        args.sizes, img_hw, size_range, not args.skip_masks, args.num_repeats, args.seed
+    )
+    bench_ress += bench_matching(
+        args.sizes, img_hw, size_range, args.num_repeats, args.seed
+    )
+    bench_ress += bench_accumulate(
+        args.num_imgs, args.num_dts_per_img, args.num_gts_per_img, args.num_cats,
+        args.num_repeats, args.seed
+    )
+
+    print(f"{'name':<36}  {'params':<48}  mean(ms)  min(ms)")
+
+    for r in bench_ress:
+        params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(
+            f"{r['name']:<36}  {params:<48}  {r['elapsed_mean'] * 1000:>8.2f}  "
+            f"{r['elapsed_min'] * 1000:>7.2f}"
+        )
+
+    if args.export_json_p is not None:
+        with open(args.export_json_p, "w") as f:
+            json.dump(bench_ress, f, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
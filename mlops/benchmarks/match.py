@@ -0,0 +1,198 @@
+import argparse
+import json
+import time
+from typing import List, Sequence, Tuple, TypedDict
+
+import numpy as np
+from numpy.typing import NDArray
+
+from mlops.eval import MatchResultType, match_dt_gt_multi_thres
+
+
+COCO_IOU_THRES_LIST = np.linspace(0.5, 0.95, 10).round(2).tolist()
+
+
+class MatchBenchResultType(TypedDict):
+    """
+    - `num_dts`: `int`
+    - `num_gts`: `int`
+    - `num_thres`: `int`
+    - `argmax_time`: `float`, seconds, one `match_dt_gt_argmax` per threshold
+    - `sorted_time`: `float`, seconds, one `match_dt_gt_multi_thres` call
+    - `speedup`: `float`
+    """
+    num_dts: int
+    num_gts: int
+    num_thres: int
+    argmax_time: float
+    sorted_time: float
+    speedup: float
+
+
+def match_dt_gt_argmax(
+    ious: NDArray[np.number],
+    iou_thres: float,
+    gt_match_multi_dt_flag: bool
+) -> MatchResultType:
+    """
+    The previous `match_dt_gt`, repeated full-matrix `argmax` scans. 
+    Kept as the reference for speed and results.
+    """
+    ious_copy = np.copy(ious)
+
+    num_dts, num_gts = ious.shape
+
+    match_res: MatchResultType = {
+        "dt_match_flags": np.zeros(num_dts).astype(np.bool_),
+        "dt_match_gt_idx": np.ones(num_dts) * -1,
+        "gt_match_flags": np.zeros(num_gts).astype(np.bool_),
+        "gt_match_dt_idx": [[] for i in range(num_gts)]
+    }
+
+    num_dts_remain = num_dts
+
+    for i in range(num_gts):
+        if num_dts_remain == 0:
+            break
+
+        iou_max_idx = np.argmax(ious_copy)
+        dt_idx, gt_idx = np.unravel_index(iou_max_idx, ious_copy.shape)
+        dt_idx = dt_idx.item()
+        gt_idx = gt_idx.item()
+        max_iou = ious_copy[dt_idx, gt_idx]
+
+        if max_iou < iou_thres:
+            break
+
+        match_res["dt_match_flags"][dt_idx] = True
+        match_res["dt_match_gt_idx"][dt_idx] = gt_idx
+        match_res["gt_match_flags"][gt_idx] = True
+        match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
+
+        ious_copy[dt_idx, :] = float("-inf")
+        ious_copy[:, gt_idx] = float("-inf")
+
+        num_dts_remain -= 1
+    
+    if not gt_match_multi_dt_flag:
+        return match_res
+    
+    ious_remain = np.copy(ious)
+    ious_remain[match_res["dt_match_flags"], :] = float("-inf")
+
+    for i in range(num_dts_remain):
+        iou_max_idx = np.argmax(ious_remain)
+        dt_idx, gt_idx = np.unravel_index(iou_max_idx, ious_remain.shape)
+        dt_idx = dt_idx.item()
+        gt_idx = gt_idx.item()
+        max_iou = ious_remain[dt_idx, gt_idx]
+
+        if max_iou < iou_thres:
+            break
+
+        match_res["dt_match_flags"][dt_idx] = True
+        match_res["dt_match_gt_idx"][dt_idx] = gt_idx
+        match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
+
+        ious_remain[dt_idx, :] = float("-inf")
+        ious_remain[:, gt_idx] = float("-inf")
+    
+    return match_res
+
+def random_ious(
+    num_dts: int,
+    num_gts: int,
+    density: float,
+    seed: int,
+) -> NDArray[np.float64]:
+    """
+    Random iou matrix where a `density` fraction of pairs overlap, rounded 
+    to 2 decimals so that ties occur.
+    """
+    rng = np.random.default_rng(seed)
+    ious = rng.uniform(0, 1, (num_dts, num_gts)).round(2)
+    ious[rng.uniform(0, 1, (num_dts, num_gts)) > density] = 0
+    return ious
+
+def is_same_match_res(
+    match_res1: MatchResultType,
+    match_res2: MatchResultType,
+) -> bool:
+    return np.array_equal(match_res1["dt_match_flags"], match_res2["dt_match_flags"]) \
+        and np.array_equal(match_res1["dt_match_gt_idx"], match_res2["dt_match_gt_idx"]) \
+        and np.array_equal(match_res1["gt_match_flags"], match_res2["gt_match_flags"]) \
+        and match_res1["gt_match_dt_idx"] == match_res2["gt_match_dt_idx"]
+
+def bench_match(
+    sizes: Sequence[Tuple[int, int]],
+    iou_thres_list: Sequence[float],
+    gt_match_multi_dt_flag: bool,
+    density: float,
+    num_repeats: int,
+    seed: int,
+) -> List[MatchBenchResultType]:
+    bench_ress: List[MatchBenchResultType] = []
+
+    for num_dts, num_gts in sizes:
+        ious = random_ious(num_dts, num_gts, density, seed)
+
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            argmax_ress = [
+                match_dt_gt_argmax(ious, t, gt_match_multi_dt_flag) for t in iou_thres_list
+            ]
+        argmax_time = (time.perf_counter() - start_time) / num_repeats
+
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            sorted_ress = match_dt_gt_multi_thres(ious, iou_thres_list, gt_match_multi_dt_flag)
+        sorted_time = (time.perf_counter() - start_time) / num_repeats
+
+        for r1, r2 in zip(argmax_ress, sorted_ress):
+            if not is_same_match_res(r1, r2):
+                raise RuntimeError(f"results differ at size {(num_dts, num_gts)}")
+
+        bench_res: MatchBenchResultType = {
+            "num_dts": num_dts,
+            "num_gts": num_gts,
+            "num_thres": len(iou_thres_list),
+            "argmax_time": argmax_time,
+            "sorted_time": sorted_time,
+            "speedup": argmax_time / max(sorted_time, 1e-12),
+        }
+        bench_ress.append(bench_res)
+
+    print("num_dts  num_gts  argmax(ms)  sorted(ms)  speedup")
+
+    for r in bench_ress:
+        print(
+            f"{r['num_dts']:>7}  {r['num_gts']:>7}  {r['argmax_time'] * 1000:>10.2f}  "
+            f"{r['sorted_time'] * 1000:>10.2f}  {r['speedup']:>7.1f}"
+        )
+    
+    return bench_ress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10, 50, 100, 300, 1000])
+    parser.add_argument("--density", type = float, default = 0.05)
+    parser.add_argument("--multi-dt", action = "store_true")
+    parser.add_argument("--num-repeats", type = int, default = 3)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--export-json-p", type = str, default = None)
+    args = parser.parse_args()
+
+    sizes = [(n, n) for n in args.sizes]
+    bench_ress = bench_match(
+        sizes, COCO_IOU_THRES_LIST, args.multi_dt, args.density, 
+        args.num_repeats, args.seed
+    )
+
+    if args.export_json_p is not None:
+        with open(args.export_json_p, "w") as f:
+            json.dump(bench_ress, f, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+import mlops.shapes.typedef.bboxes as bbox_type
+import mlops.shapes.typedef.masks as mask_type
+import mlops.shapes.typedef.rles as rle_type
+from mlops.eval import ImgEvalResultType
+from mlops.shapes.convert.mask2rle import masks2rles
+from mlops.shapes.insts import Insts
+
+
+def random_bboxes(
+    num_bboxes: int,
+    img_hw: Tuple[int, int],
+    size_range: Tuple[int, int],
+    seed: int,
+) -> bbox_type.BBoxesXYXYArrType:
+    """
+    Random x1y1x2y2 bboxes inside the img, with width and height drawn
+    from `size_range`.
+    """
+    rng = np.random.default_rng(seed)
+    img_h, img_w = img_hw
+
+    whs = rng.integers(size_range[0], size_range[1] + 1, (num_bboxes, 2))
+    whs = np.minimum(whs, [img_w, img_h])
+    x1s = rng.integers(0, img_w - whs[:, 0] + 1)
+    y1s = rng.integers(0, img_h - whs[:, 1] + 1)
+
+    bboxes = np.stack([x1s, y1s, x1s + whs[:, 0], y1s + whs[:, 1]], axis = 1)
+
+    return bboxes.astype(np.int32)
+
+def jitter_bboxes(
+    bboxes: bbox_type.BBoxesXYXYArrType,
+    img_hw: Tuple[int, int],
+    jitter_ratio: float,
+    seed: int,
+) -> bbox_type.BBoxesXYXYArrType:
+    """
+    Move each corner by up to `jitter_ratio` of the bbox size, to make dts
+    that overlap their gts with a spread of ious.
+    """
+    rng = np.random.default_rng(seed)
+    img_h, img_w = img_hw
+
+    bboxes = np.asarray(bboxes, dtype = np.float64).reshape(-1, 4)
+    whs = np.tile(bboxes[:, 2:] - bboxes[:, :2], 2)
+    bboxes = bboxes + rng.uniform(-jitter_ratio, jitter_ratio, bboxes.shape) * whs
+
+    bboxes[:, [0, 2]] = np.clip(bboxes[:, [0, 2]], 0, img_w)
+    bboxes[:, [1, 3]] = np.clip(bboxes[:, [1, 3]], 0, img_h)
+    bboxes[:, 2:] = np.maximum(bboxes[:, 2:], bboxes[:, :2] + 1)
+
+    return bboxes.round().astype(np.int32)
+
+def random_masks(
+    bboxes: bbox_type.BBoxesXYXYArrType,
+    img_hw: Tuple[int, int],
+    seed: int,
+) -> mask_type.MasksType:
+    """
+    One filled ellipse per bbox with a random angle, clipped to the bbox
+    """
+    rng = np.random.default_rng(seed)
+    masks = np.zeros((len(bboxes), img_hw[0], img_hw[1]), dtype = np.uint8)
+
+    for mask, (x1, y1, x2, y2) in zip(masks, np.asarray(bboxes).tolist()):
+        center = ((x1 + x2) // 2, (y1 + y2) // 2)
+        axes = (max(1, (x2 - x1) // 2), max(1, (y2 - y1) // 2))
+        angle = rng.uniform(0, 30)
+        cv2.ellipse(mask, center, axes, angle, 0, 360, 1, -1)
+        mask[:y1] = 0
+        mask[y2:] = 0
+        mask[:, :x1] = 0
+        mask[:, x2:] = 0
+
+    return masks.astype(np.bool_)
+
+def random_rles(
+    bboxes: bbox_type.BBoxesXYXYArrType,
+    img_hw: Tuple[int, int],
+    seed: int,
+) -> rle_type.RLEsType:
+    if len(bboxes) == 0:
+        return []
+
+    return list(masks2rles(random_masks(bboxes, img_hw, seed)))
+
+def random_dt_gt_insts(
+    num_dts: int,
+    num_gts: int,
+    num_cats: int,
+    img_hw: Tuple[int, int],
+    size_range: Tuple[int, int],
+    mask_flag: bool,
+    seed: int,
+) -> Tuple[Insts, Insts]:
+    """
+    Random gts, and dts of which up to `num_gts` are jittered copies of the
+    gts, mostly with the same class, and the rest are placed at random.
+
+    Returns
+    -----
+    - `dt_insts`: `Insts`
+    - `gt_insts`: `Insts`
+    """
+    rng = np.random.default_rng(seed)
+
+    gt_bboxes = random_bboxes(num_gts, img_hw, size_range, seed)
+    gt_cat_ids = rng.integers(0, num_cats, num_gts)
+
+    num_hits = min(num_dts, num_gts)
+    hit_gt_ids = rng.permutation(num_gts)[:num_hits]
+    hit_bboxes = jitter_bboxes(gt_bboxes[hit_gt_ids], img_hw, 0.2, seed + 1)
+    miss_bboxes = random_bboxes(num_dts - num_hits, img_hw, size_range, seed + 2)
+    dt_bboxes = np.concatenate([hit_bboxes, miss_bboxes]).reshape(-1, 4)
+
+    dt_cat_ids = np.concatenate([
+        gt_cat_ids[hit_gt_ids], rng.integers(0, num_cats, num_dts - num_hits)
+    ])
+    flip_flags = rng.uniform(0, 1, num_dts) < 0.1
+    dt_cat_ids[flip_flags] = rng.integers(0, num_cats, flip_flags.sum())
+    dt_confs = rng.uniform(0, 1, num_dts)
+
+    if mask_flag:
+        gt_masks = random_masks(gt_bboxes, img_hw, seed + 3)
+        dt_masks = random_masks(dt_bboxes, img_hw, seed + 4)
+    else:
+        gt_masks = None
+        dt_masks = None
+
+    dt_insts = Insts(dt_confs, dt_cat_ids, dt_bboxes, dt_masks)
+    gt_insts = Insts(np.ones(num_gts), gt_cat_ids, gt_bboxes, gt_masks)
+
+    return dt_insts, gt_insts
+
+def random_img_ress(
+    num_imgs: int,
+    num_dts_per_img: int,
+    num_gts_per_img: int,
+    num_cats: int,
+    num_thres: int,
+    seed: int,
+) -> List[ImgEvalResultType]:
+    """
+    Random per-img match results for accumulator benchmarks. A dt matched
+    at a threshold is also matched at all lower ones, as in real matching.
+    """
+    rng = np.random.default_rng(seed)
+    img_ress: List[ImgEvalResultType] = []
+
+    for _ in range(num_imgs):
+        dt_ious = rng.uniform(0, 1, num_dts_per_img)
+        thres_list = np.linspace(0.5, 0.95, num_thres)[:, None]
+        gt_match_ious = rng.uniform(0, 1, num_gts_per_img)
+
+        dt_match_flags = dt_ious[None, :] >= thres_list
+        gt_match_flags = gt_match_ious[None, :] >= thres_list
+
+        img_res: ImgEvalResultType = {
+            "dt_confs": rng.uniform(0, 1, num_dts_per_img).astype(np.float32),
+            "dt_cat_ids": rng.integers(0, num_cats, num_dts_per_img).astype(np.int32),
+            "dt_areas": rng.uniform(100, 10000, num_dts_per_img).astype(np.float32),
+            "dt_match_flags": dt_match_flags,
+            "dt_match_ious": np.where(dt_match_flags[0], dt_ious, 0).astype(np.float32),
+            "gt_cat_ids": rng.integers(0, num_cats, num_gts_per_img).astype(np.int32),
+            "gt_areas": rng.uniform(100, 10000, num_gts_per_img).astype(np.float32),
+            "gt_match_flags": gt_match_flags,
+            "gt_match_ious": np.where(gt_match_flags[0], gt_match_ious, 0).astype(np.float32),
+        }
+        img_ress.append(img_res)
+
+    return img_ress
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import List, TypedDict
+
+import cv2
+
+from mlops.data import video2imgs
+
+
+class Video2ImgsBenchResultType(TypedDict):
+    """
+    - `save_frame_period`: `int`
+    - `seek_min_gap`: `int`
+    - `num_writers`: `int`
+    - `num_saved`: `int`
+    - `elapsed`: `float`, seconds
+    - `video_fps`: `float`, video frames traversed per second
+    - `saved_fps`: `float`, saved frames per second
+    """
+    save_frame_period: int
+    seek_min_gap: int
+    num_writers: int
+    num_saved: int
+    elapsed: float
+    video_fps: float
+    saved_fps: float
+
+
+def bench_video2imgs(
+    video_p: str,
+    save_frame_periods: List[int],
+    seek_min_gaps: List[int],
+    num_writers: int,
+) -> List[Video2ImgsBenchResultType]:
+    """
+    Time `video2imgs` for every `(save_frame_period, seek_min_gap)` pair. 
+    `seek_min_gap = 0` seeks after every saved frame, a large value always 
+    skips with `grab()`.
+    """
+    cap = cv2.VideoCapture(video_p)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    bench_ress: List[Video2ImgsBenchResultType] = []
+
+    for period in save_frame_periods:
+        for seek_min_gap in seek_min_gaps:
+            img_dir = tempfile.mkdtemp(prefix = "bench_video2imgs_")
+
+            start_time = time.perf_counter()
+            video2imgs(video_p, img_dir, period, seek_min_gap, num_writers)
+            elapsed = time.perf_counter() - start_time
+
+            num_saved = len(os.listdir(img_dir))
+            shutil.rmtree(img_dir)
+
+            bench_res: Video2ImgsBenchResultType = {
+                "save_frame_period": period,
+                "seek_min_gap": seek_min_gap,
+                "num_writers": num_writers,
+                "num_saved": num_saved,
+                "elapsed": elapsed,
+                "video_fps": total_frames / max(elapsed, 1e-8),
+                "saved_fps": num_saved / max(elapsed, 1e-8),
+            }
+            bench_ress.append(bench_res)
+    
+    print("period  seek_min_gap  saved  elapsed(s)  video_fps  saved_fps")
+
+    for r in bench_ress:
+        print(
+            f"{r['save_frame_period']:>6}  {r['seek_min_gap']:>12}  {r['num_saved']:>5}  "
+            f"{r['elapsed']:>10.2f}  {r['video_fps']:>9.1f}  {r['saved_fps']:>9.1f}"
+        )
+
+    return bench_ress
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video_p", type = str)
+    parser.add_argument("--periods", type = int, nargs = "+", default = [1, 2, 5, 10, 30, 100, 300])
+    parser.add_argument("--seek-min-gaps", type = int, nargs = "+", default = [0, 100, 1000000])
+    parser.add_argument("--num-writers", type = int, default = 4)
+    parser.add_argument("--export-json-p", type = str, default = None)
+    args = parser.parse_args()
+
+    bench_ress = bench_video2imgs(
+        args.video_p, args.periods, args.seek_min_gaps, args.num_writers
+    )
+
+    if args.export_json_p is not None:
+        with open(args.export_json_p, "w") as f:
+            json.dump(bench_ress, f, indent = 2)
+
+
+if __name__ == "__main__":
+    main()
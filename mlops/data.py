@@ -1,14 +1,75 @@
 import os
 import json
 import glob
+import math
+import hashlib
 import random
 import shutil
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Callable, Union, Tuple
+from typing import (
+    Callable, Union, Tuple, List, Optional, TypedDict, Literal, Dict, Any, 
+    Iterable, Iterator
+)
 
 import cv2
+import numpy as np
 
 from mlops.labels.typedef.labelme import LabelmeDictType
+from mlops.labels.utils.manifest import write_manifest
+
+
+class CopyTaskType(TypedDict):
+    """
+    - `src_img_p`: `str`
+    - `dst_img_p`: `str`
+    - `src_labelme_p`: `Optional[str]`, `None` if no labelme to copy
+    - `dst_labelme_p`: `Optional[str]`
+    - `rewrite_labelme_flag`: `bool`, reset `imageData` and set `imagePath` 
+    to the name of `dst_img_p`
+    """
+    src_img_p: str
+    dst_img_p: str
+    src_labelme_p: Optional[str]
+    dst_labelme_p: Optional[str]
+    rewrite_labelme_flag: bool
+
+class DedupRecordType(TypedDict):
+    """
+    - `src_img_p`: `str`
+    - `kept_img_name`: `str`, the ingested image with the same bytes
+    - `dst_img_name`: `Optional[str]`, the symlink, `None` if skipped
+    """
+    src_img_p: str
+    kept_img_name: str
+    dst_img_name: Optional[str]
+
+class HashIndexType(TypedDict):
+    """
+    - `next_data_id`: `int`
+    - `hashes`: `Dict[str, str]`, `{sha1: img_name}`
+    """
+    next_data_id: int
+    hashes: Dict[str, str]
+
+class CopyStatsType(TypedDict):
+    """
+    - `num_tasks`: `int`
+    - `num_files`: `int`
+    - `num_bytes`: `int`
+    - `elapsed`: `float`, seconds
+    - `files_per_sec`: `float`
+    - `mb_per_sec`: `float`
+    """
+    num_tasks: int
+    num_files: int
+    num_bytes: int
+    elapsed: float
+    files_per_sec: float
+    mb_per_sec: float
 
 
 def _default_name_mapf_img2ply(
@@ -18,14 +79,196 @@ def _default_name_mapf_img2ply(
     ply_name = f"{img_stem}.ply"
     return ply_name
 
-def raw2data(
+def _copy_labelme(
+    src_labelme_p: str,
+    dst_labelme_p: str,
+    dst_img_name: str
+) -> int:
+    with open(src_labelme_p, "r") as f:
+        labelme_dict: LabelmeDictType = json.load(f)
+
+    labelme_dict["imageData"] = None
+    labelme_dict["imagePath"] = dst_img_name
+
+    with open(dst_labelme_p, "w") as f:
+        json.dump(labelme_dict, f)
+    
+    shutil.copymode(src_labelme_p, dst_labelme_p)
+
+    return os.path.getsize(dst_labelme_p)
+
+def _run_copy_labelme_task(
+    task: Tuple[str, str, str]
+) -> int:
+    src_labelme_p, dst_labelme_p, dst_img_name = task
+    return _copy_labelme(src_labelme_p, dst_labelme_p, dst_img_name)
+
+def _run_copy_task(
+    task: CopyTaskType
+) -> Tuple[int, int]:
+    shutil.copy(task["src_img_p"], task["dst_img_p"])
+    num_files = 1
+    num_bytes = os.path.getsize(task["dst_img_p"])
+
+    if task["src_labelme_p"] is None:
+        return num_files, num_bytes
+    
+    if task["rewrite_labelme_flag"]:
+        dst_img_name = Path(task["dst_img_p"]).name
+        num_bytes += _copy_labelme(
+            task["src_labelme_p"], task["dst_labelme_p"], dst_img_name
+        )
+    else:
+        shutil.copy(task["src_labelme_p"], task["dst_labelme_p"])
+        num_bytes += os.path.getsize(task["dst_labelme_p"])
+    
+    num_files += 1
+
+    return num_files, num_bytes
+
+def _copy_hash(
+    src_p: str,
+    dst_p: str,
+    chunk_size: int = 1024 * 1024,
+) -> Tuple[int, str]:
+    """
+    Copy `src_p` to `dst_p` and hash the bytes on the way in a single read.
+
+    Returns
+    -------
+    - `num_bytes`: `int`
+    - `digest`: `str`, sha1 hex digest
+    """
+    hasher = hashlib.sha1()
+    num_bytes = 0
+
+    with open(src_p, "rb") as src_f, open(dst_p, "wb") as dst_f:
+        while True:
+            chunk = src_f.read(chunk_size)
+
+            if not chunk:
+                break
+
+            hasher.update(chunk)
+            dst_f.write(chunk)
+            num_bytes += len(chunk)
+    
+    shutil.copymode(src_p, dst_p)
+
+    return num_bytes, hasher.hexdigest()
+
+def _hash_file(
+    src_p: str,
+    chunk_size: int = 1024 * 1024,
+) -> str:
+    hasher = hashlib.sha1()
+
+    with open(src_p, "rb") as src_f:
+        while True:
+            chunk = src_f.read(chunk_size)
+
+            if not chunk:
+                break
+
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+def _run_copy_hash_task(
+    task: CopyTaskType
+) -> Tuple[int, str]:
+    return _copy_hash(task["src_img_p"], task["dst_img_p"])
+
+def bounded_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    num_workers: int,
+) -> Iterator[Any]:
+    """
+    `map` on a thread pool, results are yielded in the order of `items`. 
+    The number of in-flight futures is bounded so that huge item lists 
+    do not pile up in memory.
+    """
+    if num_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    
+    max_pending = num_workers * 4
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers = num_workers) as executor:
+        for item in items:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+            pending.append(executor.submit(func, item))
+        
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+def _make_copy_stats(
+    num_tasks: int,
+    num_files: int,
+    num_bytes: int,
+    elapsed: float,
+) -> CopyStatsType:
+    stats: CopyStatsType = {
+        "num_tasks": num_tasks,
+        "num_files": num_files,
+        "num_bytes": num_bytes,
+        "elapsed": elapsed,
+        "files_per_sec": num_files / max(elapsed, 1e-8),
+        "mb_per_sec": num_bytes / 1024 / 1024 / max(elapsed, 1e-8),
+    }
+
+    print(
+        f"copied {num_files} files ({num_bytes / 1024 / 1024:.1f} MB) in {elapsed:.2f}s, "
+        f"{stats['files_per_sec']:.1f} files/s, {stats['mb_per_sec']:.1f} MB/s"
+    )
+
+    return stats
+
+def bulk_copy(
+    tasks: List[CopyTaskType],
+    num_workers: int,
+) -> CopyStatsType:
+    """
+    Copy images and labelmes of `tasks` with a bounded thread pool. 
+    Destination names are fixed by the caller, so the output does not 
+    depend on `num_workers`.
+
+    Args
+    -----
+    - `tasks`: `List[CopyTaskType]`
+    - `num_workers`: `int`, `<= 1` copies on the calling thread
+
+    Returns
+    -------
+    - `stats`: `CopyStatsType`
+    """
+    start_time = time.perf_counter()
+    num_files = 0
+    num_bytes = 0
+
+    for task_num_files, task_num_bytes in bounded_map(_run_copy_task, tasks, num_workers):
+        num_files += task_num_files
+        num_bytes += task_num_bytes
+
+    elapsed = time.perf_counter() - start_time
+    stats = _make_copy_stats(len(tasks), num_files, num_bytes, elapsed)
+
+    return stats
+
+def _scan_raw(
     src_raw_root: str,
     dst_data_root: str,
     labelme_flag: bool,
-) -> None:
-    data_id = 0
-
-    os.makedirs(dst_data_root, exist_ok = True)
+    start_data_id: int,
+) -> List[CopyTaskType]:
+    # Walk order decides `data_id`, keep it identical to the sequential version
+    tasks: List[CopyTaskType] = []
+    data_id = start_data_id
 
     for root, subdirs, files in os.walk(src_raw_root):
         for f in files:
@@ -40,48 +283,391 @@ def raw2data(
             dst_img_name = f"img{data_id}{src_img_suffix}"
             dst_img_p = os.path.join(dst_data_root, dst_img_name)
 
-            shutil.copy(src_img_p, dst_img_p)
-
-            if not labelme_flag:
-                data_id += 1
-                continue
+            task: CopyTaskType = {
+                "src_img_p": src_img_p,
+                "dst_img_p": dst_img_p,
+                "src_labelme_p": None,
+                "dst_labelme_p": None,
+                "rewrite_labelme_flag": True
+            }
 
             src_labelme_name = f"{src_img_stem}.json"
             src_labelme_p = os.path.join(root, src_labelme_name)
-            dst_labelme_name = f"img{data_id}.json"
-            dst_labelme_p = os.path.join(dst_data_root, dst_labelme_name)
 
-            if not os.path.exists(src_labelme_p):
-                data_id += 1
-                continue
+            if labelme_flag and os.path.exists(src_labelme_p):
+                dst_labelme_name = f"img{data_id}.json"
+                task["src_labelme_p"] = src_labelme_p
+                task["dst_labelme_p"] = os.path.join(dst_data_root, dst_labelme_name)
 
-            shutil.copy(src_labelme_p, dst_labelme_p)
+            tasks.append(task)
+            data_id += 1
+    
+    return tasks
 
-            with open(dst_labelme_p, "r") as f:
-                dst_labelme: LabelmeDictType = json.load(f)
+def _load_hash_index(
+    hash_index_p: str
+) -> HashIndexType:
+    if not os.path.exists(hash_index_p):
+        hash_index: HashIndexType = {"next_data_id": 0, "hashes": {}}
+        return hash_index
+    
+    with open(hash_index_p, "r") as f:
+        hash_index: HashIndexType = json.load(f)
+    
+    return hash_index
 
-            dst_labelme["imageData"] = None
-            dst_labelme["imagePath"] = dst_img_name
+def _raw2data_dedup(
+    tasks: List[CopyTaskType],
+    dst_data_root: str,
+    dedup_mode: Literal["skip", "symlink"],
+    num_workers: int,
+) -> CopyStatsType:
+    start_time = time.perf_counter()
 
-            with open(dst_labelme_p, "w") as f:
-                json.dump(dst_labelme, f)
-            
+    hash_index_p = os.path.join(dst_data_root, "hash_index.json")
+    dedup_report_p = os.path.join(dst_data_root, "dedup_report.json")
+    hash_index = _load_hash_index(hash_index_p)
+
+    # Copy and hash concurrently into temporary names, `img{data_id}` 
+    # is only known once duplicates are resolved in scan order
+    tmp_tasks: List[CopyTaskType] = []
+
+    for i, task in enumerate(tasks):
+        src_img_suffix = Path(task["src_img_p"]).suffix
+        tmp_img_name = f"img_tmp{i}{src_img_suffix}.part"
+
+        tmp_task: CopyTaskType = {
+            "src_img_p": task["src_img_p"],
+            "dst_img_p": os.path.join(dst_data_root, tmp_img_name),
+            "src_labelme_p": None,
+            "dst_labelme_p": None,
+            "rewrite_labelme_flag": False,
+        }
+        tmp_tasks.append(tmp_task)
+    
+    copy_hash_ress = list(bounded_map(_run_copy_hash_task, tmp_tasks, num_workers))
+
+    num_files = len(tasks)
+    num_bytes = sum([r[0] for r in copy_hash_ress])
+    data_id = hash_index["next_data_id"]
+    labelme_tasks: List[Tuple[str, str, str]] = []
+    dedup_report: List[DedupRecordType] = []
+
+    for task, tmp_task, (_, digest) in zip(tasks, tmp_tasks, copy_hash_ress):
+        src_img_suffix = Path(task["src_img_p"]).suffix
+        kept_img_name = hash_index["hashes"].get(digest)
+
+        if kept_img_name is not None and dedup_mode == "skip":
+            os.remove(tmp_task["dst_img_p"])
+            dedup_report.append({
+                "src_img_p": task["src_img_p"],
+                "kept_img_name": kept_img_name,
+                "dst_img_name": None
+            })
+            continue
+
+        dst_img_name = f"img{data_id}{src_img_suffix}"
+        dst_img_p = os.path.join(dst_data_root, dst_img_name)
+
+        if os.path.lexists(dst_img_p):
+            os.remove(dst_img_p)
+
+        if kept_img_name is None:
+            os.replace(tmp_task["dst_img_p"], dst_img_p)
+            hash_index["hashes"][digest] = dst_img_name
+        else:
+            os.remove(tmp_task["dst_img_p"])
+            os.symlink(kept_img_name, dst_img_p)
+            dedup_report.append({
+                "src_img_p": task["src_img_p"],
+                "kept_img_name": kept_img_name,
+                "dst_img_name": dst_img_name
+            })
+
+        if task["src_labelme_p"] is not None:
+            dst_labelme_p = os.path.join(dst_data_root, f"img{data_id}.json")
+            labelme_tasks.append((task["src_labelme_p"], dst_labelme_p, dst_img_name))
+
+        data_id += 1
+
+    for labelme_num_bytes in bounded_map(_run_copy_labelme_task, labelme_tasks, num_workers):
+        num_files += 1
+        num_bytes += labelme_num_bytes
+
+    hash_index["next_data_id"] = data_id
+
+    with open(hash_index_p, "w") as f:
+        json.dump(hash_index, f)
+
+    with open(dedup_report_p, "w") as f:
+        json.dump(dedup_report, f, indent = 2)
+
+    print(f"{len(dedup_report)} duplicates, report saved at {dedup_report_p}")
+
+    elapsed = time.perf_counter() - start_time
+    stats = _make_copy_stats(len(tasks), num_files, num_bytes, elapsed)
+
+    return stats
+
+def _open_manifest_db(
+    manifest_db_p: str
+) -> sqlite3.Connection:
+    conn = sqlite3.connect(manifest_db_p)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        "src_img_p TEXT PRIMARY KEY, "
+        "img_size INTEGER, "
+        "img_mtime_ns INTEGER, "
+        "img_sha1 TEXT, "
+        "labelme_size INTEGER, "
+        "labelme_mtime_ns INTEGER, "
+        "dst_img_name TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('next_data_id', 0)"
+    )
+    return conn
+
+def _raw2data_incremental(
+    tasks: List[CopyTaskType],
+    dst_data_root: str,
+    manifest_db_p: str,
+    num_workers: int,
+) -> CopyStatsType:
+    start_time = time.perf_counter()
+
+    conn = _open_manifest_db(manifest_db_p)
+    data_id = conn.execute(
+        "SELECT value FROM meta WHERE key = 'next_data_id'"
+    ).fetchone()[0]
+
+    # src_img_p -> (img_size, img_mtime_ns, img_sha1, labelme_size, 
+    # labelme_mtime_ns, dst_img_name)
+    rows = {
+        r[0]: r[1:] for r in conn.execute(
+            "SELECT src_img_p, img_size, img_mtime_ns, img_sha1, labelme_size, "
+            "labelme_mtime_ns, dst_img_name FROM files"
+        )
+    }
+    src_stats = []
+
+    for task in tasks:
+        src_img_p = os.path.abspath(task["src_img_p"])
+        img_stat = os.stat(src_img_p)
+
+        if task["src_labelme_p"] is not None:
+            labelme_stat = os.stat(task["src_labelme_p"])
+            labelme_stamp = (labelme_stat.st_size, labelme_stat.st_mtime_ns)
+        else:
+            labelme_stamp = (None, None)
+
+        src_stats.append((task, src_img_p, img_stat, labelme_stamp))
+
+    # Sources gone from the raw root, a new path with the same sha1 is 
+    # taken as moved and keeps the img name
+    scanned_src_img_ps = set([s[1] for s in src_stats])
+    moved_src_img_ps: Dict[str, str] = {}
+
+    for src_img_p, row in rows.items():
+        if src_img_p not in scanned_src_img_ps and row[2] is not None:
+            moved_src_img_ps.setdefault(row[2], src_img_p)
+
+    # Only hash sources whose stat changed at the same size, or new 
+    # sources that may have been moved, the rest is decided by stat
+    hash_src_img_ps = []
+
+    for _, src_img_p, img_stat, _ in src_stats:
+        row = rows.get(src_img_p)
+
+        if row is None:
+            hash_flag = len(moved_src_img_ps) > 0
+        else:
+            hash_flag = row[2] is not None and row[0] == img_stat.st_size \
+                and row[1] != img_stat.st_mtime_ns
+        
+        if hash_flag:
+            hash_src_img_ps.append(src_img_p)
+    
+    digests = dict(zip(
+        hash_src_img_ps, bounded_map(_hash_file, hash_src_img_ps, num_workers)
+    ))
+
+    img_tasks: List[CopyTaskType] = []
+    img_rows: List[Tuple[Any, ...]] = []
+    stamp_rows: List[Tuple[Any, ...]] = []
+    labelme_tasks: List[Tuple[str, str, str]] = []
+    labelme_rows: List[Tuple[Any, ...]] = []
+    num_unchanged = 0
+    num_moved = 0
+
+    for task, src_img_p, img_stat, labelme_stamp in src_stats:
+        labelme_size, labelme_mtime_ns = labelme_stamp
+        row = rows.get(src_img_p)
+        digest = digests.get(src_img_p)
+
+        if row is None and digest in moved_src_img_ps:
+            old_src_img_p = moved_src_img_ps.pop(digest)
+            row = rows[old_src_img_p]
+            conn.execute(
+                "UPDATE files SET src_img_p = ? WHERE src_img_p = ?",
+                (src_img_p, old_src_img_p)
+            )
+            num_moved += 1
+
+        if row is None:
+            src_img_suffix = Path(src_img_p).suffix
+            dst_img_name = f"img{data_id}{src_img_suffix}"
             data_id += 1
+            img_changed_flag = True
+            labelme_changed_flag = True
+        else:
+            dst_img_name = row[5]
+            stat_changed_flag = row[0] != img_stat.st_size \
+                or row[1] != img_stat.st_mtime_ns
 
-def split_data(
-    src_root: str,
-    dst_train_root: str,
-    dst_test_root: str,
-    train_test_ratios: Tuple[float, float],
-    shuffle_flag: bool,
+            if not stat_changed_flag:
+                img_changed_flag = False
+            elif digest is not None and digest == row[2]:
+                # Touched or re-synced with the same bytes, only restamp
+                img_changed_flag = False
+                stamp_rows.append((img_stat.st_size, img_stat.st_mtime_ns, src_img_p))
+            else:
+                img_changed_flag = True
+
+            labelme_changed_flag = row[3] != labelme_size \
+                or row[4] != labelme_mtime_ns
+        
+        if not img_changed_flag and not labelme_changed_flag:
+            num_unchanged += 1
+            continue
+
+        dst_img_p = os.path.join(dst_data_root, dst_img_name)
+        dst_labelme_p = os.path.join(dst_data_root, f"{Path(dst_img_name).stem}.json")
+
+        if img_changed_flag:
+            img_task: CopyTaskType = {
+                "src_img_p": src_img_p,
+                "dst_img_p": dst_img_p,
+                "src_labelme_p": None,
+                "dst_labelme_p": None,
+                "rewrite_labelme_flag": False,
+            }
+            img_tasks.append(img_task)
+            img_rows.append((
+                src_img_p, img_stat.st_size, img_stat.st_mtime_ns, dst_img_name
+            ))
+
+        if labelme_changed_flag:
+            if task["src_labelme_p"] is not None:
+                labelme_tasks.append((task["src_labelme_p"], dst_labelme_p, dst_img_name))
+            elif os.path.exists(dst_labelme_p):
+                os.remove(dst_labelme_p)
+
+            labelme_rows.append((labelme_size, labelme_mtime_ns, src_img_p))
+
+    num_files = 0
+    num_bytes = 0
+
+    copy_hash_ress = bounded_map(_run_copy_hash_task, img_tasks, num_workers)
+
+    for img_row, (img_num_bytes, digest) in zip(img_rows, copy_hash_ress):
+        num_files += 1
+        num_bytes += img_num_bytes
+        src_img_p, img_size, img_mtime_ns, dst_img_name = img_row
+        conn.execute(
+            "INSERT INTO files (src_img_p, img_size, img_mtime_ns, img_sha1, dst_img_name) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(src_img_p) DO UPDATE SET "
+            "img_size = excluded.img_size, img_mtime_ns = excluded.img_mtime_ns, "
+            "img_sha1 = excluded.img_sha1",
+            (src_img_p, img_size, img_mtime_ns, digest, dst_img_name)
+        )
+    
+    for labelme_num_bytes in bounded_map(_run_copy_labelme_task, labelme_tasks, num_workers):
+        num_files += 1
+        num_bytes += labelme_num_bytes
+
+    conn.executemany(
+        "UPDATE files SET img_size = ?, img_mtime_ns = ? WHERE src_img_p = ?",
+        stamp_rows
+    )
+    conn.executemany(
+        "UPDATE files SET labelme_size = ?, labelme_mtime_ns = ? WHERE src_img_p = ?",
+        labelme_rows
+    )
+    conn.execute(
+        "UPDATE meta SET value = ? WHERE key = 'next_data_id'", (data_id, )
+    )
+    conn.commit()
+    conn.close()
+
+    print(
+        f"{num_unchanged} unchanged, {num_moved} moved, {len(img_tasks)} images and "
+        f"{len(labelme_tasks)} labelmes new or changed"
+    )
+
+    elapsed = time.perf_counter() - start_time
+    stats = _make_copy_stats(len(tasks), num_files, num_bytes, elapsed)
+
+    return stats
+
+def raw2data(
+    src_raw_root: str,
+    dst_data_root: str,
     labelme_flag: bool,
-) -> None:
-    assert sum(train_test_ratios) == 1
+    num_workers: int = 8,
+    dedup_mode: Literal["none", "skip", "symlink"] = "none",
+    manifest_db_p: Optional[str] = None,
+) -> CopyStatsType:
+    """
+    Args
+    -----
+    - `src_raw_root`: `str`
+    - `dst_data_root`: `str`
+    - `labelme_flag`: `bool`, copy labelme of each image if it exists
+    - `num_workers`: `int`, number of copy threads
+    - `dedup_mode`: `Literal["none", "skip", "symlink"]`, handling of images 
+    whose bytes equal an already ingested image. `"skip"` drops them with 
+    their labelmes, `"symlink"` gives them an `img{data_id}` linking to the 
+    kept image. Hashes persist in `hash_index.json` of `dst_data_root`, so 
+    later runs append after the last `data_id` and dedup against earlier 
+    runs. Duplicates are listed in `dedup_report.json`.
+    - `manifest_db_p`: `Optional[str]`, sqlite manifest of ingested sources 
+    keyed by path, size, mtime and sha1. If given, only new or changed 
+    images and labelmes are copied, known sources keep their `img{data_id}` 
+    and new ones get ids after the largest one. Images whose mtime changed 
+    but sha1 did not are not copied again, and an image moved to a new 
+    path keeps its `img{data_id}` when its sha1 matches a source gone from 
+    `src_raw_root`. Can not be combined with `dedup_mode`.
+
+    Returns
+    -------
+    - `stats`: `CopyStatsType`
+    """
+    assert dedup_mode in ["none", "skip", "symlink"]
+    assert dedup_mode == "none" or manifest_db_p is None
 
-    random.seed(13)
+    os.makedirs(dst_data_root, exist_ok = True)
 
-    os.makedirs(dst_train_root, exist_ok = True)
-    os.makedirs(dst_test_root, exist_ok = True)
+    tasks = _scan_raw(src_raw_root, dst_data_root, labelme_flag, 0)
+
+    if manifest_db_p is not None:
+        stats = _raw2data_incremental(tasks, dst_data_root, manifest_db_p, num_workers)
+    elif dedup_mode == "none":
+        stats = bulk_copy(tasks, num_workers)
+    else:
+        stats = _raw2data_dedup(tasks, dst_data_root, dedup_mode, num_workers)
+
+    return stats
+
+def _list_split_img_names(
+    src_root: str,
+    shuffle_flag: bool,
+    seed: int,
+) -> List[str]:
+    random.seed(seed)
 
     fns = os.listdir(src_root)
     img_names = [f for f in fns if f.endswith((".png", ".jpg", ".jpeg", ".bmp"))]
@@ -89,45 +675,106 @@ def split_data(
 
     if shuffle_flag:
         random.shuffle(img_names)
+    
+    return img_names
+
+def _split_img_names(
+    src_root: str,
+    train_test_ratios: Tuple[float, float],
+    shuffle_flag: bool,
+    seed: int,
+) -> Tuple[List[str], List[str]]:
+    assert sum(train_test_ratios) == 1
+
+    img_names = _list_split_img_names(src_root, shuffle_flag, seed)
 
     if len(img_names) < 3:
         split_idx = 0
     else:
         split_idx = int(len(img_names) * train_test_ratios[0])
 
-    for i in range(0, split_idx):
-        img_name = img_names[i]
-        img_p = os.path.join(src_root, img_name)
-        dst_img_p = os.path.join(dst_train_root, img_name)
-        shutil.copy(img_p, dst_img_p)
+    return img_names[:split_idx], img_names[split_idx:]
 
-        if not labelme_flag:
-            continue
+def _kfold_img_names(
+    src_root: str,
+    num_folds: int,
+    shuffle_flag: bool,
+    seed: int,
+) -> List[Tuple[List[str], List[str]]]:
+    img_names = _list_split_img_names(src_root, shuffle_flag, seed)
 
-        img_stem = Path(img_name).stem
-        labelme_name = f"{img_stem}.json"
-        src_labelme_p = os.path.join(src_root, labelme_name)
-        dst_labelme_p = os.path.join(dst_train_root, labelme_name)
+    folds = []
 
-        if os.path.exists(src_labelme_p):
-            shutil.copy(src_labelme_p, dst_labelme_p)
+    for k in range(num_folds):
+        test_start = len(img_names) * k // num_folds
+        test_end = len(img_names) * (k + 1) // num_folds
+        train_names = img_names[:test_start] + img_names[test_end:]
+        test_names = img_names[test_start:test_end]
+        folds.append((train_names, test_names))
     
-    for i in range(split_idx, len(img_names)):
-        img_name = img_names[i]
-        img_p = os.path.join(src_root, img_name)
-        dst_img_p = os.path.join(dst_test_root, img_name)
-        shutil.copy(img_p, dst_img_p)
+    return folds
 
-        if not labelme_flag:
-            continue
+def _make_split_tasks(
+    src_root: str,
+    dst_train_root: str,
+    dst_test_root: str,
+    train_test_ratios: Tuple[float, float],
+    shuffle_flag: bool,
+    labelme_flag: bool,
+    seed: int,
+) -> List[CopyTaskType]:
+    train_names, test_names = _split_img_names(
+        src_root, train_test_ratios, shuffle_flag, seed
+    )
+
+    os.makedirs(dst_train_root, exist_ok = True)
+    os.makedirs(dst_test_root, exist_ok = True)
+
+    tasks: List[CopyTaskType] = []
+
+    for i, img_name in enumerate(train_names + test_names):
+        if i < len(train_names):
+            dst_root = dst_train_root
+        else:
+            dst_root = dst_test_root
+
+        task: CopyTaskType = {
+            "src_img_p": os.path.join(src_root, img_name),
+            "dst_img_p": os.path.join(dst_root, img_name),
+            "src_labelme_p": None,
+            "dst_labelme_p": None,
+            "rewrite_labelme_flag": False
+        }
 
         img_stem = Path(img_name).stem
         labelme_name = f"{img_stem}.json"
         src_labelme_p = os.path.join(src_root, labelme_name)
-        dst_labelme_p = os.path.join(dst_test_root, labelme_name)
 
-        if os.path.exists(src_labelme_p):
-            shutil.copy(src_labelme_p, dst_labelme_p)
+        if labelme_flag and os.path.exists(src_labelme_p):
+            task["src_labelme_p"] = src_labelme_p
+            task["dst_labelme_p"] = os.path.join(dst_root, labelme_name)
+        
+        tasks.append(task)
+    
+    return tasks
+
+def split_data(
+    src_root: str,
+    dst_train_root: str,
+    dst_test_root: str,
+    train_test_ratios: Tuple[float, float],
+    shuffle_flag: bool,
+    labelme_flag: bool,
+    num_workers: int = 8,
+    seed: int = 13,
+) -> CopyStatsType:
+    tasks = _make_split_tasks(
+        src_root, dst_train_root, dst_test_root, train_test_ratios,
+        shuffle_flag, labelme_flag, seed
+    )
+    stats = bulk_copy(tasks, num_workers)
+
+    return stats
 
 def split_data_subdirs(
     src_root: str,
@@ -136,28 +783,207 @@ def split_data_subdirs(
     train_test_ratios: Tuple[float, float],
     shuffle_flag: bool,
     labelme_flag: bool,
-) -> None:
+    num_workers: int = 8,
+    seed: int = 13,
+) -> CopyStatsType:
     subdirs = os.listdir(src_root)
 
+    # Collect tasks of all subdirs first so that small subdirs 
+    # do not leave the pool idle
+    tasks: List[CopyTaskType] = []
+
     for subdir in subdirs:
         src_dir = os.path.join(src_root, subdir)
         dst_train_dir = os.path.join(dst_train_root, subdir)
         dst_test_dir = os.path.join(dst_test_root, subdir)
 
-        split_data(
+        tasks += _make_split_tasks(
             src_dir, dst_train_dir, dst_test_dir, train_test_ratios,
-            shuffle_flag, labelme_flag
+            shuffle_flag, labelme_flag, seed
         )
+    
+    stats = bulk_copy(tasks, num_workers)
+
+    return stats
+
+def split_data_manifest(
+    src_root: str,
+    manifest_root: str,
+    train_test_ratios: Tuple[float, float],
+    shuffle_flag: bool,
+    num_folds: int = 1,
+    seed: int = 13,
+) -> None:
+    """
+    Same split as `split_data`, but only writes manifests of absolute image 
+    paths instead of copying files. Labelmes are expected next to images.
+
+    Args
+    -----
+    - `src_root`: `str`
+    - `manifest_root`: `str`, `train.txt` and `test.txt` are written here, 
+    or `fold{k}/train.txt` and `fold{k}/test.txt` if `num_folds > 1`
+    - `train_test_ratios`: `Tuple[float, float]`, ignored if `num_folds > 1`
+    - `shuffle_flag`: `bool`
+    - `num_folds`: `int`
+    - `seed`: `int`
+    """
+    split_data_subdirs_manifest(
+        os.path.dirname(os.path.abspath(src_root)), manifest_root, 
+        train_test_ratios, shuffle_flag, num_folds, seed, 
+        [os.path.basename(os.path.abspath(src_root))]
+    )
+
+def split_data_subdirs_manifest(
+    src_root: str,
+    manifest_root: str,
+    train_test_ratios: Tuple[float, float],
+    shuffle_flag: bool,
+    num_folds: int = 1,
+    seed: int = 13,
+    subdirs: Optional[List[str]] = None,
+) -> None:
+    """
+    Manifest version of `split_data_subdirs`, every subdir is split on its own 
+    and the splits of all subdirs go into the same manifests.
+
+    Args
+    -----
+    - `subdirs`: `Optional[List[str]]`, `None` means all subdirs of `src_root`
+
+    See `split_data_manifest` for the other args.
+    """
+    assert num_folds >= 1
+
+    if subdirs is None:
+        subdirs = os.listdir(src_root)
+
+    folds_img_ps = [([], []) for _ in range(num_folds)]
+
+    for subdir in subdirs:
+        src_dir = os.path.join(src_root, subdir)
+
+        if num_folds == 1:
+            folds_img_names = [
+                _split_img_names(src_dir, train_test_ratios, shuffle_flag, seed)
+            ]
+        else:
+            folds_img_names = _kfold_img_names(src_dir, num_folds, shuffle_flag, seed)
+
+        for k, (train_names, test_names) in enumerate(folds_img_names):
+            folds_img_ps[k][0].extend([os.path.join(src_dir, n) for n in train_names])
+            folds_img_ps[k][1].extend([os.path.join(src_dir, n) for n in test_names])
+
+    for k, (train_img_ps, test_img_ps) in enumerate(folds_img_ps):
+        if num_folds == 1:
+            fold_root = manifest_root
+        else:
+            fold_root = os.path.join(manifest_root, f"fold{k}")
+
+        write_manifest(train_img_ps, os.path.join(fold_root, "train.txt"))
+        write_manifest(test_img_ps, os.path.join(fold_root, "test.txt"))
+
+        print(f"{fold_root}: {len(train_img_ps)} train, {len(test_img_ps)} test")
+
+def frame2thumb_gray(
+    frame: np.ndarray,
+    thumb_wh: Tuple[int, int] = (64, 64),
+) -> np.ndarray:
+    """
+    Downscaled grayscale copy of `frame`, `(thumb_h, thumb_w)`, `float32`, 
+    used for cheap frame differences.
+    """
+    thumb = cv2.resize(frame, thumb_wh, interpolation = cv2.INTER_AREA)
+
+    if thumb.ndim == 3:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+    return thumb.astype(np.float32)
+
+def get_thumb_diff(
+    thumb1: np.ndarray,
+    thumb2: np.ndarray,
+) -> float:
+    """
+    Mean absolute difference of two `frame2thumb_gray` thumbs, `0 ~ 255`.
+    """
+    diff = np.mean(np.abs(thumb1 - thumb2)).item()
+    return diff
+
+def _iter_period_frames(
+    cap: cv2.VideoCapture,
+    start_frame: int,
+    end_frame: Optional[int],
+    save_frame_period: int,
+    seek_min_gap: int,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decode frames `start_frame, start_frame + save_frame_period, ...` 
+    before `end_frame` (`None` means until the video ends).
+    """
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    current_frame = start_frame
+    num_skip = save_frame_period - 1
+
+    while end_frame is None or current_frame < end_frame:
+        ret, frame = cap.read()
+        
+        if not ret:
+            print("no more frames, video ends")
+            break
+
+        yield current_frame, frame
+
+        current_frame += save_frame_period
+
+        # 跳过中间帧，提高处理速度
+        if num_skip == 0:
+            continue
+        elif num_skip >= seek_min_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
+        else:
+            for _ in range(num_skip):
+                if not cap.grab():
+                    break
+
+def _write_frame(
+    item: Tuple[str, np.ndarray]
+) -> Tuple[str, bool]:
+    output_path, frame = item
+    success = cv2.imwrite(output_path, frame)
+    return output_path, success
 
 def video2imgs(
     video_p: str,
     img_dir: str,
-    save_frame_period: int
+    save_frame_period: int,
+    seek_min_gap: int = 100,
+    num_writers: int = 4,
+    sample_mode: Literal["period", "scene"] = "period",
+    scene_diff_thres: float = 8.0,
+    scene_min_interval: int = 1,
+    scene_max_interval: Optional[int] = None,
 ) -> None:
     """
     Args
     - `save_frame_period`: `int`, save 1 frame for every `save_frame_period` frames
+    - `seek_min_gap`: `int`, frames between two saved frames are skipped 
+    with `grab()` without decoding, a keyframe seek is only used when 
+    there are at least `seek_min_gap` of them
+    - `num_writers`: `int`, threads encoding and writing jpgs, so decoding 
+    does not wait on disk
+    - `sample_mode`: `Literal["period", "scene"]`, `"scene"` only saves 
+    a frame of every `save_frame_period` frames if it differs from the last 
+    saved frame by at least `scene_diff_thres`, see `get_thumb_diff`
+    - `scene_diff_thres`: `float`, `0 ~ 255`
+    - `scene_min_interval`: `int`, min number of frames between two saved frames
+    - `scene_max_interval`: `Optional[int]`, a frame is saved regardless of 
+    the difference once this many frames passed since the last saved one
     """
+    assert sample_mode in ["period", "scene"]
+
     os.makedirs(img_dir, exist_ok = True)
 
     # 打开视频文件
@@ -175,94 +1001,267 @@ def video2imgs(
     print(f"video_p: {video_p}")
     print(f"video info: {fps:.2f}fps, total {total_frames} frames, duration {duration:.2f}s")
     
-    frame_count = 0
-    start_frame = 0
-    saved_count = 0
-    end_frame = total_frames
-    current_frame = start_frame
-
     print("extracting frames...")
-    
-    while current_frame <= end_frame:
-        ret, frame = cap.read()
-        
-        if not ret:
-            print("no more frames, video ends")
-            break
-        
-        # 每隔frame_interval帧保存一张图片
-        if frame_count % save_frame_period == 0:
-            # 生成文件名（使用帧编号，便于排序）
-            frame_filename = f"frame_{current_frame:06d}.jpg"
-            output_path = os.path.join(img_dir, frame_filename)
-            
-            # 保存帧为图片
-            success = cv2.imwrite(output_path, frame)
-            
-            if success:
-                saved_count += 1
-                if saved_count % 10 == 0:  # 每保存10张图片打印一次进度
-                    print(f"saved {saved_count} frames, progress: {current_frame}/{total_frames}")
+
+    decode_state = {"current_frame": 0, "num_candidates": 0}
+
+    def _decode_frames() -> Iterator[Tuple[str, np.ndarray]]:
+        last_saved_frame = None
+        last_saved_thumb = None
+
+        for current_frame, frame in _iter_period_frames(
+            cap, 0, None, save_frame_period, seek_min_gap
+        ):
+            decode_state["current_frame"] = current_frame
+            decode_state["num_candidates"] += 1
+
+            if sample_mode == "period":
+                save_flag = True
             else:
-                print(f"save failed: {output_path}")
-        
-        frame_count += 1
-        current_frame += 1
-        
-        # 跳过中间帧，提高处理速度
-        if save_frame_period > 1:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
+                thumb = frame2thumb_gray(frame)
+
+                if last_saved_frame is None:
+                    save_flag = True
+                else:
+                    interval = current_frame - last_saved_frame
+                    diff = get_thumb_diff(thumb, last_saved_thumb)
+                    save_flag = interval >= scene_min_interval and diff >= scene_diff_thres
+
+                    if scene_max_interval is not None and interval >= scene_max_interval:
+                        save_flag = True
+                
+                if save_flag:
+                    last_saved_frame = current_frame
+                    last_saved_thumb = thumb
+            
+            if save_flag:
+                # 生成文件名（使用帧编号，便于排序）
+                frame_filename = f"frame_{current_frame:06d}.jpg"
+                output_path = os.path.join(img_dir, frame_filename)
+
+                yield output_path, frame
+    
+    saved_count = 0
+
+    for output_path, success in bounded_map(_write_frame, _decode_frames(), num_writers):
+        if success:
+            saved_count += 1
+            if saved_count % 10 == 0:  # 每保存10张图片打印一次进度
+                print(f"saved {saved_count} frames, progress: {decode_state['current_frame']}/{total_frames}")
+        else:
+            print(f"save failed: {output_path}")
     
     # 释放资源
     cap.release()
+
+    if sample_mode == "scene":
+        print(f"scene sampling kept {saved_count} of {decode_state['num_candidates']} candidate frames")
+
     print(f"complete, {saved_count} imgs saved at {img_dir}")
     print()
 
+def _video2imgs_segment(
+    task: Tuple[str, str, int, int, Optional[int], int]
+) -> Tuple[str, int]:
+    video_p, img_dir, save_frame_period, start_frame, end_frame, seek_min_gap = task
+
+    cap = cv2.VideoCapture(video_p)
+
+    if not cap.isOpened():
+        print(f"can not open video '{video_p}'")
+        return video_p, 0
+
+    def _decode_frames() -> Iterator[Tuple[str, np.ndarray]]:
+        for current_frame, frame in _iter_period_frames(
+            cap, start_frame, end_frame, save_frame_period, seek_min_gap
+        ):
+            frame_filename = f"frame_{current_frame:06d}.jpg"
+            output_path = os.path.join(img_dir, frame_filename)
+            yield output_path, frame
+
+    saved_count = 0
+
+    for output_path, success in bounded_map(_write_frame, _decode_frames(), 2):
+        if success:
+            saved_count += 1
+        else:
+            print(f"save failed: {output_path}")
+
+    cap.release()
+
+    return video_p, saved_count
+
+def video2imgs_batch(
+    video_ps: List[str],
+    img_dirs: List[str],
+    save_frame_period: int,
+    num_workers: int,
+    min_segment_frames: int = 3000,
+    seek_min_gap: int = 100,
+) -> None:
+    """
+    `video2imgs` of many videos in a process pool. Each video is cut into 
+    frame ranges decoded by different workers, every worker seeks to the 
+    start of its range. Filenames are the same as `video2imgs`.
+
+    Args
+    -----
+    - `video_ps`: `List[str]`
+    - `img_dirs`: `List[str]`, one per video
+    - `save_frame_period`: `int`
+    - `num_workers`: `int`, number of processes
+    - `min_segment_frames`: `int`, min length of a frame range, shorter 
+    ranges spend most of their time seeking
+    - `seek_min_gap`: `int`, see `video2imgs`
+    """
+    assert isinstance(video_ps, list)
+    assert isinstance(img_dirs, list)
+    assert len(video_ps) == len(img_dirs)
+
+    tasks: List[Tuple[str, str, int, int, Optional[int], int]] = []
+
+    for video_p, img_dir in zip(video_ps, img_dirs):
+        os.makedirs(img_dir, exist_ok = True)
+
+        cap = cv2.VideoCapture(video_p)
+
+        if not cap.isOpened():
+            print(f"can not open video '{video_p}'")
+            continue
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        # Enough ranges to keep all workers busy, each starting at 
+        # a multiple of `save_frame_period`
+        num_segments = max(1, min(num_workers, total_frames // max(min_segment_frames, 1)))
+        num_periods = math.ceil(total_frames / save_frame_period)
+        segment_periods = max(1, math.ceil(num_periods / num_segments))
+        segment_frames = segment_periods * save_frame_period
+
+        start_frame = 0
+
+        while True:
+            end_frame = start_frame + segment_frames
+
+            # The last range reads until the video ends, frame counts 
+            # reported by containers are not always exact
+            if end_frame >= total_frames:
+                tasks.append((video_p, img_dir, save_frame_period, start_frame, None, seek_min_gap))
+                break
+
+            tasks.append((video_p, img_dir, save_frame_period, start_frame, end_frame, seek_min_gap))
+            start_frame = end_frame
+
+    print(f"extracting {len(video_ps)} videos in {len(tasks)} segments...")
+
+    video_saved_counts = {video_p: 0 for video_p in video_ps}
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers = num_workers) as executor:
+        for video_p, saved_count in executor.map(_video2imgs_segment, tasks):
+            video_saved_counts[video_p] += saved_count
+    
+    elapsed = time.perf_counter() - start_time
+
+    for video_p, img_dir in zip(video_ps, img_dirs):
+        print(f"{video_p}: {video_saved_counts[video_p]} imgs saved at {img_dir}")
+
+    print(f"complete in {elapsed:.2f}s")
+    print()
+
+def _read_frame(
+    img_path: str
+) -> Tuple[str, Optional[np.ndarray]]:
+    frame = cv2.imread(img_path)
+    return img_path, frame
+
+def _fit_frame(
+    frame: np.ndarray,
+    width: int,
+    height: int,
+) -> np.ndarray:
+    # 等比缩放后居中填充黑边
+    frame_h, frame_w = frame.shape[:2]
+    scale = min(width / frame_w, height / frame_h)
+    resize_w = max(1, min(width, round(frame_w * scale)))
+    resize_h = max(1, min(height, round(frame_h * scale)))
+    frame = cv2.resize(frame, (resize_w, resize_h), interpolation = cv2.INTER_AREA)
+
+    canvas = np.zeros((height, width, 3), dtype = np.uint8)
+    x1 = (width - resize_w) // 2
+    y1 = (height - resize_h) // 2
+    canvas[y1:y1 + resize_h, x1:x1 + resize_w] = frame
+    return canvas
+
 def imgs2video(
-    image_folder, 
-    output_video, 
-    fps=30, 
-    codec='mp4v'
+    image_folder: Union[str, Iterable[np.ndarray]], 
+    output_video: str, 
+    fps: int = 30, 
+    codec: str = 'mp4v',
+    num_readers: int = 4,
+    mismatch_mode: Literal["resize", "skip"] = "resize",
 ) -> None:
     """
-    将指定文件夹中的连续帧图片合成为 MP4 视频。
+    将指定文件夹中的连续帧图片（或内存中的帧序列）合成为 MP4 视频。
 
     参数:
-        image_folder (str): 存放图片的文件夹路径。
+        image_folder (str | Iterable[np.ndarray]): 存放图片的文件夹路径，
+            或任意产生 BGR 帧的迭代器（例如预测可视化结果，无需先写成图片）。
         output_video (str): 输出视频的文件路径（建议以 .mp4 结尾）。
         fps (int): 视频帧率（默认 30）。
         codec (str): 视频编码格式（默认 'mp4v'，对应 MP4）。
+        num_readers (int): 读取图片的线程数，读取与编码并行（默认 4）。
+        mismatch_mode (str): 尺寸与第一帧不一致时的处理方式，
+            'resize' 等比缩放并填充黑边，'skip' 跳过该帧（默认 'resize'）。
     """
-    # 获取所有图片文件，支持常见格式
-    image_paths = sorted(glob.glob(os.path.join(image_folder, "*.png")) +
-                         glob.glob(os.path.join(image_folder, "*.jpg")) +
-                         glob.glob(os.path.join(image_folder, "*.jpeg")))
+    assert mismatch_mode in ["resize", "skip"]
 
-    if not image_paths:
-        raise ValueError("指定文件夹中没有找到支持的图片文件（.png, .jpg, .jpeg）")
+    if isinstance(image_folder, (str, os.PathLike)):
+        # 获取所有图片文件，支持常见格式
+        image_paths = sorted(glob.glob(os.path.join(image_folder, "*.png")) +
+                             glob.glob(os.path.join(image_folder, "*.jpg")) +
+                             glob.glob(os.path.join(image_folder, "*.jpeg")))
 
-    # 读取第一张图片以获取尺寸
-    first_frame = cv2.imread(image_paths[0])
-    height, width, layers = first_frame.shape
+        if not image_paths:
+            raise ValueError("指定文件夹中没有找到支持的图片文件（.png, .jpg, .jpeg）")
 
-    # 设置视频编码器和 VideoWriter
-    fourcc = cv2.VideoWriter_fourcc(*codec)
-    video = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
+        # 线程池预读图片，队列有界，解码与编码重叠
+        frames = bounded_map(_read_frame, image_paths, num_readers)
+    else:
+        frames = ((f"frame {i}", frame) for i, frame in enumerate(image_folder))
 
-    if not video.isOpened():
-        raise RuntimeError("无法创建视频写入器，请检查路径或编码器是否支持")
+    video = None
+    num_written = 0
 
-    for img_path in image_paths:
-        frame = cv2.imread(img_path)
+    for img_path, frame in frames:
         if frame is None:
             print(f"警告：无法读取图像 {img_path}，跳过")
             continue
-        # 如果图像尺寸不一致，可选择跳过或调整尺寸（此处跳过）
+
+        if video is None:
+            # 以第一帧的尺寸创建视频
+            height, width = frame.shape[:2]
+
+            # 设置视频编码器和 VideoWriter
+            fourcc = cv2.VideoWriter_fourcc(*codec)
+            video = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
+
+            if not video.isOpened():
+                raise RuntimeError("无法创建视频写入器，请检查路径或编码器是否支持")
+
         if frame.shape[0] != height or frame.shape[1] != width:
-            print(f"警告：图像 {img_path} 尺寸不匹配，跳过")
-            continue
+            if mismatch_mode == "skip":
+                print(f"警告：图像 {img_path} 尺寸不匹配，跳过")
+                continue
+
+            frame = _fit_frame(frame, width, height)
+
         video.write(frame)
+        num_written += 1
+
+    if video is None:
+        raise ValueError("没有可写入的帧")
 
     video.release()
-    print(f"视频已保存至: {output_video}")
-    
\ No newline at end of file
+    print(f"视频已保存至: {output_video}，共 {num_written} 帧")
@@ -2,13 +2,14 @@ import os
 import json
 import shutil
 from pathlib import Path
-from typing import Dict, Literal, Union
+from typing import Dict, Literal, Union, Optional
 
 import cv2
 
 from mlops.labels.typedef.labelme import LabelmeDictType
 from mlops.labels.convert.labelme2coco import labelme2coco_batch
 from mlops.labels.convert.labelme2yolo import labelme2yolo_batch
+from mlops.labels.utils.manifest import read_manifest
 from mlops.datasets.core.abcs import DataPreprocessorABC
 
 
@@ -16,8 +17,18 @@ def make_ds_labelme_simple(
     data_root: str,
     dataset_root: str,
     labelme_dirname: str,
-    data_preprocessor: Union[None, DataPreprocessorABC]
+    data_preprocessor: Union[None, DataPreprocessorABC],
+    split_manifest_ps: Optional[Dict[str, str]] = None
 ) -> None:
+    """
+    Args
+    -----
+    - `split_manifest_ps`: `Optional[Dict[str, str]]`, 
+    `{split_dirname: manifest_p}`, e.g. `{"train_all": ..., "test_all": ...}`, 
+    manifests written by `mlops.data.split_data_manifest`. If given, images 
+    are routed by manifest membership instead of the `_train` / `_test` 
+    suffix of batchnames, and images in no manifest are skipped.
+    """
     dst_labelme_dataset_root = os.path.join(dataset_root, "dataset_labelme")
     dst_train_root = os.path.join(dst_labelme_dataset_root, "train_all")
     dst_test_root = os.path.join(dst_labelme_dataset_root, "test_all")
@@ -25,6 +36,16 @@ def make_ds_labelme_simple(
     os.makedirs(dst_train_root, exist_ok=True)
     os.makedirs(dst_test_root, exist_ok=True)
 
+    img_p_dst_root_dict: Dict[str, str] = {}
+
+    if split_manifest_ps is not None:
+        for split_dirname, manifest_p in split_manifest_ps.items():
+            split_root = os.path.join(dst_labelme_dataset_root, split_dirname)
+            os.makedirs(split_root, exist_ok=True)
+
+            for img_p in read_manifest(manifest_p):
+                img_p_dst_root_dict[img_p] = split_root
+
     ds_raw_label_root = os.path.join(dataset_root, "raw_labels")
     batchnames = os.listdir(ds_raw_label_root)
     batchnames.sort()
@@ -38,7 +59,9 @@ def make_ds_labelme_simple(
         filenames = os.listdir(raw_img_dir)
         filenames.sort()
 
-        if bn.endswith("_test"):
+        if split_manifest_ps is not None:
+            dst_root = None
+        elif bn.endswith("_test"):
             dst_root = dst_test_root
         elif bn.endswith("_train"):
             dst_root = dst_train_root
@@ -61,6 +84,12 @@ def make_ds_labelme_simple(
                 continue
             if not os.path.exists(labelme_p):
                 continue
+
+            if split_manifest_ps is not None:
+                dst_root = img_p_dst_root_dict.get(os.path.abspath(img_p))
+
+                if dst_root is None:
+                    continue
             
             if data_preprocessor is None:
                 dst_img_name = f"{data_id}{img_suffix}"
@@ -1,7 +1,7 @@
 import os
 import shutil
 from pathlib import Path
-from typing import Literal
+from typing import Dict, List, Literal
 
 
 def tag_from_dirname(
@@ -52,4 +52,59 @@ def tag_from_dirname(
                     shutil.move(src_img_p, dst_img_p)
             
             if restore_raw_root:
-                shutil.rmtree(raw_case_dir)
\ No newline at end of file
+                shutil.rmtree(raw_case_dir)
+
+def load_img_tags(
+    dataset_dir: str
+) -> Dict[str, List[str]]:
+    """
+    Read the tags written by `tag_from_dirname`, `{img_stem: tags}`
+    """
+    ds_tag_dir = os.path.join(dataset_dir, "raw_labels", "tags")
+    img_tags = {}
+
+    if not os.path.exists(ds_tag_dir):
+        return img_tags
+
+    filenames = os.listdir(ds_tag_dir)
+    filenames.sort()
+
+    for fn in filenames:
+        if not fn.endswith(".txt"):
+            continue
+
+        with open(os.path.join(ds_tag_dir, fn), "r") as f:
+            tags = [l.strip() for l in f.readlines()]
+
+        # Appended tags may repeat, keep the first of each
+        img_tags[Path(fn).stem] = list(dict.fromkeys(t for t in tags if t != ""))
+
+    return img_tags
+
+def load_batch_img_stems(
+    dataset_dir: str,
+    raw_root: str,
+) -> Dict[str, List[str]]:
+    """
+    Stems of the raw imgs of each batch of the dataset, `{batchname: img_stems}`
+    """
+    dataset_raw_label_dir = os.path.join(dataset_dir, "raw_labels")
+    batchnames = [
+        bn for bn in os.listdir(dataset_raw_label_dir) 
+        if bn != "tags" and os.path.isdir(os.path.join(raw_root, bn))
+    ]
+    batchnames.sort()
+    batch_img_stems = {}
+
+    for bn in batchnames:
+        img_stems = []
+
+        for root, _, filenames in os.walk(os.path.join(raw_root, bn)):
+            for fn in filenames:
+                if fn.endswith((".png", ".jpg", ".jpeg")):
+                    img_stems.append(Path(fn).stem)
+
+        img_stems.sort()
+        batch_img_stems[bn] = img_stems
+
+    return batch_img_stems
@@ -1,11 +1,34 @@
+import argparse
+import json
 import os
-from typing import TypedDict, List, TypeAlias, Dict, Literal, Tuple
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import TypedDict, List, TypeAlias, Dict, Literal, Tuple, Sequence, Optional, Any, Union, Iterable
 
 import cv2
 import numpy as np
+import pycocotools.mask as pycocomask
 from numpy.typing import NDArray
 
+from mlops.data import bounded_map
+from mlops.datasets.funcs.tagging import load_img_tags, load_batch_img_stems
+from mlops.labels.convert.insts2labelme import insts2labelme
+from mlops.labels.convert.labelme2insts import labelme2rle_insts
+from mlops.labels.typedef.labelme import LabelmeDictType
+from mlops.labels.utils.labelme import get_file_stamp, img_labelme_p_generator
 from mlops.models.base import BaseModel
+from mlops.shapes.insts import (
+    Insts, RLEInstsType, insts2rle_insts, rle_insts2json_dict, json_dict2rle_insts
+)
+from mlops.shapes.ious import (
+    SparseIousType, bboxes2ious, rles2ious, bboxes2ious_sparse, rles2ious_sparse
+)
+from mlops.visualize import GT_DEFAULT_COLOR, draw_insts, draw_labelme_shapes
+
+
+EVAL_VIS_GT_COLOR = GT_DEFAULT_COLOR
 
 
 class MatchResultType(TypedDict):
@@ -40,127 +63,2126 @@ class MetricSingleClsType(TypedDict):
     - `rec`: `List[float]`, rec at different ious
     - `ap`: `List[float]`, ap at different ious
     - `ap_overall`: float
+
+    Undefined values, e.g. ap of a class without gts, are `nan`.
     """
+    prec: List[float]
+    rec: List[float]
+    ap: List[float]
+    ap_overall: float
 
 class MetricMultiClsType(TypedDict):
+    """
+    - `metric_ious`: `Dict[str, MetricSingleClsType]`, `{cat_name: metric}`
+    - `map`: `List[float]`, map at different ious
+    - `map_overall`: `float`, map averaged over ious
+    """
     metric_ious: Dict[str, MetricSingleClsType]
     map: List[float]
-    map_overall: List[float]
+    map_overall: float
+
+
+REC_THRES_LIST = np.linspace(0, 1, 101)
+COCO_IOU_THRES_LIST = np.linspace(0.5, 0.95, 10).round(2).tolist()
+
+
+def _get_sorted_pairs(
+    ious: Union[NDArray[np.number], SparseIousType],
+    min_iou_thres: float,
+) -> Tuple[NDArray[np.integer], NDArray[np.integer], NDArray[np.floating]]:
+    """
+    Candidate pairs with `iou >= min_iou_thres`, sorted by iou descending. 
+    Ties keep row-major order, the same order `np.argmax` breaks ties in.
+    """
+    if isinstance(ious, dict):
+        keep_flags = ious["ious"] >= min_iou_thres
+        dt_ids = ious["dt_ids"][keep_flags]
+        gt_ids = ious["gt_ids"][keep_flags]
+        pair_ious = ious["ious"][keep_flags]
+        order = np.lexsort((gt_ids, dt_ids, -pair_ious))
+    else:
+        dt_ids, gt_ids = np.nonzero(ious >= min_iou_thres)
+        pair_ious = ious[dt_ids, gt_ids]
+        order = np.argsort(-pair_ious, kind = "stable")
+
+    return dt_ids[order], gt_ids[order], pair_ious[order]
+
+def _greedy_sweep(
+    dt_ids: List[int],
+    gt_ids: List[int],
+    num_dts: int,
+    num_gts: int,
+) -> List[int]:
+    """
+    Walk sorted candidate pairs once, a pair is matched if neither its dt 
+    nor its gt is matched yet. Returns the positions of the matched pairs.
+    """
+    dt_used = [False] * num_dts
+    gt_used = [False] * num_gts
+    num_matches_max = min(num_dts, num_gts)
+    match_pair_ids = []
+
+    for i, (dt_idx, gt_idx) in enumerate(zip(dt_ids, gt_ids)):
+        if dt_used[dt_idx] or gt_used[gt_idx]:
+            continue
+
+        dt_used[dt_idx] = True
+        gt_used[gt_idx] = True
+        match_pair_ids.append(i)
+
+        if len(match_pair_ids) == num_matches_max:
+            break
+    
+    return match_pair_ids
+
+def match_dt_gt_multi_thres(
+    ious: Union[NDArray[np.number], SparseIousType],
+    iou_thres_list: Sequence[float],
+    gt_match_multi_dt_flag: bool
+) -> List[MatchResultType]:
+    """
+    Greedy matching by iou at several iou thresholds in one call. Candidate 
+    pairs are sorted once, and the matches at a threshold are exactly the 
+    matches of the lowest threshold whose iou reaches it, so one sweep 
+    serves all thresholds.
+
+    Params
+    -----
+    - `ious`: `(num_dts, num_gts)`, or `SparseIousType` whose missing 
+    pairs count as 0, thresholds should then be above 0
+    - `iou_thres_list`: `Sequence[float]`
+    - `gt_match_multi_dt_flag`: `bool`, after the one-to-one matching, 
+    let each matched gt take one more of the unmatched dts
+
+    Returns
+    -----
+    - `match_ress`: `List[MatchResultType]`, one per iou threshold
+    """
+    if isinstance(ious, dict):
+        num_dts, num_gts = ious["shape"]
+    else:
+        ious = np.asarray(ious)
+        num_dts, num_gts = ious.shape
+
+    if len(iou_thres_list) == 0:
+        return []
+
+    min_iou_thres = min(iou_thres_list)
+    dt_ids, gt_ids, pair_ious = _get_sorted_pairs(ious, min_iou_thres)
 
+    match_pair_ids = _greedy_sweep(dt_ids.tolist(), gt_ids.tolist(), num_dts, num_gts)
+    match_pair_ids = np.asarray(match_pair_ids, dtype = np.int64)
+    matches = np.stack([dt_ids[match_pair_ids], gt_ids[match_pair_ids]], axis = 1)
+    match_ious = pair_ious[match_pair_ids]
+
+    match_ress: List[MatchResultType] = []
+
+    for iou_thres in iou_thres_list:
+        thres_matches = matches[match_ious >= iou_thres]
+
+        match_res: MatchResultType = {
+            "dt_match_flags": np.zeros(num_dts, dtype = np.bool_),
+            "dt_match_gt_idx": np.full(num_dts, -1, dtype = np.int64),
+            "gt_match_flags": np.zeros(num_gts, dtype = np.bool_),
+            "gt_match_dt_idx": [[] for i in range(num_gts)]
+        }
+
+        match_res["dt_match_flags"][thres_matches[:, 0]] = True
+        match_res["dt_match_gt_idx"][thres_matches[:, 0]] = thres_matches[:, 1]
+        match_res["gt_match_flags"][thres_matches[:, 1]] = True
+
+        for dt_idx, gt_idx in thres_matches.tolist():
+            match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
+
+        if gt_match_multi_dt_flag:
+            # Second one-to-one sweep between the remaining dts and all gts
+            remain_flags = (pair_ious >= iou_thres) \
+                & ~match_res["dt_match_flags"][dt_ids]
+            remain_dt_ids = dt_ids[remain_flags].tolist()
+            remain_gt_ids = gt_ids[remain_flags].tolist()
+            extra_pair_ids = _greedy_sweep(
+                remain_dt_ids, remain_gt_ids, num_dts, num_gts
+            )
+
+            for dt_idx, gt_idx in [(remain_dt_ids[i], remain_gt_ids[i]) for i in extra_pair_ids]:
+                match_res["dt_match_flags"][dt_idx] = True
+                match_res["dt_match_gt_idx"][dt_idx] = gt_idx
+                match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
+        
+        match_ress.append(match_res)
+    
+    return match_ress
 
 def match_dt_gt(
-    ious: NDArray[np.number],
+    ious: Union[NDArray[np.number], SparseIousType],
     iou_thres: float,
     gt_match_multi_dt_flag: bool
 ) -> MatchResultType:
     """
     Params
     -----
-    - `ious`: `(num_dts, num_gts)`
+    - `ious`: `(num_dts, num_gts)` or `SparseIousType`
     - `iou_thres`: `float`
-    - `multiple_dt_match_flag`: `bool`
+    - `gt_match_multi_dt_flag`: `bool`
     """
-    ious_copy = np.copy(ious)
+    match_res = match_dt_gt_multi_thres(
+        ious, [iou_thres], gt_match_multi_dt_flag
+    )[0]
+    return match_res
 
-    num_dts, num_gts = ious.shape
+def get_match_summary(
+    match_res: MatchResultType
+) -> MatchResultSummaryType:
+    num_dts = len(match_res["dt_match_flags"])
+    num_gts = len(match_res["gt_match_flags"])
+    num_tps = np.count_nonzero(match_res["dt_match_flags"])
+    num_gt_matches = np.count_nonzero(match_res["gt_match_flags"])
 
-    match_res: MatchResultType = {
-        "dt_match_flags": np.zeros(num_dts).astype(np.bool),
-        "dt_match_gt_idx": np.ones(num_dts) * -1,
-        "gt_match_flags": np.zeros(num_gts).astype(np.bool),
-        "gt_match_dt_idx": [[] for i in range(num_gts)]
+    summary: MatchResultSummaryType = {
+        "num_dts": num_dts,
+        "num_gts": num_gts,
+        "num_tps": num_tps,
+        "num_fps": num_dts - num_tps,
+        "num_fns": num_gts - num_gt_matches,
     }
 
-    num_dts_remain = num_dts
+    return summary
 
-    for i in range(num_gts):
-        if num_dts_remain == 0:
-            break
 
-        iou_max_idx = np.argmax(ious_copy)
-        dt_idx, gt_idx = np.unravel_index(iou_max_idx, ious_copy.shape)
-        dt_idx = dt_idx.item()
-        gt_idx = gt_idx.item()
-        max_iou = ious_copy[dt_idx, gt_idx]
+class ImgEvalResultType(TypedDict):
+    """
+    Match result of one img at all iou thresholds, small enough to send 
+    back from the matching processes
 
-        if max_iou < iou_thres:
-            break
+    - `dt_confs`: `(num_dts, )`, `float32`
+    - `dt_cat_ids`: `(num_dts, )`, `int32`
+    - `dt_areas`: `(num_dts, )`, `float32`, mask or bbox area
+    - `dt_match_flags`: `(num_thres, num_dts)`, `bool`
+    - `dt_match_ious`: `(num_dts, )`, `float32`, iou with the gt matched
+    at the lowest iou threshold, 0 if unmatched
+    - `gt_cat_ids`: `(num_gts, )`, `int32`
+    - `gt_areas`: `(num_gts, )`, `float32`
+    - `gt_match_flags`: `(num_thres, num_gts)`, `bool`
+    - `gt_match_ious`: `(num_gts, )`, `float32`, best iou among the dts
+    matched at the lowest iou threshold, 0 if unmatched
+    """
+    dt_confs: NDArray[np.float32]
+    dt_cat_ids: NDArray[np.int32]
+    dt_areas: NDArray[np.float32]
+    dt_match_flags: NDArray[np.bool_]
+    dt_match_ious: NDArray[np.float32]
+    gt_cat_ids: NDArray[np.int32]
+    gt_areas: NDArray[np.float32]
+    gt_match_flags: NDArray[np.bool_]
+    gt_match_ious: NDArray[np.float32]
 
-        match_res["dt_match_flags"][dt_idx] = True
-        match_res["dt_match_gt_idx"][dt_idx] = gt_idx
-        match_res["gt_match_flags"][gt_idx] = True
-        match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
 
-        ious_copy[dt_idx, :] = float("-inf")
-        ious_copy[:, gt_idx] = float("-inf")
+# Columns of the accumulated match table, `{name: (dtype, per iou thres)}`,
+# per iou threshold columns are `(num_thres, num_rows)`
+MATCH_TABLE_COLUMNS = {
+    "dt_confs": (np.float32, False),
+    "dt_cat_ids": (np.int32, False),
+    "dt_img_ids": (np.int64, False),
+    "dt_ids": (np.int32, False),
+    "dt_areas": (np.float32, False),
+    "dt_match_flags": (np.bool_, True),
+    "dt_match_ious": (np.float32, False),
+    "gt_cat_ids": (np.int32, False),
+    "gt_img_ids": (np.int64, False),
+    "gt_areas": (np.float32, False),
+    "gt_match_flags": (np.bool_, True),
+    "gt_match_ious": (np.float32, False),
+}
 
-        num_dts_remain -= 1
-    
-    if not gt_match_multi_dt_flag:
-        return match_res
-    
-    ious_remain = np.copy(ious)
-    ious_remain[match_res["dt_match_flags"], :] = float("-inf")
 
-    for i in range(num_dts_remain):
-        iou_max_idx = np.argmax(ious_remain)
-        dt_idx, gt_idx = np.unravel_index(iou_max_idx, ious_remain.shape)
-        dt_idx = dt_idx.item()
-        gt_idx = gt_idx.item()
-        max_iou = ious_remain[dt_idx, gt_idx]
+def _get_cat_conf_keys(
+    dt_confs: NDArray[np.floating],
+    dt_cat_ids: NDArray[np.integer],
+) -> NDArray[np.int64]:
+    """
+    int64 keys that sort by class ascending, then conf descending. Confs 
+    are mapped to uint32 keys with the same order to pack with the class.
+    """
+    # `+ 0` turns -0.0 into 0.0 so that they tie
+    conf_bits = np.ascontiguousarray(dt_confs + 0, dtype = np.float32).view(np.uint32)
+    conf_keys = np.where(conf_bits >> 31, ~conf_bits, conf_bits | np.uint32(1 << 31))
+    cat_conf_keys = (np.asarray(dt_cat_ids, dtype = np.int64) << 32) \
+        | (~conf_keys).astype(np.int64)
 
-        if max_iou < iou_thres:
-            break
+    return cat_conf_keys
+
+def compute_pr_curves(
+    dt_confs: NDArray[np.floating],
+    dt_cat_ids: NDArray[np.integer],
+    dt_img_ids: NDArray[np.integer],
+    dt_ids: NDArray[np.integer],
+    dt_match_flags: NDArray[np.bool_],
+    num_gts: NDArray[np.integer],
+) -> NDArray[np.float64]:
+    """
+    101-point interpolated precision of all classes and iou thresholds, 
+    with one sort over all dts and no per-class loop. Dts are ranked by 
+    conf descending, ties broken by img id then dt id, so the result does 
+    not depend on the order dts were collected in.
+
+    Args
+    -----
+    - `dt_confs`: `(num_dts, )`
+    - `dt_cat_ids`: `(num_dts, )`, in `[0, num_cats)`
+    - `dt_img_ids`: `(num_dts, )`
+    - `dt_ids`: `(num_dts, )`, idx of the dt within its img
+    - `dt_match_flags`: `(num_thres, num_dts)`
+    - `num_gts`: `(num_cats, )`
+
+    Returns
+    -----
+    - `prec_curves`: `(num_thres, num_cats, 101)`, precision at recall 
+    `REC_THRES_LIST`, `nan` for classes without gts
+    """
+    num_thres = dt_match_flags.shape[0]
+    num_cats = len(num_gts)
+    num_dts = len(dt_confs)
+    num_recs = len(REC_THRES_LIST)
+
+    num_gts = np.asarray(num_gts, dtype = np.int64)
+    prec_curves = np.zeros((num_thres, num_cats, num_recs), dtype = np.float64)
+    prec_curves[:, num_gts == 0] = np.nan
+
+    if num_dts == 0:
+        return prec_curves
+
+    # Class major, then conf descending. (class, conf) and (img, dt) each 
+    # pack into one int64 so that the sort takes 2 keys instead of 4.
+    cat_conf_keys = _get_cat_conf_keys(dt_confs, dt_cat_ids)
+    img_dt_keys = (np.asarray(dt_img_ids, dtype = np.int64) << 32) \
+        | np.asarray(dt_ids, dtype = np.int64)
+    order = np.lexsort((img_dt_keys, cat_conf_keys))
+    cat_ids = np.asarray(dt_cat_ids, dtype = np.int64)[order]
+    tps = dt_match_flags[:, order]
+
+    cat_range = np.arange(num_cats)
+    seg_starts = np.searchsorted(cat_ids, cat_range, "left")
+    seg_ends = np.searchsorted(cat_ids, cat_range, "right")
+
+    # tp counts and ranks restart at each class
+    tp_cums = np.cumsum(tps, axis = 1, dtype = np.int64)
+    seg_bases = np.zeros((num_thres, num_cats), dtype = np.int64)
+    nonfirst_flags = seg_starts > 0
+    seg_bases[:, nonfirst_flags] = tp_cums[:, seg_starts[nonfirst_flags] - 1]
+    tp_cums -= seg_bases[:, cat_ids]
+    ranks = np.arange(1, num_dts + 1) - seg_starts[cat_ids]
+    precs = tp_cums / ranks
+
+    # The precision envelope is a suffix max within each class. Precisions 
+    # are swapped for their exact ranks and shifted up by class, lower 
+    # classes more, so one reversed cummax never carries across classes.
+    envelopes = np.zeros_like(precs)
+
+    for i in range(num_thres):
+        uniq_precs, prec_ranks = np.unique(precs[i], return_inverse = True)
+        shifts = (num_cats - cat_ids) * len(uniq_precs)
+        envelope_keys = np.maximum.accumulate((prec_ranks + shifts)[::-1])[::-1]
+        envelopes[i] = uniq_precs[envelope_keys - shifts]
+
+    # Smallest tp count whose recall reaches each recall threshold
+    safe_num_gts = np.maximum(num_gts, 1)[:, None]
+    need_tps = np.ceil(REC_THRES_LIST[None, :] * safe_num_gts).astype(np.int64)
+    need_tps = np.where((need_tps - 1) / safe_num_gts >= REC_THRES_LIST, need_tps - 1, need_tps)
+    need_tps = np.where(need_tps / safe_num_gts < REC_THRES_LIST, need_tps + 1, need_tps)
+
+    # (cat, tp count) keys are sorted, one searchsorted finds every class 
+    # and recall threshold
+    key_stride = num_dts + 1
+    query_keys = (cat_range[:, None] * key_stride + need_tps).ravel()
+
+    for i in range(num_thres):
+        seg_keys = cat_ids * key_stride + tp_cums[i]
+        hit_ids = np.searchsorted(seg_keys, query_keys, "left").reshape(num_cats, num_recs)
+        hit_flags = hit_ids < seg_ends[:, None]
+        hit_precs = envelopes[i][np.minimum(hit_ids, num_dts - 1)]
+        prec_curves[i] = np.where(hit_flags, hit_precs, 0)
+
+    prec_curves[:, num_gts == 0] = np.nan
+
+    return prec_curves
+
+
+def _nanmean(
+    values: NDArray[np.floating]
+) -> float:
+    values = values[~np.isnan(values)]
+
+    if len(values) == 0:
+        return float("nan")
+
+    return values.mean().item()
+
+
+class ConfThresSweepType(TypedDict):
+    """
+    Precision, recall and f1 of each class at every distinct conf threshold,
+    a threshold keeps the dts with `conf >= conf_thres`. Rows are flat, by
+    class then conf descending, rows of class `c` are
+    `seg_starts[c]:seg_starts[c + 1]`.
+
+    - `cat_ids`: `(num_rows, )`, `int64`
+    - `conf_thres`: `(num_rows, )`, `float64`
+    - `num_tps`: `(num_rows, )`, `int64`, tps kept by the threshold
+    - `num_dts`: `(num_rows, )`, `int64`, dts kept by the threshold
+    - `precs`: `(num_rows, )`, `float64`
+    - `recs`: `(num_rows, )`, `float64`, `nan` for classes without gts
+    - `f1s`: `(num_rows, )`, `float64`, `nan` for classes without gts
+    - `seg_starts`: `(num_cats + 1, )`, `int64`
+    - `best_conf_thres`: `(num_cats, )`, `float64`, threshold of the best
+    f1, the highest one on ties, `nan` for classes without dts or gts
+    - `best_precs`: `(num_cats, )`, `float64`
+    - `best_recs`: `(num_cats, )`, `float64`
+    - `best_f1s`: `(num_cats, )`, `float64`
+    """
+    cat_ids: NDArray[np.int64]
+    conf_thres: NDArray[np.float64]
+    num_tps: NDArray[np.int64]
+    num_dts: NDArray[np.int64]
+    precs: NDArray[np.float64]
+    recs: NDArray[np.float64]
+    f1s: NDArray[np.float64]
+    seg_starts: NDArray[np.int64]
+    best_conf_thres: NDArray[np.float64]
+    best_precs: NDArray[np.float64]
+    best_recs: NDArray[np.float64]
+    best_f1s: NDArray[np.float64]
+
+
+def _make_conf_thres_sweep(
+    cat_ids: NDArray[np.int64],
+    conf_thres: NDArray[np.float64],
+    num_tps: NDArray[np.int64],
+    num_dts: NDArray[np.int64],
+    num_gts: NDArray[np.int64],
+) -> ConfThresSweepType:
+    """
+    Rows must already be sorted by class then conf descending
+    """
+    num_cats = len(num_gts)
+    row_num_gts = num_gts[cat_ids]
+
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        precs = num_tps / num_dts
+        recs = np.where(row_num_gts > 0, num_tps / row_num_gts, np.nan)
+        f1s = np.where(precs + recs > 0, 2 * precs * recs / (precs + recs), 0)
+        f1s[np.isnan(recs)] = np.nan
+
+    # Max f1 per class with one reduceat, then the first row reaching it, 
+    # i.e. the highest threshold on ties
+    seg_starts = np.searchsorted(cat_ids, np.arange(num_cats + 1), "left")
+    f1_keys = np.where(np.isnan(f1s), -1, f1s)
+    nonempty_flags = seg_starts[1:] > seg_starts[:-1]
+    seg_max_f1s = np.full(num_cats, -1.0)
+    seg_max_f1s[nonempty_flags] = np.maximum.reduceat(
+        f1_keys, seg_starts[:-1][nonempty_flags]
+    )
+    max_row_ids = np.flatnonzero(f1_keys == seg_max_f1s[cat_ids])
+    nonempty_flags &= num_gts > 0
+    best_ids = max_row_ids[np.searchsorted(
+        cat_ids[max_row_ids], np.flatnonzero(nonempty_flags), "left"
+    )]
+
+    best_values = {}
+
+    for k, values in [("conf_thres", conf_thres), ("precs", precs), ("recs", recs), ("f1s", f1s)]:
+        best_values[k] = np.full(num_cats, np.nan)
+        best_values[k][nonempty_flags] = values[best_ids]
+
+    sweep: ConfThresSweepType = {
+        "cat_ids": cat_ids,
+        "conf_thres": conf_thres,
+        "num_tps": num_tps,
+        "num_dts": num_dts,
+        "precs": precs,
+        "recs": recs,
+        "f1s": f1s,
+        "seg_starts": seg_starts,
+        "best_conf_thres": best_values["conf_thres"],
+        "best_precs": best_values["precs"],
+        "best_recs": best_values["recs"],
+        "best_f1s": best_values["f1s"],
+    }
+
+    return sweep
+
+def compute_conf_thres_sweep(
+    dt_confs: NDArray[np.floating],
+    dt_cat_ids: NDArray[np.integer],
+    dt_match_flags: NDArray[np.bool_],
+    num_gts: NDArray[np.integer],
+) -> ConfThresSweepType:
+    """
+    Per-class precision, recall and f1 at every distinct conf, from one
+    sort of the dts at one iou threshold. A dt dropped by a threshold
+    leaves the matches of the kept dts as they are, i.e. the curves are
+    those of filtering the matched dts, as in `score_thres` of the models,
+    with recall counted by tp dts as in the pr curves.
+
+    Args
+    -----
+    - `dt_confs`: `(num_dts, )`
+    - `dt_cat_ids`: `(num_dts, )`, in `[0, num_cats)`
+    - `dt_match_flags`: `(num_dts, )`, tp flags at one iou threshold
+    - `num_gts`: `(num_cats, )`
+
+    Returns
+    -----
+    - `sweep`: `ConfThresSweepType`
+    """
+    num_gts = np.asarray(num_gts, dtype = np.int64)
+    num_cats = len(num_gts)
+
+    # Dts of equal conf are kept or dropped together, so their order 
+    # within a tie does not matter
+    cat_conf_keys = _get_cat_conf_keys(dt_confs, dt_cat_ids)
+    order = np.argsort(cat_conf_keys)
+    cat_conf_keys = cat_conf_keys[order]
+    cat_ids = np.asarray(dt_cat_ids, dtype = np.int64)[order]
+    tp_cums = np.cumsum(dt_match_flags[order], dtype = np.int64)
+
+    # tp counts and ranks restart at each class
+    seg_starts = np.searchsorted(cat_ids, np.arange(num_cats), "left")
+    seg_bases = np.concatenate([[0], tp_cums])[seg_starts]
+    tp_cums -= seg_bases[cat_ids]
+    ranks = np.arange(1, len(order) + 1) - seg_starts[cat_ids]
+
+    # Each threshold is the last dt of a run of equal (class, conf)
+    last_flags = np.ones(len(order), dtype = np.bool_)
+    last_flags[:-1] = cat_conf_keys[1:] != cat_conf_keys[:-1]
+    row_ids = order[last_flags]
+
+    sweep = _make_conf_thres_sweep(
+        cat_ids[last_flags], 
+        np.asarray(dt_confs, dtype = np.float64)[row_ids], 
+        tp_cums[last_flags], 
+        ranks[last_flags], 
+        num_gts
+    )
+
+    return sweep
+
+def compute_conf_thres_sweep_hist(
+    tp_hists: NDArray[np.int64],
+    fp_hists: NDArray[np.int64],
+    num_gts: NDArray[np.integer],
+) -> ConfThresSweepType:
+    """
+    `compute_conf_thres_sweep` from the conf histograms of one iou 
+    threshold, the thresholds are the lower edges of non-empty bins.
+
+    Args
+    -----
+    - `tp_hists`: `(num_cats, num_bins)`, bins by conf ascending over `[0, 1]`
+    - `fp_hists`: `(num_cats, num_bins)`
+    - `num_gts`: `(num_cats, )`
+    """
+    num_gts = np.asarray(num_gts, dtype = np.int64)
+    num_cats, num_bins = tp_hists.shape
+
+    tp_cums, dt_cums = _get_hist_tp_fp_cums(tp_hists, fp_hists)
+    nonempty_flags = (tp_hists + fp_hists)[:, ::-1] > 0
+    cat_ids, rev_bin_ids = np.nonzero(nonempty_flags)
+
+    sweep = _make_conf_thres_sweep(
+        cat_ids.astype(np.int64), 
+        (num_bins - 1 - rev_bin_ids) / num_bins, 
+        tp_cums[nonempty_flags], 
+        dt_cums[nonempty_flags], 
+        num_gts
+    )
+
+    return sweep
+
+def get_best_conf_thres(
+    sweep: ConfThresSweepType,
+    cat_id_name_dict: Dict[int, str],
+) -> Dict[str, float]:
+    """
+    `{cat_name: conf_thres}` of the best f1 of each class, for the 
+    `score_thres` of the models. Classes without dts or gts get `nan`.
+    """
+    best_conf_thres = {
+        cat_name: sweep["best_conf_thres"][cat_id].item() 
+        for cat_id, cat_name in cat_id_name_dict.items()
+    }
+
+    return best_conf_thres
+
+
+def _bincount_thres(
+    cat_ids: NDArray[np.integer],
+    match_flags: NDArray[np.bool_],
+    num_cats: int,
+) -> NDArray[np.int64]:
+    """
+    Matched rows per iou threshold and class, `(num_thres, num_cats)`, in
+    one bincount over `(thres, cat)` ids
+    """
+    num_thres = match_flags.shape[0]
+    thres_cat_ids = np.arange(num_thres)[:, None] * num_cats + cat_ids[None, :]
+    counts = np.bincount(
+        thres_cat_ids[match_flags], minlength = num_thres * num_cats
+    )
+    return counts.reshape(num_thres, num_cats)
+
+
+class EvalAccumulator:
+    """
+    Per-class tp / fp / fn counts at each iou threshold, plus a columnar
+    match table of every dt and gt, see `MATCH_TABLE_COLUMNS`, for exact
+    pr curves and ap, and for metrics of any img slice without re-matching,
+    see `get_slice`. The counts take constant memory, the table grows with
+    the number of dts and gts, see `HistEvalAccumulator` for a constant
+    memory mode.
+    """
+    def __init__(
+        self,
+        num_cats: int,
+        iou_thres_list: Sequence[float],
+    ) -> None:
+        self.num_cats = num_cats
+        self.iou_thres_list = list(iou_thres_list)
+        self.num_imgs = 0
+
+        num_thres = len(self.iou_thres_list)
+        self.num_tps = np.zeros((num_thres, num_cats), dtype = np.int64)
+        self.num_gt_matches = np.zeros((num_thres, num_cats), dtype = np.int64)
+        self.num_dts = np.zeros(num_cats, dtype = np.int64)
+        self.num_gts = np.zeros(num_cats, dtype = np.int64)
+
+        for k, (dtype, thres_flag) in MATCH_TABLE_COLUMNS.items():
+            shape = (num_thres, 0) if thres_flag else (0, )
+            setattr(self, k, np.zeros(shape, dtype = dtype))
+
+        # `{img_id: img_name}`, empty names for imgs updated without one
+        self.img_names: Dict[int, str] = {}
+        self._table_chunks = []
+
+    def _flush_table_chunks(self) -> None:
+        if len(self._table_chunks) == 0:
+            return
+
+        for k, (_, thres_flag) in MATCH_TABLE_COLUMNS.items():
+            setattr(self, k, np.concatenate(
+                [getattr(self, k), *[chunk[k] for chunk in self._table_chunks]],
+                axis = -1 if thres_flag else 0
+            ))
+
+        self._table_chunks = []
+
+    def _add_rows(
+        self,
+        rows: Dict[str, NDArray],
+        img_id: int,
+        img_name: str,
+    ) -> None:
+        self._table_chunks.append(rows)
+        self.img_names[img_id] = img_name
+
+        # Concatenating in batches keeps the number of small arrays low
+        if len(self._table_chunks) >= 1024:
+            self._flush_table_chunks()
+
+    def _merge_tables(
+        self,
+        other: "EvalAccumulator"
+    ) -> None:
+        self._flush_table_chunks()
+        other._flush_table_chunks()
+
+        for k, (_, thres_flag) in MATCH_TABLE_COLUMNS.items():
+            setattr(self, k, np.concatenate(
+                [getattr(self, k), getattr(other, k)], axis = -1 if thres_flag else 0
+            ))
+
+        self.img_names.update(other.img_names)
+
+    def _get_table_state(self) -> Dict[str, NDArray]:
+        self._flush_table_chunks()
+
+        table_state = {k: getattr(self, k) for k in MATCH_TABLE_COLUMNS.keys()}
+        table_state["img_name_ids"] = np.asarray(list(self.img_names.keys()), dtype = np.int64)
+        table_state["img_names"] = np.asarray(list(self.img_names.values()), dtype = np.str_)
+
+        return table_state
+
+    @classmethod
+    def _from_state(
+        cls,
+        state: Dict[str, NDArray]
+    ) -> "EvalAccumulator":
+        accumulator = cls(state["num_cats"].item(), state["iou_thres_list"].tolist())
+        accumulator.img_names = dict(zip(
+            state.pop("img_name_ids").tolist(), state.pop("img_names").tolist()
+        ))
+        return accumulator
+
+    def update(
+        self,
+        img_res: ImgEvalResultType,
+        img_id: Optional[int] = None,
+        img_name: str = "",
+    ) -> None:
+        """
+        Args
+        -----
+        - `img_res`: `ImgEvalResultType`
+        - `img_id`: `Optional[int]`, breaks conf ties between imgs,
+        defaults to the number of imgs seen so far
+        - `img_name`: `str`, lets `get_img_ids` find the img for slicing
+        """
+        num_cats = self.num_cats
+        dt_cat_ids = img_res["dt_cat_ids"]
+        gt_cat_ids = img_res["gt_cat_ids"]
+
+        if img_id is None:
+            img_id = self.num_imgs
+
+        # Classes outside [0, num_cats) are not evaluated
+        dt_keep_flags = (dt_cat_ids >= 0) & (dt_cat_ids < num_cats)
+        gt_keep_flags = (gt_cat_ids >= 0) & (gt_cat_ids < num_cats)
+        rows = {
+            "dt_confs": img_res["dt_confs"][dt_keep_flags],
+            "dt_cat_ids": dt_cat_ids[dt_keep_flags],
+            "dt_img_ids": np.full(dt_keep_flags.sum(), img_id),
+            "dt_ids": np.flatnonzero(dt_keep_flags),
+            "dt_areas": img_res["dt_areas"][dt_keep_flags],
+            "dt_match_flags": img_res["dt_match_flags"][:, dt_keep_flags],
+            "dt_match_ious": img_res["dt_match_ious"][dt_keep_flags],
+            "gt_cat_ids": gt_cat_ids[gt_keep_flags],
+            "gt_img_ids": np.full(gt_keep_flags.sum(), img_id),
+            "gt_areas": img_res["gt_areas"][gt_keep_flags],
+            "gt_match_flags": img_res["gt_match_flags"][:, gt_keep_flags],
+            "gt_match_ious": img_res["gt_match_ious"][gt_keep_flags],
+        }
+        rows = {
+            k: np.asarray(v, dtype = MATCH_TABLE_COLUMNS[k][0]) for k, v in rows.items()
+        }
+        self._add_rows(rows, img_id, img_name)
+
+        self.num_dts += np.bincount(rows["dt_cat_ids"], minlength = num_cats)
+        self.num_gts += np.bincount(rows["gt_cat_ids"], minlength = num_cats)
+        self.num_tps += _bincount_thres(
+            rows["dt_cat_ids"], rows["dt_match_flags"], num_cats
+        )
+        self.num_gt_matches += _bincount_thres(
+            rows["gt_cat_ids"], rows["gt_match_flags"], num_cats
+        )
+        self.num_imgs += 1
+
+    def get_summary(
+        self,
+        cat_id_name_dict: Dict[int, str],
+    ) -> Dict[str, List[MatchResultSummaryType]]:
+        """
+        Returns
+        -----
+        - `summaries`: `Dict[str, List[MatchResultSummaryType]]`,
+        `{cat_name: [summary_thres1, summary_thres2, ...]}`
+        """
+        summaries: Dict[str, List[MatchResultSummaryType]] = {}
+
+        for cat_id, cat_name in cat_id_name_dict.items():
+            summaries[cat_name] = []
+
+            for i in range(len(self.iou_thres_list)):
+                num_dts = self.num_dts[cat_id].item()
+                num_gts = self.num_gts[cat_id].item()
+                num_tps = self.num_tps[i, cat_id].item()
+
+                summary: MatchResultSummaryType = {
+                    "num_dts": num_dts,
+                    "num_gts": num_gts,
+                    "num_tps": num_tps,
+                    "num_fps": num_dts - num_tps,
+                    "num_fns": num_gts - self.num_gt_matches[i, cat_id].item(),
+                }
+                summaries[cat_name].append(summary)
+
+        return summaries
+
+    def merge(
+        self,
+        other: "EvalAccumulator"
+    ) -> "EvalAccumulator":
+        """
+        Fold `other` into this accumulator in place. Counts add up and match
+        tables concatenate, and pr curves sort dts by global keys, so any
+        merge order of shards gives the same metrics as one run, provided
+        each shard passed global `img_id`s to `update`.
+        """
+        assert type(self) == type(other)
+        assert self.num_cats == other.num_cats
+        assert self.iou_thres_list == other.iou_thres_list
+
+        self.num_imgs += other.num_imgs
+        self.num_tps += other.num_tps
+        self.num_gt_matches += other.num_gt_matches
+        self.num_dts += other.num_dts
+        self.num_gts += other.num_gts
+        self._merge_tables(other)
+
+        return self
+
+    def get_img_ids(
+        self,
+        img_names: Iterable[str],
+    ) -> NDArray[np.int64]:
+        """
+        Ids of the evaluated imgs among `img_names`, which are matched by
+        file name or by stem, e.g. the stems tag files are named by.
+        Unknown names are skipped.
+        """
+        name_id_dict = {}
+
+        for img_id, img_name in self.img_names.items():
+            name_id_dict[img_name] = img_id
+            name_id_dict[Path(img_name).stem] = img_id
+
+        img_ids = [name_id_dict[n] for n in img_names if n in name_id_dict.keys()]
+
+        return np.unique(np.asarray(img_ids, dtype = np.int64))
+
+    def get_slice(
+        self,
+        img_ids: Sequence[int],
+    ) -> "EvalAccumulator":
+        """
+        New accumulator of only the imgs in `img_ids`, filtered from the
+        match table and recounted, without re-matching. Its metrics equal
+        those of evaluating only those imgs.
+        """
+        self._flush_table_chunks()
+
+        img_ids = np.unique(np.asarray(img_ids, dtype = np.int64))
+        img_ids = img_ids[np.isin(img_ids, list(self.img_names.keys()))]
+        dt_keep_flags = np.isin(self.dt_img_ids, img_ids)
+        gt_keep_flags = np.isin(self.gt_img_ids, img_ids)
+
+        sliced = EvalAccumulator(self.num_cats, self.iou_thres_list)
+        sliced.num_imgs = len(img_ids)
+        sliced.img_names = {i: self.img_names[i] for i in img_ids.tolist()}
+
+        for k in MATCH_TABLE_COLUMNS.keys():
+            keep_flags = dt_keep_flags if k.startswith("dt_") else gt_keep_flags
+            setattr(sliced, k, getattr(self, k)[..., keep_flags])
+
+        num_cats = self.num_cats
+        sliced.num_dts = np.bincount(sliced.dt_cat_ids, minlength = num_cats)
+        sliced.num_gts = np.bincount(sliced.gt_cat_ids, minlength = num_cats)
+        sliced.num_tps = _bincount_thres(
+            sliced.dt_cat_ids, sliced.dt_match_flags, num_cats
+        )
+        sliced.num_gt_matches = _bincount_thres(
+            sliced.gt_cat_ids, sliced.gt_match_flags, num_cats
+        )
+
+        return sliced
+
+    def save(
+        self,
+        state_p: str
+    ) -> None:
+        """
+        Save the state as `.npz`, see `EvalAccumulator.load`
+        """
+        np.savez(
+            state_p,
+            accumulator_type = type(self).__name__,
+            num_cats = self.num_cats,
+            iou_thres_list = np.asarray(self.iou_thres_list, dtype = np.float64),
+            num_imgs = self.num_imgs,
+            num_tps = self.num_tps,
+            num_gt_matches = self.num_gt_matches,
+            num_dts = self.num_dts,
+            num_gts = self.num_gts,
+            **self._get_table_state()
+        )
+
+    @staticmethod
+    def load(
+        state_p: str
+    ) -> "EvalAccumulator":
+        """
+        Load a state saved by `save`, of either accumulator type
+        """
+        with np.load(state_p) as state:
+            state = dict(state)
+
+        accumulator_clss = {
+            "EvalAccumulator": EvalAccumulator,
+            "HistEvalAccumulator": HistEvalAccumulator,
+        }
+        accumulator_cls = accumulator_clss[state.pop("accumulator_type").item()]
+        accumulator = accumulator_cls._from_state(state)
+        accumulator.num_imgs = state.pop("num_imgs").item()
+
+        for k in ["num_cats", "iou_thres_list"]:
+            state.pop(k)
+
+        for k, v in state.items():
+            setattr(accumulator, k, v)
+
+        return accumulator
+
+    def get_pr_curves(self) -> NDArray[np.float64]:
+        """
+        Returns
+        -----
+        - `prec_curves`: `(num_thres, num_cats, 101)`, see `compute_pr_curves`
+        """
+        self._flush_table_chunks()
+
+        prec_curves = compute_pr_curves(
+            self.dt_confs, self.dt_cat_ids, self.dt_img_ids, self.dt_ids,
+            self.dt_match_flags, self.num_gts
+        )
+
+        return prec_curves
+
+    def get_conf_thres_sweep(
+        self,
+        iou_thres_idx: int = 0,
+    ) -> ConfThresSweepType:
+        """
+        Returns
+        -----
+        - `sweep`: `ConfThresSweepType` at `iou_thres_list[iou_thres_idx]`, 
+        see `compute_conf_thres_sweep`
+        """
+        self._flush_table_chunks()
+
+        sweep = compute_conf_thres_sweep(
+            self.dt_confs, self.dt_cat_ids, self.dt_match_flags[iou_thres_idx], 
+            self.num_gts
+        )
+
+        return sweep
+
+    def get_metrics(
+        self,
+        cat_id_name_dict: Dict[int, str],
+    ) -> MetricMultiClsType:
+        """
+        `prec` and `rec` use all dts, `ap` is the mean of the 101-point
+        interpolated pr curve. `map` averages the classes in
+        `cat_id_name_dict` that have gts.
+        """
+        cat_ids = list(cat_id_name_dict.keys())
+
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            precs = self.num_tps / self.num_dts[None, :]
+            recs = self.num_gt_matches / self.num_gts[None, :]
+            aps = self.get_pr_curves().mean(axis = 2)
+
+        maps = np.asarray([_nanmean(thres_aps[cat_ids]) for thres_aps in aps])
+
+        metric: MetricMultiClsType = {
+            "metric_ious": {},
+            "map": maps.tolist(),
+            "map_overall": _nanmean(maps),
+        }
+
+        for cat_id, cat_name in cat_id_name_dict.items():
+            cls_metric: MetricSingleClsType = {
+                "prec": precs[:, cat_id].tolist(),
+                "rec": recs[:, cat_id].tolist(),
+                "ap": aps[:, cat_id].tolist(),
+                "ap_overall": _nanmean(aps[:, cat_id]),
+            }
+            metric["metric_ious"][cat_name] = cls_metric
+
+        return metric
+
+
+def _get_hist_tp_fp_cums(
+    tp_hists: NDArray[np.int64],
+    fp_hists: NDArray[np.int64],
+) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+    # Bins from high conf to low conf, so that cums run down the ranking
+    tp_cums = np.cumsum(tp_hists[..., ::-1], axis = -1)
+    dt_cums = np.cumsum((tp_hists + fp_hists)[..., ::-1], axis = -1)
+    return tp_cums, dt_cums
+
+def compute_pr_curves_hist(
+    tp_hists: NDArray[np.int64],
+    fp_hists: NDArray[np.int64],
+    num_gts: NDArray[np.integer],
+) -> NDArray[np.float64]:
+    """
+    101-point interpolated precision from conf histograms. Dts in one bin 
+    count as tied, so the pr curve is the exact curve seen only at bin 
+    edges, see `get_hist_ap_error_bounds` for how far the ap can be off.
+
+    Args
+    -----
+    - `tp_hists`: `(num_thres, num_cats, num_bins)`, bins by conf ascending
+    - `fp_hists`: `(num_thres, num_cats, num_bins)`
+    - `num_gts`: `(num_cats, )`
+
+    Returns
+    -----
+    - `prec_curves`: `(num_thres, num_cats, 101)`, `nan` for classes 
+    without gts
+    """
+    num_thres, num_cats, num_bins = tp_hists.shape
+    num_recs = len(REC_THRES_LIST)
+    num_gts = np.asarray(num_gts, dtype = np.int64)
+
+    tp_cums, dt_cums = _get_hist_tp_fp_cums(tp_hists, fp_hists)
+
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        precs = np.where(dt_cums > 0, tp_cums / dt_cums, 0)
+
+    # Bins are their own axis here, the envelope needs no class shifts
+    envelopes = np.maximum.accumulate(precs[..., ::-1], axis = -1)[..., ::-1]
+
+    # Smallest tp count whose recall reaches each recall threshold
+    safe_num_gts = np.maximum(num_gts, 1)[:, None]
+    need_tps = np.ceil(REC_THRES_LIST[None, :] * safe_num_gts).astype(np.int64)
+    need_tps = np.where((need_tps - 1) / safe_num_gts >= REC_THRES_LIST, need_tps - 1, need_tps)
+    need_tps = np.where(need_tps / safe_num_gts < REC_THRES_LIST, need_tps + 1, need_tps)
+
+    # (thres, cat, tp count) keys are sorted, one searchsorted for all
+    key_stride = tp_cums.max(initial = 0) + 2
+    seg_ids = np.arange(num_thres * num_cats).reshape(num_thres, num_cats)
+    seg_keys = (seg_ids[..., None] * key_stride + tp_cums).ravel()
+    query_keys = seg_ids[..., None] * key_stride + need_tps[None, :, :]
+    hit_ids = np.searchsorted(seg_keys, query_keys.ravel(), "left")
+    hit_ids = hit_ids.reshape(num_thres, num_cats, num_recs)
+    hit_flags = hit_ids < (seg_ids[..., None] + 1) * num_bins
+
+    hit_precs = envelopes.ravel()[np.minimum(hit_ids, envelopes.size - 1)]
+    prec_curves = np.where(hit_flags, hit_precs, 0)
+    prec_curves[:, num_gts == 0] = np.nan
+
+    return prec_curves
+
+def get_hist_ap_error_bounds(
+    tp_hists: NDArray[np.int64],
+    fp_hists: NDArray[np.int64],
+) -> NDArray[np.float64]:
+    """
+    Bound of `ap_exact - ap_hist`, the binned ap is never above the exact 
+    one. 
+
+    The bin edges are points of the exact pr curve, so only points inside 
+    a bin are missed. Inside bin `b`, with `tp_b` tps and `fp_b` fps after 
+    `N_b` dts in total down to the end of the bin, no missed point has a 
+    precision more than `fp_b / N_b` above the precision at the end of 
+    the bin, and a bin of only tps or only fps misses nothing above its 
+    edges. Each interpolated precision, and so the ap, is then at most 
+    the largest `fp_b / N_b` over bins with both tps and fps below exact.
+
+    Returns
+    -----
+    - `ap_error_bounds`: `(num_thres, num_cats)`
+    """
+    tp_cums, dt_cums = _get_hist_tp_fp_cums(tp_hists, fp_hists)
+    tp_revs = tp_hists[..., ::-1]
+    fp_revs = fp_hists[..., ::-1]
+
+    mixed_flags = (tp_revs > 0) & (fp_revs > 0)
+
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        bin_errors = np.where(mixed_flags, fp_revs / dt_cums, 0)
+
+    ap_error_bounds = bin_errors.max(axis = -1, initial = 0)
+
+    return ap_error_bounds
+
+
+class HistEvalAccumulator(EvalAccumulator):
+    """
+    `EvalAccumulator` that keeps tp and fp histograms of dt confs per 
+    class and iou threshold instead of every dt, memory stays at 
+    `O(num_cats * num_thres * num_bins)` however many imgs are evaluated. 
+    Confs are binned uniformly over `[0, 1]`, values outside are clipped 
+    into the end bins. Counts are exact, ap is approximate with the error 
+    bound from `get_ap_error_bounds`.
+    """
+    def __init__(
+        self,
+        num_cats: int,
+        iou_thres_list: Sequence[float],
+        num_bins: int = 1000,
+    ) -> None:
+        super().__init__(num_cats, iou_thres_list)
+
+        num_thres = len(self.iou_thres_list)
+        self.num_bins = num_bins
+        self.tp_hists = np.zeros((num_thres, num_cats, num_bins), dtype = np.int64)
+        self.fp_hists = np.zeros((num_thres, num_cats, num_bins), dtype = np.int64)
+
+    def _add_rows(
+        self,
+        rows: Dict[str, NDArray],
+        img_id: int,
+        img_name: str,
+    ) -> None:
+        # Only the dts go into the histograms, no table and no img names
+        # are kept
+        num_bins = self.num_bins
+        bin_ids = np.floor(rows["dt_confs"].astype(np.float64) * num_bins).astype(np.int64)
+        bin_ids = np.clip(bin_ids, 0, num_bins - 1)
+        cat_bin_ids = rows["dt_cat_ids"].astype(np.int64) * num_bins + bin_ids
+        dt_match_flags = rows["dt_match_flags"]
+
+        # One scatter add over (thres, cat, bin) for all thresholds, a 
+        # bincount of the whole histogram per img would cost far more
+        thres_offsets = np.arange(len(self.iou_thres_list))[:, None] * self.num_cats * num_bins
+        hist_ids = thres_offsets + cat_bin_ids[None, :]
+        np.add.at(self.tp_hists.reshape(-1), hist_ids[dt_match_flags], 1)
+        np.add.at(self.fp_hists.reshape(-1), hist_ids[~dt_match_flags], 1)
+
+    def _merge_tables(
+        self,
+        other: "HistEvalAccumulator"
+    ) -> None:
+        assert self.num_bins == other.num_bins
+
+        self.tp_hists += other.tp_hists
+        self.fp_hists += other.fp_hists
+
+    def _get_table_state(self) -> Dict[str, NDArray]:
+        hist_state = {
+            "num_bins": self.num_bins,
+            "tp_hists": self.tp_hists,
+            "fp_hists": self.fp_hists,
+        }
+
+        return hist_state
+
+    @classmethod
+    def _from_state(
+        cls,
+        state: Dict[str, NDArray]
+    ) -> "HistEvalAccumulator":
+        accumulator = cls(
+            state["num_cats"].item(), state["iou_thres_list"].tolist(), 
+            state.pop("num_bins").item()
+        )
+        return accumulator
+
+    def get_slice(
+        self,
+        img_ids: Sequence[int],
+    ) -> "EvalAccumulator":
+        raise ValueError(
+            "HistEvalAccumulator keeps no match table to slice, evaluate "
+            "with EvalAccumulator for per-slice metrics"
+        )
+
+    def get_pr_curves(self) -> NDArray[np.float64]:
+        """
+        Returns
+        -----
+        - `prec_curves`: `(num_thres, num_cats, 101)`, see `compute_pr_curves_hist`
+        """
+        prec_curves = compute_pr_curves_hist(
+            self.tp_hists, self.fp_hists, self.num_gts
+        )
+
+        return prec_curves
+
+    def get_conf_thres_sweep(
+        self,
+        iou_thres_idx: int = 0,
+    ) -> ConfThresSweepType:
+        """
+        Returns
+        -----
+        - `sweep`: `ConfThresSweepType` at `iou_thres_list[iou_thres_idx]`, 
+        see `compute_conf_thres_sweep_hist`
+        """
+        sweep = compute_conf_thres_sweep_hist(
+            self.tp_hists[iou_thres_idx], self.fp_hists[iou_thres_idx], self.num_gts
+        )
+
+        return sweep
+
+    def get_ap_error_bounds(self) -> NDArray[np.float64]:
+        """
+        Returns
+        -----
+        - `ap_error_bounds`: `(num_thres, num_cats)`, see `get_hist_ap_error_bounds`
+        """
+        return get_hist_ap_error_bounds(self.tp_hists, self.fp_hists)
+
+
+def merge_eval_states(
+    state_ps: Sequence[str]
+) -> EvalAccumulator:
+    """
+    Merge the accumulator states written by sharded eval runs
+    """
+    assert len(state_ps) > 0
+
+    accumulator = EvalAccumulator.load(state_ps[0])
+
+    for state_p in state_ps[1:]:
+        accumulator.merge(EvalAccumulator.load(state_p))
+
+    return accumulator
+
+def _load_accumulator_type(
+    state_p: str
+) -> str:
+    """
+    Accumulator class name of a state saved by `EvalAccumulator.save`, 
+    without loading its tables
+    """
+    with np.load(state_p) as state:
+        accumulator_type = state["accumulator_type"].item()
+
+    return accumulator_type
+
+def get_tag_slices(
+    img_tags: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """
+    `{img_stem: tags}`, see `load_img_tags`, to `{tag: img_stems}`
+    """
+    tag_slices: Dict[str, List[str]] = {}
+
+    for img_stem, tags in img_tags.items():
+        for tag in tags:
+            tag_slices.setdefault(tag, []).append(img_stem)
 
-        match_res["dt_match_flags"][dt_idx] = True
-        match_res["dt_match_gt_idx"][dt_idx] = gt_idx
-        match_res["gt_match_dt_idx"][gt_idx].append(dt_idx)
+    return dict(sorted(tag_slices.items()))
 
-        ious_remain[dt_idx, :] = float("-inf")
-        ious_remain[:, gt_idx] = float("-inf")
+def get_slice_metrics(
+    accumulator: EvalAccumulator,
+    slices: Dict[str, Sequence[str]],
+    cat_id_name_dict: Dict[int, str],
+) -> Dict[str, MetricMultiClsType]:
+    """
+    Metrics of each slice of the evaluated imgs, e.g. the imgs of a tag
+    from `get_tag_slices` or of a batch from `load_batch_img_stems`, all
+    filtered from one match table.
+
+    Args
+    -----
+    - `accumulator`: `EvalAccumulator`
+    - `slices`: `Dict[str, Sequence[str]]`, `{slice_name: img_names}`,
+    names or stems, see `EvalAccumulator.get_img_ids`
+    - `cat_id_name_dict`: `Dict[int, str]`
+
+    Returns
+    -----
+    - `slice_metrics`: `Dict[str, MetricMultiClsType]`, `{slice_name: metric}`
+    """
+    slice_metrics: Dict[str, MetricMultiClsType] = {}
+
+    for slice_name, img_names in slices.items():
+        img_ids = accumulator.get_img_ids(img_names)
+        slice_metrics[slice_name] = accumulator.get_slice(img_ids).get_metrics(
+            cat_id_name_dict
+        )
+
+    return slice_metrics
+
+def parse_shard(
+    shard_str: str
+) -> Tuple[int, int]:
+    """
+    `"i/N"` to `(i, N)`, shard `i` of `N`, `i` counts from 0
+    """
+    shard_idx, num_shards = [int(v) for v in shard_str.split("/")]
+    assert 0 <= shard_idx < num_shards
+    return shard_idx, num_shards
+
+def _in_shard(
+    img_id: int,
+    shard: Optional[Tuple[int, int]]
+) -> bool:
+    # Interleaved so that every shard gets a similar mix of imgs
+    return shard is None or img_id % shard[1] == shard[0]
+
+def _get_rle_insts_ious(
+    dt_insts: RLEInstsType,
+    gt_insts: RLEInstsType,
+    iou_type: Literal["bbox", "mask"],
+    sparse_iou_flag: bool = False,
+) -> Union[NDArray[np.float64], SparseIousType]:
+    dt_cat_ids = dt_insts["cat_ids"]
+    gt_cat_ids = gt_insts["cat_ids"]
+
+    if sparse_iou_flag:
+        if iou_type == "bbox":
+            ious = bboxes2ious_sparse(dt_insts["bboxes"], gt_insts["bboxes"])
+        else:
+            ious = rles2ious_sparse(dt_insts["rles"], gt_insts["rles"])
+
+        # Only same-class pairs can match
+        same_cls_flags = dt_cat_ids[ious["dt_ids"]] == gt_cat_ids[ious["gt_ids"]]
+
+        for k in ["dt_ids", "gt_ids", "ious"]:
+            ious[k] = ious[k][same_cls_flags]
+
+        return ious
+
+    if iou_type == "bbox":
+        ious = bboxes2ious(dt_insts["bboxes"], gt_insts["bboxes"])
+    else:
+        ious = rles2ious(dt_insts["rles"], gt_insts["rles"])
     
-    return match_res
+    # Only same-class pairs can match
+    cross_cls_flags = dt_cat_ids[:, None] != gt_cat_ids[None, :]
+    ious[cross_cls_flags] = 0
 
-def get_match_summary(
-    match_res: MatchResultType
-) -> MatchResultSummaryType:
-    summary: MatchResultSummaryType = {
-        "num_dts": 0,
-        "num_gts": 0,
-        "num_tps": 0,
-        "num_fps": 0,
-        "num_fns": 0,
+    return ious
+
+def _get_rle_insts_areas(
+    insts: RLEInstsType,
+    iou_type: Literal["bbox", "mask"],
+) -> NDArray[np.float32]:
+    if iou_type == "mask" and len(insts["cat_ids"]) > 0:
+        areas = pycocomask.area(list(insts["rles"]))
+    else:
+        bboxes = np.asarray(insts["bboxes"], dtype = np.float64).reshape(-1, 4)
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+    return np.asarray(areas, dtype = np.float32)
+
+def _get_pair_ious(
+    ious: Union[NDArray[np.float64], SparseIousType],
+    dt_ids: NDArray[np.integer],
+    gt_ids: NDArray[np.integer],
+) -> NDArray[np.float64]:
+    if not isinstance(ious, dict):
+        return ious[dt_ids, gt_ids]
+
+    # Sparse pairs are sorted by dt then gt, so (dt, gt) keys are sorted
+    num_gts = ious["shape"][1]
+    pair_keys = ious["dt_ids"].astype(np.int64) * num_gts + ious["gt_ids"]
+    query_keys = dt_ids.astype(np.int64) * num_gts + gt_ids
+    pair_ids = np.searchsorted(pair_keys, query_keys)
+
+    return ious["ious"][pair_ids]
+
+def _match_rle_insts(
+    task: Tuple[RLEInstsType, RLEInstsType, str, List[float], bool, bool]
+) -> ImgEvalResultType:
+    dt_insts, gt_insts, iou_type, iou_thres_list, gt_match_multi_dt_flag, \
+        sparse_iou_flag = task
+
+    ious = _get_rle_insts_ious(dt_insts, gt_insts, iou_type, sparse_iou_flag)
+    match_ress = match_dt_gt_multi_thres(
+        ious, iou_thres_list, gt_match_multi_dt_flag
+    )
+
+    num_thres = len(iou_thres_list)
+    num_dts = len(dt_insts["cat_ids"])
+    num_gts = len(gt_insts["cat_ids"])
+
+    img_res: ImgEvalResultType = {
+        "dt_confs": np.asarray(dt_insts["confs"], dtype = np.float32),
+        "dt_cat_ids": np.asarray(dt_insts["cat_ids"], dtype = np.int32),
+        "dt_areas": _get_rle_insts_areas(dt_insts, iou_type),
+        "dt_match_flags": np.zeros((num_thres, num_dts), dtype = np.bool_),
+        "dt_match_ious": np.zeros(num_dts, dtype = np.float32),
+        "gt_cat_ids": np.asarray(gt_insts["cat_ids"], dtype = np.int32),
+        "gt_areas": _get_rle_insts_areas(gt_insts, iou_type),
+        "gt_match_flags": np.zeros((num_thres, num_gts), dtype = np.bool_),
+        "gt_match_ious": np.zeros(num_gts, dtype = np.float32),
     }
 
-    num_dts = len(match_res["dt_match_flags"])
-    num_gts = len(match_res["gt_match_flags"])
-    num_tps = np.sum(match_res["dt_match_flags"]).item()
+    for i, match_res in enumerate(match_ress):
+        img_res["dt_match_flags"][i] = match_res["dt_match_flags"]
+        img_res["gt_match_flags"][i] = match_res["gt_match_flags"]
+
+    # Ious at match come from the lowest threshold, which matches the most
+    if num_thres > 0:
+        low_match_res = match_ress[int(np.argmin(iou_thres_list))]
+        match_dt_ids = np.flatnonzero(low_match_res["dt_match_flags"])
+        match_gt_ids = low_match_res["dt_match_gt_idx"][match_dt_ids]
+        match_ious = _get_pair_ious(ious, match_dt_ids, match_gt_ids)
+
+        img_res["dt_match_ious"][match_dt_ids] = match_ious
+        np.maximum.at(img_res["gt_match_ious"], match_gt_ids, match_ious)
+
+    return img_res
+
+def _load_img_gt(
+    task: Tuple[str, str, Dict[str, int], str]
+) -> Tuple[np.ndarray, LabelmeDictType, RLEInstsType]:
+    img_p, labelme_p, cat_name_id_dict, iou_type = task
+
+    img = cv2.imread(img_p)
+
+    if img is None:
+        raise ValueError(f"can not read img '{img_p}'")
+
+    with open(labelme_p, "r") as f:
+        labelme_dict = json.load(f)
+
+    gt_insts = labelme2rle_insts(labelme_dict, cat_name_id_dict, iou_type)
+
+    return img, labelme_dict, gt_insts
+
+def _insts2dt_rle_insts(
+    insts: Insts,
+    img_hw: Tuple[int, int],
+    iou_type: Literal["bbox", "mask"],
+    img_p: str,
+) -> RLEInstsType:
+    if iou_type == "mask" and insts.masks is None and len(insts) > 0:
+        raise ValueError(f"mask eval needs masks, but the model gave none for '{img_p}'")
 
-    summary["num_gts"] = len(match_res["gt_match_flags"])
-    summary["num_dts"] = len(match_res["dt_match_flags"])
-    summary["num_fps"] = np.sum(match_res)
-    pass
+    dt_insts = insts2rle_insts(insts, img_hw, iou_type == "mask")
+
+    if iou_type == "mask" and dt_insts["rles"] is None:
+        dt_insts["rles"] = []
+
+    return dt_insts
+
+def _export_vis(
+    task: Tuple[np.ndarray, LabelmeDictType, Insts, Dict[int, str], str]
+) -> None:
+    img, labelme_dict, insts, cat_id_name_dict, export_vis_p = task
+
+    cat_names = np.asarray([cat_id_name_dict.get(c, str(c)) for c in insts.cat_ids.tolist()])
+
+    vis_img = draw_insts(
+        img, insts.confs, cat_names, insts.bboxes, insts.masks, "default", "default"
+    )
+    vis_img = draw_labelme_shapes(vis_img, labelme_dict, EVAL_VIS_GT_COLOR)
+
+    cv2.imwrite(export_vis_p, vis_img)
+
+def _export_pred_cache(
+    task: Tuple[RLEInstsType, str]
+) -> None:
+    dt_insts, export_pred_p = task
+
+    with open(export_pred_p, "w") as f:
+        json.dump(rle_insts2json_dict(dt_insts), f)
+
+def _export_img_res(
+    task: Tuple[Insts, str, Tuple[int, int], Dict[int, str], str, str]
+) -> None:
+    insts, img_name, img_hw, cat_id_name_dict, iou_type, export_img_res_p = task
+    insts2labelme(
+        insts, img_name, img_hw, export_img_res_p, cat_id_name_dict, iou_type
+    )
 
 def eval_img(
     img_p: str,
-    model: object,
+    labelme_p: str,
+    model: BaseModel,
+    cat_name_id_dict: Dict[str, int],
+    iou_type: Literal["bbox", "mask"],
+    iou_thres_list: Sequence[float],
+    gt_match_multi_dt_flag: bool,
     export_vis_flag: bool,
     export_vis_p: str,
     export_img_res_flag: bool,
     export_img_res_p: str,
-) -> Tuple[MatchResultSummaryType, MetricType]:
-    pass
+    sparse_iou_flag: bool = False,
+) -> ImgEvalResultType:
+    """
+    Args
+    -----
+    - `img_p`: `str`
+    - `labelme_p`: `str`, gt of the img
+    - `model`: `BaseModel`
+    - `cat_name_id_dict`: `Dict[str, int]`
+    - `iou_type`: `Literal["bbox", "mask"]`
+    - `iou_thres_list`: `Sequence[float]`
+    - `gt_match_multi_dt_flag`: `bool`, see `match_dt_gt_multi_thres`
+    - `export_vis_flag`: `bool`, draw dts and gts (green) into `export_vis_p`
+    - `export_img_res_flag`: `bool`, save dts as labelme into `export_img_res_p`
+    - `sparse_iou_flag`: `bool`, only compute ious of pairs whose bboxes 
+    overlap, faster on crowded imgs
+    """
+    assert iou_type in ["bbox", "mask"]
+
+    cat_id_name_dict = {v: k for k, v in cat_name_id_dict.items()}
+
+    img, labelme_dict, gt_insts = _load_img_gt(
+        (img_p, labelme_p, cat_name_id_dict, iou_type)
+    )
+    img_hw = img.shape[:2]
+
+    insts = model.infer(img)
+    dt_insts = _insts2dt_rle_insts(insts, img_hw, iou_type, img_p)
+
+    img_res = _match_rle_insts((
+        dt_insts, gt_insts, iou_type, list(iou_thres_list), 
+        gt_match_multi_dt_flag, sparse_iou_flag
+    ))
+
+    if export_vis_flag:
+        _export_vis((img, labelme_dict, insts, cat_id_name_dict, export_vis_p))
+
+    if export_img_res_flag:
+        _export_img_res((
+            insts, os.path.basename(img_p), img_hw, cat_id_name_dict, 
+            iou_type, export_img_res_p
+        ))
+
+    return img_res
 
 def eval_labelme_dataset_online(
     dataset_root: str,
-    model: object,
-    metric_avg_mode: Literal["img", "overall"],
+    model: BaseModel,
+    cat_name_id_dict: Dict[str, int],
+    iou_type: Literal["bbox", "mask"],
+    iou_thres_list: Sequence[float],
+    gt_match_multi_dt_flag: bool,
     export_vis_flag: bool,
     export_vis_root: str,
     export_img_res_flag: bool,
     export_img_res_root: str,
-) -> MetricType:
-    pass
+    export_vis_period: int = 1,
+    num_loaders: int = 4,
+    num_matchers: int = 4,
+    export_pred_cache_root: Optional[str] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    num_hist_bins: Optional[int] = None,
+    sparse_iou_flag: bool = False,
+) -> EvalAccumulator:
+    """
+    Evaluate `model` on the imgs and labelmes under `dataset_root` in a 
+    pipeline: a thread pool reads imgs and parses gts ahead of the model, 
+    `model.infer` runs on the calling thread, ious and matching run in a 
+    process pool, and exports are written by a background thread.
+
+    Args
+    -----
+    - `dataset_root`: `str`, imgs and their labelmes side by side
+    - `model`: `BaseModel`
+    - `cat_name_id_dict`: `Dict[str, int]`, labels not in it are ignored
+    - `iou_type`: `Literal["bbox", "mask"]`
+    - `iou_thres_list`: `Sequence[float]`
+    - `gt_match_multi_dt_flag`: `bool`, see `match_dt_gt_multi_thres`
+    - `export_vis_flag`: `bool`
+    - `export_vis_root`: `str`
+    - `export_img_res_flag`: `bool`, save dts as labelme
+    - `export_img_res_root`: `str`
+    - `export_vis_period`: `int`, only draw every `export_vis_period`-th img
+    - `num_loaders`: `int`, threads reading imgs and labelmes
+    - `num_matchers`: `int`, processes computing ious and matching
+    - `export_pred_cache_root`: `Optional[str]`, save dts as rle insts 
+    json for `eval_labelme_dataset_offline`
+    - `shard`: `Optional[Tuple[int, int]]`, `(i, N)` to only evaluate 
+    shard `i` of `N`, merge the saved states with `merge_eval_states`
+    - `num_hist_bins`: `Optional[int]`, accumulate into a constant memory 
+    `HistEvalAccumulator` with that many conf bins
+    - `sparse_iou_flag`: `bool`, only compute ious of pairs whose bboxes 
+    overlap, faster on crowded imgs
+
+    Returns
+    -----
+    - `accumulator`: `EvalAccumulator`, use `get_summary` for the counts
+    """
+    assert iou_type in ["bbox", "mask"]
+    assert export_vis_period >= 1
+
+    if export_pred_cache_root is not None:
+        os.makedirs(export_pred_cache_root, exist_ok = True)
+
+    if export_vis_flag:
+        os.makedirs(export_vis_root, exist_ok = True)
+
+    if export_img_res_flag:
+        os.makedirs(export_img_res_root, exist_ok = True)
+
+    iou_thres_list = list(iou_thres_list)
+    cat_id_name_dict = {v: k for k, v in cat_name_id_dict.items()}
+    num_cats = max(cat_name_id_dict.values()) + 1
+    if num_hist_bins is None:
+        accumulator = EvalAccumulator(num_cats, iou_thres_list)
+    else:
+        accumulator = HistEvalAccumulator(num_cats, iou_thres_list, num_hist_bins)
+
+    # img ids index the labeled imgs as in `update_gt_index`, so that 
+    # shards and offline states merge exactly
+    p_pairs = [
+        (img_p, labelme_p) for img_p, labelme_p 
+        in img_labelme_p_generator(dataset_root, dataset_root)
+        if os.path.exists(labelme_p)
+    ]
+    img_ids = [i for i in range(len(p_pairs)) if _in_shard(i, shard)]
+    p_pairs = [p_pairs[i] for i in img_ids]
+    load_tasks = [
+        (img_p, labelme_p, cat_name_id_dict, iou_type) for img_p, labelme_p in p_pairs
+    ]
+
+    # Bound the in-flight imgs so memory stays flat on large datasets
+    max_pending_matches = 4 * max(1, num_matchers)
+    max_pending_exports = 8
+    match_futures = deque()
+    export_futures = deque()
+    start = time.time()
+
+    with ProcessPoolExecutor(max(1, num_matchers)) as match_executor, \
+        ThreadPoolExecutor(1) as export_executor:
+        loaded = bounded_map(_load_img_gt, load_tasks, num_loaders)
+
+        for i, (img_id, (img_p, labelme_p), (img, labelme_dict, gt_insts)) in \
+            enumerate(zip(img_ids, p_pairs, loaded)):
+            img_name = os.path.basename(img_p)
+            img_stem = Path(img_name).stem
+            img_hw = img.shape[:2]
+
+            insts = model.infer(img)
+            dt_insts = _insts2dt_rle_insts(insts, img_hw, iou_type, img_p)
+
+            match_futures.append((img_id, img_name, match_executor.submit(
+                _match_rle_insts, (
+                    dt_insts, gt_insts, iou_type, iou_thres_list, 
+                    gt_match_multi_dt_flag, sparse_iou_flag
+                )
+            )))
+
+            if export_vis_flag and i % export_vis_period == 0:
+                export_vis_p = os.path.join(export_vis_root, f"{img_stem}.jpg")
+                export_futures.append(export_executor.submit(
+                    _export_vis, 
+                    (img, labelme_dict, insts, cat_id_name_dict, export_vis_p)
+                ))
+
+            if export_pred_cache_root is not None:
+                export_pred_p = os.path.join(export_pred_cache_root, f"{img_stem}.json")
+                export_futures.append(export_executor.submit(
+                    _export_pred_cache, (dt_insts, export_pred_p)
+                ))
+
+            if export_img_res_flag:
+                export_img_res_p = os.path.join(export_img_res_root, f"{img_stem}.json")
+                export_futures.append(export_executor.submit(
+                    _export_img_res,
+                    (insts, img_name, img_hw, cat_id_name_dict, iou_type, export_img_res_p)
+                ))
+
+            while len(match_futures) > max_pending_matches:
+                done_img_id, done_img_name, match_future = match_futures.popleft()
+                accumulator.update(match_future.result(), done_img_id, done_img_name)
+
+            while len(export_futures) > max_pending_exports:
+                export_futures.popleft().result()
+
+            if (i + 1) % 100 == 0:
+                elapsed = time.time() - start
+                print(f"evaluated {i + 1}/{len(p_pairs)} imgs, {(i + 1) / elapsed:.2f} imgs/s")
+
+        while len(match_futures) > 0:
+            done_img_id, done_img_name, match_future = match_futures.popleft()
+            accumulator.update(match_future.result(), done_img_id, done_img_name)
+
+        while len(export_futures) > 0:
+            export_futures.popleft().result()
+
+    elapsed = time.time() - start
+    print(f"complete, {accumulator.num_imgs} imgs evaluated in {elapsed:.2f}s")
+
+    return accumulator
+
+def _parse_gt_index_entry(
+    task: Tuple[str, Dict[str, int], str]
+) -> Dict[str, Any]:
+    labelme_p, cat_name_id_dict, iou_type = task
+
+    with open(labelme_p, "r") as f:
+        labelme_dict = json.load(f)
+
+    gt_insts = labelme2rle_insts(labelme_dict, cat_name_id_dict, iou_type)
+    return rle_insts2json_dict(gt_insts)
+
+def update_gt_index(
+    dataset_root: str,
+    gt_index_p: str,
+    cat_name_id_dict: Dict[str, int],
+    iou_type: Literal["bbox", "mask"],
+    num_workers: int = 4,
+    shard: Optional[Tuple[int, int]] = None,
+) -> Dict[str, Any]:
+    """
+    Keep a json index of the gts under `dataset_root`, labelme shapes 
+    already converted to boxes and rles. Only labelmes whose size or 
+    mtime changed since the last call are parsed again, a change of 
+    `cat_name_id_dict` or `iou_type` rebuilds the whole index.
+
+    Args
+    -----
+    - `dataset_root`: `str`, imgs and their labelmes side by side
+    - `gt_index_p`: `str`
+    - `cat_name_id_dict`: `Dict[str, int]`
+    - `iou_type`: `Literal["bbox", "mask"]`
+    - `num_workers`: `int`, processes parsing labelmes
+    - `shard`: `Optional[Tuple[int, int]]`, `(i, N)` to only index shard 
+    `i` of `N`, each shard needs its own `gt_index_p`
+
+    Returns
+    -----
+    - `gt_index`: `Dict[str, Any]`, `{"cat_name_id_dict", "iou_type", 
+    "imgs": {img_name: {"img_id", "labelme_stamp": [size, mtime_ns], "gt_insts"}}}`
+    """
+    assert iou_type in ["bbox", "mask"]
+
+    gt_index = None
+
+    if os.path.exists(gt_index_p):
+        with open(gt_index_p, "r") as f:
+            gt_index = json.load(f)
+
+        if gt_index["cat_name_id_dict"] != cat_name_id_dict \
+            or gt_index["iou_type"] != iou_type:
+            print("cat_name_id_dict or iou_type changed, rebuilding gt index")
+            gt_index = None
+
+    if gt_index is None:
+        gt_index = {
+            "cat_name_id_dict": cat_name_id_dict,
+            "iou_type": iou_type,
+            "imgs": {},
+        }
+
+    old_entries = gt_index["imgs"]
+    new_entries = {}
+    parse_img_names = []
+    parse_tasks = []
+
+    p_pairs = [
+        (img_p, labelme_p) for img_p, labelme_p 
+        in img_labelme_p_generator(dataset_root, dataset_root)
+        if os.path.exists(labelme_p)
+    ]
+
+    for img_id, (img_p, labelme_p) in enumerate(p_pairs):
+        if not _in_shard(img_id, shard):
+            continue
+
+        img_name = os.path.basename(img_p)
+        labelme_stamp = get_file_stamp(labelme_p)
+        old_entry = old_entries.get(img_name)
+
+        if old_entry is not None and old_entry["labelme_stamp"] == labelme_stamp:
+            old_entry["img_id"] = img_id
+            new_entries[img_name] = old_entry
+            continue
+
+        new_entries[img_name] = {
+            "img_id": img_id, "labelme_stamp": labelme_stamp, "gt_insts": None
+        }
+        parse_img_names.append(img_name)
+        parse_tasks.append((labelme_p, cat_name_id_dict, iou_type))
+
+    if len(parse_tasks) > 0:
+        with ProcessPoolExecutor(max(1, num_workers)) as executor:
+            gt_json_dicts = executor.map(
+                _parse_gt_index_entry, parse_tasks, chunksize = 16
+            )
+
+            for img_name, gt_json_dict in zip(parse_img_names, gt_json_dicts):
+                new_entries[img_name]["gt_insts"] = gt_json_dict
+
+    gt_index["imgs"] = new_entries
+
+    with open(gt_index_p, "w") as f:
+        json.dump(gt_index, f)
+
+    print(f"gt index: {len(parse_tasks)} of {len(new_entries)} labelmes parsed, saved at {gt_index_p}")
+
+    return gt_index
+
+def _img_res2json_dict(
+    img_res: ImgEvalResultType
+) -> Dict[str, Any]:
+    return {k: v.tolist() for k, v in img_res.items()}
+
+def _json_dict2img_res(
+    json_dict: Dict[str, Any]
+) -> ImgEvalResultType:
+    num_thres = len(json_dict["dt_match_flags"])
+
+    img_res: ImgEvalResultType = {
+        "dt_confs": np.asarray(json_dict["dt_confs"], dtype = np.float32),
+        "dt_cat_ids": np.asarray(json_dict["dt_cat_ids"], dtype = np.int32),
+        "dt_areas": np.asarray(json_dict["dt_areas"], dtype = np.float32),
+        "dt_match_flags": np.asarray(json_dict["dt_match_flags"], dtype = np.bool_)
+            .reshape(num_thres, -1),
+        "dt_match_ious": np.asarray(json_dict["dt_match_ious"], dtype = np.float32),
+        "gt_cat_ids": np.asarray(json_dict["gt_cat_ids"], dtype = np.int32),
+        "gt_areas": np.asarray(json_dict["gt_areas"], dtype = np.float32),
+        "gt_match_flags": np.asarray(json_dict["gt_match_flags"], dtype = np.bool_)
+            .reshape(num_thres, -1),
+        "gt_match_ious": np.asarray(json_dict["gt_match_ious"], dtype = np.float32),
+    }
+
+    return img_res
+
+def _match_cached_pred(
+    task: Tuple[str, Dict[str, Any], str, List[float], bool, bool]
+) -> ImgEvalResultType:
+    pred_p, gt_json_dict, iou_type, iou_thres_list, gt_match_multi_dt_flag, \
+        sparse_iou_flag = task
+
+    with open(pred_p, "r") as f:
+        dt_insts = json_dict2rle_insts(json.load(f))
+
+    gt_insts = json_dict2rle_insts(gt_json_dict)
+
+    return _match_rle_insts((
+        dt_insts, gt_insts, iou_type, iou_thres_list, 
+        gt_match_multi_dt_flag, sparse_iou_flag
+    ))
+
+def eval_labelme_dataset_offline(
+    dataset_root: str,
+    pred_cache_root: str,
+    gt_index_p: str,
+    cat_name_id_dict: Dict[str, int],
+    iou_type: Literal["bbox", "mask"],
+    iou_thres_list: Sequence[float],
+    gt_match_multi_dt_flag: bool,
+    match_cache_p: Optional[str] = None,
+    num_workers: int = 4,
+    shard: Optional[Tuple[int, int]] = None,
+    num_hist_bins: Optional[int] = None,
+    sparse_iou_flag: bool = False,
+) -> EvalAccumulator:
+    """
+    Evaluate cached predictions, written by `eval_labelme_dataset_online` 
+    with `export_pred_cache_root`, against the gt index, without running 
+    the model. With `match_cache_p`, imgs whose labelme and prediction 
+    are unchanged since the last call under the same iou settings reuse 
+    their match results, so only changed imgs are parsed and matched.
+
+    Args
+    -----
+    - `dataset_root`: `str`, imgs and their labelmes side by side
+    - `pred_cache_root`: `str`, `{img_stem}.json` rle insts per img
+    - `gt_index_p`: `str`, see `update_gt_index`
+    - `cat_name_id_dict`: `Dict[str, int]`
+    - `iou_type`: `Literal["bbox", "mask"]`
+    - `iou_thres_list`: `Sequence[float]`
+    - `gt_match_multi_dt_flag`: `bool`, see `match_dt_gt_multi_thres`
+    - `match_cache_p`: `Optional[str]`
+    - `num_workers`: `int`, processes parsing labelmes and matching
+    - `shard`: `Optional[Tuple[int, int]]`, `(i, N)` to only evaluate 
+    shard `i` of `N`, each shard needs its own `gt_index_p` and 
+    `match_cache_p`
+    - `num_hist_bins`: `Optional[int]`, accumulate into a constant memory 
+    `HistEvalAccumulator` with that many conf bins
+    - `sparse_iou_flag`: `bool`, only compute ious of pairs whose bboxes 
+    overlap, faster on crowded imgs
+
+    Returns
+    -----
+    - `accumulator`: `EvalAccumulator`
+    """
+    assert iou_type in ["bbox", "mask"]
+
+    iou_thres_list = list(iou_thres_list)
+    num_cats = max(cat_name_id_dict.values()) + 1
+    if num_hist_bins is None:
+        accumulator = EvalAccumulator(num_cats, iou_thres_list)
+    else:
+        accumulator = HistEvalAccumulator(num_cats, iou_thres_list, num_hist_bins)
+    start = time.time()
+
+    gt_index = update_gt_index(
+        dataset_root, gt_index_p, cat_name_id_dict, iou_type, num_workers, shard
+    )
+
+    match_cache_config = {
+        "cat_name_id_dict": cat_name_id_dict,
+        "iou_type": iou_type,
+        "iou_thres_list": iou_thres_list,
+        "gt_match_multi_dt_flag": gt_match_multi_dt_flag,
+        "img_res_keys": sorted(ImgEvalResultType.__annotations__.keys()),
+    }
+    old_match_entries = {}
+
+    if match_cache_p is not None and os.path.exists(match_cache_p):
+        with open(match_cache_p, "r") as f:
+            match_cache = json.load(f)
+
+        if match_cache["config"] == match_cache_config:
+            old_match_entries = match_cache["imgs"]
+
+    img_names = sorted(gt_index["imgs"].keys())
+    new_match_entries = {}
+    match_img_names = []
+    match_tasks = []
+
+    for img_name in img_names:
+        gt_entry = gt_index["imgs"][img_name]
+        pred_p = os.path.join(pred_cache_root, f"{Path(img_name).stem}.json")
+        pred_stamp = get_file_stamp(pred_p)
+
+        if pred_stamp is None:
+            print(f"no cached prediction for {img_name}, skipped")
+            continue
+
+        old_entry = old_match_entries.get(img_name)
+
+        if old_entry is not None \
+            and old_entry["labelme_stamp"] == gt_entry["labelme_stamp"] \
+            and old_entry["pred_stamp"] == pred_stamp:
+            new_match_entries[img_name] = old_entry
+            continue
+
+        new_match_entries[img_name] = {
+            "labelme_stamp": gt_entry["labelme_stamp"],
+            "pred_stamp": pred_stamp,
+            "img_res": None,
+        }
+        match_img_names.append(img_name)
+        match_tasks.append((
+            pred_p, gt_entry["gt_insts"], iou_type, iou_thres_list, 
+            gt_match_multi_dt_flag, sparse_iou_flag
+        ))
+
+    if len(match_tasks) > 0:
+        with ProcessPoolExecutor(max(1, num_workers)) as executor:
+            img_ress = executor.map(_match_cached_pred, match_tasks, chunksize = 16)
+
+            for img_name, img_res in zip(match_img_names, img_ress):
+                new_match_entries[img_name]["img_res"] = _img_res2json_dict(img_res)
+
+    for img_name in img_names:
+        if img_name in new_match_entries.keys():
+            accumulator.update(
+                _json_dict2img_res(new_match_entries[img_name]["img_res"]),
+                gt_index["imgs"][img_name]["img_id"], img_name
+            )
+
+    if match_cache_p is not None:
+        with open(match_cache_p, "w") as f:
+            json.dump({"config": match_cache_config, "imgs": new_match_entries}, f)
+
+    elapsed = time.time() - start
+    print(
+        f"complete, {accumulator.num_imgs} imgs evaluated, "
+        f"{len(match_tasks)} re-matched, in {elapsed:.2f}s"
+    )
+
+    return accumulator
+    
+
+class EvalDiffType(TypedDict):
+    """
+    Counts of two prediction sets, `a` the baseline and `b` the candidate, 
+    at one iou threshold over the imgs both were evaluated on. Deltas are 
+    `b - a`, errors are `fp + fn`, a positive error delta is a regression.
+
+    - `iou_thres`: `float`
+    - `img_ids`: `(num_imgs, )`, `int64`
+    - `img_names`: `List[str]`, `(num_imgs, )`
+    - `img_counts`: `(2, 3, num_imgs)`, `int64`, `[a or b, tp fp fn, img]`
+    - `cat_counts`: `(2, 3, num_cats)`, `int64`, `[a or b, tp fp fn, cat]`
+    - `img_error_deltas`: `(num_imgs, )`, `int64`
+    - `cat_error_deltas`: `(num_cats, )`, `int64`
+    - `worst_img_idxs`: `(num_imgs, )`, `int64`, img idxs by error delta 
+    descending, then fn delta descending
+    """
+    iou_thres: float
+    img_ids: NDArray[np.int64]
+    img_names: List[str]
+    img_counts: NDArray[np.int64]
+    cat_counts: NDArray[np.int64]
+    img_error_deltas: NDArray[np.int64]
+    cat_error_deltas: NDArray[np.int64]
+    worst_img_idxs: NDArray[np.int64]
+
+
+def _count_tp_fp_fn(
+    accumulator: EvalAccumulator,
+    img_ids: NDArray[np.int64],
+    iou_thres_idx: int,
+) -> Tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """
+    tp, fp and fn counts per img of `img_ids`, `(3, num_imgs)`, and per 
+    class, `(3, num_cats)`, bincounted from the match table
+    """
+    accumulator._flush_table_chunks()
+
+    num_imgs = len(img_ids)
+    num_cats = accumulator.num_cats
+    counts = {}
+
+    for side in ["dt", "gt"]:
+        row_img_ids = getattr(accumulator, f"{side}_img_ids")
+        keep_flags = np.isin(row_img_ids, img_ids)
+        img_idxs = np.searchsorted(img_ids, row_img_ids[keep_flags])
+        cat_ids = getattr(accumulator, f"{side}_cat_ids")[keep_flags]
+        match_flags = getattr(accumulator, f"{side}_match_flags")[iou_thres_idx][keep_flags]
+
+        counts[f"img_{side}s"] = np.bincount(img_idxs, minlength = num_imgs)
+        counts[f"img_{side}_matches"] = np.bincount(img_idxs[match_flags], minlength = num_imgs)
+        counts[f"cat_{side}s"] = np.bincount(cat_ids, minlength = num_cats)
+        counts[f"cat_{side}_matches"] = np.bincount(cat_ids[match_flags], minlength = num_cats)
+
+    img_counts = np.stack([
+        counts["img_dt_matches"], 
+        counts["img_dts"] - counts["img_dt_matches"], 
+        counts["img_gts"] - counts["img_gt_matches"]
+    ])
+    cat_counts = np.stack([
+        counts["cat_dt_matches"], 
+        counts["cat_dts"] - counts["cat_dt_matches"], 
+        counts["cat_gts"] - counts["cat_gt_matches"]
+    ])
+
+    return img_counts, cat_counts
+
+def diff_eval_accumulators(
+    accumulator_a: EvalAccumulator,
+    accumulator_b: EvalAccumulator,
+    iou_thres_idx: int = 0,
+) -> EvalDiffType:
+    """
+    Per-img and per-class tp / fp / fn deltas of two evals of the same 
+    gts, from their match tables in a few bincounts, no re-matching.
+
+    Args
+    -----
+    - `accumulator_a`: `EvalAccumulator`, baseline
+    - `accumulator_b`: `EvalAccumulator`, candidate, with the same classes 
+    and iou thresholds
+    - `iou_thres_idx`: `int`
+
+    Returns
+    -----
+    - `diff`: `EvalDiffType`
+    """
+    assert type(accumulator_a) == type(accumulator_b) == EvalAccumulator
+    assert accumulator_a.num_cats == accumulator_b.num_cats
+    assert accumulator_a.iou_thres_list == accumulator_b.iou_thres_list
+
+    img_ids = np.intersect1d(
+        np.asarray(list(accumulator_a.img_names.keys()), dtype = np.int64),
+        np.asarray(list(accumulator_b.img_names.keys()), dtype = np.int64),
+    )
+    img_counts_a, cat_counts_a = _count_tp_fp_fn(accumulator_a, img_ids, iou_thres_idx)
+    img_counts_b, cat_counts_b = _count_tp_fp_fn(accumulator_b, img_ids, iou_thres_idx)
+    img_counts = np.stack([img_counts_a, img_counts_b])
+    cat_counts = np.stack([cat_counts_a, cat_counts_b])
+
+    img_deltas = img_counts[1] - img_counts[0]
+    cat_deltas = cat_counts[1] - cat_counts[0]
+    img_error_deltas = img_deltas[1] + img_deltas[2]
+    cat_error_deltas = cat_deltas[1] + cat_deltas[2]
+    worst_img_idxs = np.lexsort((img_ids, -img_deltas[2], -img_error_deltas))
+
+    diff: EvalDiffType = {
+        "iou_thres": accumulator_a.iou_thres_list[iou_thres_idx],
+        "img_ids": img_ids,
+        "img_names": [accumulator_a.img_names[i] for i in img_ids.tolist()],
+        "img_counts": img_counts,
+        "cat_counts": cat_counts,
+        "img_error_deltas": img_error_deltas,
+        "cat_error_deltas": cat_error_deltas,
+        "worst_img_idxs": worst_img_idxs,
+    }
+
+    return diff
+
+def get_worst_regressions(
+    diff: EvalDiffType,
+    top_k: int,
+) -> List[Dict[str, Any]]:
+    """
+    The `top_k` imgs whose errors grew the most, as json friendly dicts 
+    with their tp / fp / fn counts of both prediction sets
+    """
+    regressions = []
+
+    for img_idx in diff["worst_img_idxs"][:top_k].tolist():
+        if diff["img_error_deltas"][img_idx] <= 0:
+            break
+
+        (tp_a, fp_a, fn_a), (tp_b, fp_b, fn_b) = diff["img_counts"][:, :, img_idx].tolist()
+        regressions.append({
+            "img_name": diff["img_names"][img_idx],
+            "error_delta": diff["img_error_deltas"][img_idx].item(),
+            "a": {"tp": tp_a, "fp": fp_a, "fn": fn_a},
+            "b": {"tp": tp_b, "fp": fp_b, "fn": fn_b},
+        })
+
+    return regressions
+
+def get_failing_img_names(
+    accumulator: EvalAccumulator,
+    iou_thres_idx: int = 0,
+) -> List[str]:
+    """
+    Names of the evaluated imgs with any fp or fn at 
+    `iou_thres_list[iou_thres_idx]`, e.g. to only render those with 
+    `mlops.visualize.visualize_dataset`
+    """
+    if type(accumulator) != EvalAccumulator:
+        raise ValueError(
+            f"failing imgs need the match table of an exact EvalAccumulator, "
+            f"got {type(accumulator).__name__}"
+        )
+
+    img_ids = np.asarray(sorted(accumulator.img_names.keys()), dtype = np.int64)
+    img_counts, _ = _count_tp_fp_fn(accumulator, img_ids, iou_thres_idx)
+    fail_flags = (img_counts[1] + img_counts[2]) > 0
+
+    return [accumulator.img_names[i] for i in img_ids[fail_flags].tolist()]
+
+def compare_pred_caches(
+    dataset_root: str,
+    pred_cache_root_a: str,
+    pred_cache_root_b: str,
+    gt_index_p: str,
+    cat_name_id_dict: Dict[str, int],
+    iou_type: Literal["bbox", "mask"],
+    iou_thres: float,
+    gt_match_multi_dt_flag: bool,
+    match_cache_p_a: Optional[str] = None,
+    match_cache_p_b: Optional[str] = None,
+    num_workers: int = 4,
+    sparse_iou_flag: bool = False,
+) -> EvalDiffType:
+    """
+    Diff two models on the same gts from their cached predictions, see 
+    `eval_labelme_dataset_offline`, without running either model. Both 
+    share `gt_index_p`, with their own match caches only changed imgs are 
+    re-matched on later calls.
+
+    Args
+    -----
+    - `dataset_root`: `str`
+    - `pred_cache_root_a`: `str`, baseline predictions
+    - `pred_cache_root_b`: `str`, candidate predictions
+    - `gt_index_p`: `str`
+    - `cat_name_id_dict`: `Dict[str, int]`
+    - `iou_type`: `Literal["bbox", "mask"]`
+    - `iou_thres`: `float`
+    - `gt_match_multi_dt_flag`: `bool`
+    - `match_cache_p_a`: `Optional[str]`
+    - `match_cache_p_b`: `Optional[str]`
+    - `num_workers`: `int`
+    - `sparse_iou_flag`: `bool`
+
+    Returns
+    -----
+    - `diff`: `EvalDiffType`, see `get_worst_regressions`
+    """
+    accumulators = []
+
+    for pred_cache_root, match_cache_p in [
+        (pred_cache_root_a, match_cache_p_a), (pred_cache_root_b, match_cache_p_b)
+    ]:
+        accumulators.append(eval_labelme_dataset_offline(
+            dataset_root, pred_cache_root, gt_index_p, cat_name_id_dict, 
+            iou_type, [iou_thres], gt_match_multi_dt_flag, match_cache_p, 
+            num_workers, sparse_iou_flag = sparse_iou_flag
+        ))
+
+    return diff_eval_accumulators(accumulators[0], accumulators[1])
     
 
 def test1() -> None:
@@ -184,5 +2206,184 @@ def test1() -> None:
         print()
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    offline_parser = subparsers.add_parser("offline")
+    offline_parser.add_argument("--dataset-root", type = str, required = True)
+    offline_parser.add_argument("--pred-cache-root", type = str, required = True)
+    offline_parser.add_argument("--gt-index-p", type = str, required = True)
+    offline_parser.add_argument("--cat-names", type = str, nargs = "+", required = True)
+    offline_parser.add_argument("--iou-type", type = str, choices = ["bbox", "mask"], default = "mask")
+    offline_parser.add_argument("--iou-thres", type = float, nargs = "+", default = COCO_IOU_THRES_LIST)
+    offline_parser.add_argument("--multi-dt", action = "store_true")
+    offline_parser.add_argument("--match-cache-p", type = str, default = None)
+    offline_parser.add_argument("--num-workers", type = int, default = 4)
+    offline_parser.add_argument("--shard", type = parse_shard, default = None)
+    offline_parser.add_argument("--num-hist-bins", type = int, default = None)
+    offline_parser.add_argument("--sparse-iou", action = "store_true")
+    offline_parser.add_argument("--export-state-p", type = str, default = None)
+    offline_parser.add_argument("--export-metric-p", type = str, default = None)
+    offline_parser.add_argument("--tag-dataset-dir", type = str, default = None)
+    offline_parser.add_argument("--batch-raw-root", type = str, default = None)
+    offline_parser.add_argument("--export-slice-metric-p", type = str, default = None)
+    offline_parser.add_argument("--iou-thres-idx", type = int, default = 0)
+    offline_parser.add_argument("--export-conf-thres-p", type = str, default = None)
+    offline_parser.add_argument("--export-failing-names-p", type = str, default = None)
+
+    merge_parser = subparsers.add_parser("merge")
+    merge_parser.add_argument("--state-ps", type = str, nargs = "+", required = True)
+    merge_parser.add_argument("--cat-names", type = str, nargs = "+", required = True)
+    merge_parser.add_argument("--export-state-p", type = str, default = None)
+    merge_parser.add_argument("--export-metric-p", type = str, default = None)
+    merge_parser.add_argument("--tag-dataset-dir", type = str, default = None)
+    merge_parser.add_argument("--batch-raw-root", type = str, default = None)
+    merge_parser.add_argument("--export-slice-metric-p", type = str, default = None)
+    merge_parser.add_argument("--iou-thres-idx", type = int, default = 0)
+    merge_parser.add_argument("--export-conf-thres-p", type = str, default = None)
+    merge_parser.add_argument("--export-failing-names-p", type = str, default = None)
+
+    diff_parser = subparsers.add_parser("diff")
+    diff_parser.add_argument("--dataset-root", type = str, required = True)
+    diff_parser.add_argument("--pred-cache-root-a", type = str, required = True)
+    diff_parser.add_argument("--pred-cache-root-b", type = str, required = True)
+    diff_parser.add_argument("--gt-index-p", type = str, required = True)
+    diff_parser.add_argument("--cat-names", type = str, nargs = "+", required = True)
+    diff_parser.add_argument("--iou-type", type = str, choices = ["bbox", "mask"], default = "mask")
+    diff_parser.add_argument("--iou-thres", type = float, default = 0.5)
+    diff_parser.add_argument("--multi-dt", action = "store_true")
+    diff_parser.add_argument("--match-cache-p-a", type = str, default = None)
+    diff_parser.add_argument("--match-cache-p-b", type = str, default = None)
+    diff_parser.add_argument("--num-workers", type = int, default = 4)
+    diff_parser.add_argument("--sparse-iou", action = "store_true")
+    diff_parser.add_argument("--top-k", type = int, default = 20)
+    diff_parser.add_argument("--export-diff-p", type = str, default = None)
+
+    args = parser.parse_args()
+
+    # Reject what binned states can not do before the eval runs
+    if args.command == "offline":
+        hist_flag = args.num_hist_bins is not None
+    elif args.command == "merge":
+        hist_flag = any([
+            _load_accumulator_type(p) == "HistEvalAccumulator" for p in args.state_ps
+        ])
+    else:
+        hist_flag = False
+
+    if hist_flag and args.tag_dataset_dir is not None:
+        parser.error("--tag-dataset-dir needs exact eval states, binned states can not be sliced")
+
+    if hist_flag and args.export_failing_names_p is not None:
+        parser.error("--export-failing-names-p needs exact eval states, binned states keep no per-img matches")
+
+    cat_name_id_dict = {cat_name: i for i, cat_name in enumerate(args.cat_names)}
+    cat_id_name_dict = {i: cat_name for cat_name, i in cat_name_id_dict.items()}
+
+    if args.command == "diff":
+        diff = compare_pred_caches(
+            args.dataset_root, args.pred_cache_root_a, args.pred_cache_root_b, 
+            args.gt_index_p, cat_name_id_dict, args.iou_type, args.iou_thres, 
+            args.multi_dt, args.match_cache_p_a, args.match_cache_p_b, 
+            args.num_workers, args.sparse_iou
+        )
+        cat_deltas = diff["cat_counts"][1] - diff["cat_counts"][0]
+        regressions = get_worst_regressions(diff, args.top_k)
+
+        for cat_id, cat_name in cat_id_name_dict.items():
+            tp_delta, fp_delta, fn_delta = cat_deltas[:, cat_id].tolist()
+            print(f"{cat_name}: tp {tp_delta:+d}, fp {fp_delta:+d}, fn {fn_delta:+d}")
+
+        for r in regressions:
+            print(f"{r['img_name']}: errors {r['error_delta']:+d}, a {r['a']}, b {r['b']}")
+
+        if args.export_diff_p is not None:
+            with open(args.export_diff_p, "w") as f:
+                json.dump({
+                    "iou_thres": diff["iou_thres"],
+                    "cats": {
+                        cat_name: dict(zip(["tp", "fp", "fn"], cat_deltas[:, cat_id].tolist()))
+                        for cat_id, cat_name in cat_id_name_dict.items()
+                    },
+                    "worst_imgs": regressions,
+                }, f, indent = 2)
+
+        return
+
+    if args.command == "offline":
+        accumulator = eval_labelme_dataset_offline(
+            args.dataset_root, args.pred_cache_root, args.gt_index_p, 
+            cat_name_id_dict, args.iou_type, args.iou_thres, args.multi_dt,
+            args.match_cache_p, args.num_workers, args.shard, args.num_hist_bins,
+            args.sparse_iou
+        )
+    else:
+        accumulator = merge_eval_states(args.state_ps)
+
+    if args.export_state_p is not None:
+        accumulator.save(args.export_state_p)
+        print(f"eval state saved at {args.export_state_p}")
+
+    metric = accumulator.get_metrics(cat_id_name_dict)
+    print(f"map: {metric['map']}")
+    print(f"map_overall: {metric['map_overall']:.4f}")
+
+    if isinstance(accumulator, HistEvalAccumulator):
+        ap_error_bound = accumulator.get_ap_error_bounds().max().item()
+        print(f"binned ap is at most {ap_error_bound:.4f} below exact")
+
+    if args.export_metric_p is not None:
+        with open(args.export_metric_p, "w") as f:
+            json.dump(metric, f, indent = 2)
+
+    # F1-optimal score_thres of each class
+    sweep = accumulator.get_conf_thres_sweep(args.iou_thres_idx)
+    conf_thres_dict = {}
+
+    for cat_id, cat_name in cat_id_name_dict.items():
+        conf_thres_dict[cat_name] = {
+            "conf_thres": sweep["best_conf_thres"][cat_id].item(),
+            "prec": sweep["best_precs"][cat_id].item(),
+            "rec": sweep["best_recs"][cat_id].item(),
+            "f1": sweep["best_f1s"][cat_id].item(),
+        }
+        print(
+            f"{cat_name}: best f1 {conf_thres_dict[cat_name]['f1']:.4f} "
+            f"at conf_thres {conf_thres_dict[cat_name]['conf_thres']:.4f}"
+        )
+
+    if args.export_conf_thres_p is not None:
+        with open(args.export_conf_thres_p, "w") as f:
+            json.dump({
+                "iou_thres": accumulator.iou_thres_list[args.iou_thres_idx], 
+                "cats": conf_thres_dict
+            }, f, indent = 2)
+
+    if args.export_failing_names_p is not None:
+        failing_img_names = get_failing_img_names(accumulator, args.iou_thres_idx)
+
+        with open(args.export_failing_names_p, "w") as f:
+            json.dump(failing_img_names, f, indent = 2)
+
+        print(f"{len(failing_img_names)} failing imgs saved at {args.export_failing_names_p}")
+
+    # Per tag and per batch metrics of the dataset `tag_from_dirname` tagged
+    if args.tag_dataset_dir is not None:
+        slices = get_tag_slices(load_img_tags(args.tag_dataset_dir))
+
+        if args.batch_raw_root is not None:
+            slices.update(load_batch_img_stems(args.tag_dataset_dir, args.batch_raw_root))
+
+        slice_metrics = get_slice_metrics(accumulator, slices, cat_id_name_dict)
+
+        for slice_name, slice_metric in slice_metrics.items():
+            print(f"{slice_name}: map_overall {slice_metric['map_overall']:.4f}")
+
+        if args.export_slice_metric_p is not None:
+            with open(args.export_slice_metric_p, "w") as f:
+                json.dump(slice_metrics, f, indent = 2)
+
+
 if __name__ == "__main__":
-    test1()
+    main()
@@ -1,8 +1,9 @@
+import itertools
 import json
 import os
 import shutil
 from pathlib import Path
-from typing import Dict, Tuple, List, Union, Literal
+from typing import Dict, Tuple, List, Union, Literal, Iterable
 
 import numpy as np
 import pycocotools.mask as pycocomask
@@ -90,23 +91,14 @@ def shape_groups_to_coco_masks(
     
     return coco_anns, curr_ann_id
 
-def labelme2coco_batch(
-    img_dirs: List[Union[str, os.PathLike]],
-    labelme_dirs: List[Union[str, os.PathLike]],
+def _labelme2coco_p_pairs(
+    p_pairs: Iterable[Tuple[str, str]],
     export_root: Union[str, os.PathLike],
     export_img_dirname: str,
     export_coco_name: str,
     cat_name_id_dict: Dict[str, int],
     shape_type: Literal["bbox", "poly", "rle"],
 ) -> None:
-    ### TODO: bbox shape type
-
-    assert isinstance(img_dirs, list)
-    assert isinstance(labelme_dirs, list)
-    assert len(img_dirs) == len(labelme_dirs)
-
-    assert shape_type in ["bbox", "poly", "rle"]
-
     export_img_dir = os.path.join(export_root, "images", export_img_dirname)
     export_coco_p = os.path.join(export_root, export_coco_name)
 
@@ -125,47 +117,42 @@ def labelme2coco_batch(
     curr_img_id = 0
     curr_ann_id = 0
 
-    for img_dir, labelme_dir in zip(img_dirs, labelme_dirs):
-        p_generator = labelme_utils.img_labelme_p_generator(
-            img_dir, labelme_dir
-        )
+    for img_p, labelme_p in p_pairs:
+        coco_img: coco_type.CocoImgDictType = {}
 
-        for img_p, labelme_p in p_generator:
-            coco_img: coco_type.CocoImgDictType = {}
+        with open(labelme_p, "r") as f:
+            labelme_dict: labelme_type.LabelmeDictType = json.load(f)
 
-            with open(labelme_p, "r") as f:
-                labelme_dict: labelme_type.LabelmeDictType = json.load(f)
+        img_h = labelme_dict["imageHeight"]
+        img_w = labelme_dict["imageWidth"]
 
-            img_h = labelme_dict["imageHeight"]
-            img_w = labelme_dict["imageWidth"]
+        img_suffix = Path(img_p).suffix
+        export_img_name = f"{curr_img_id}{img_suffix}"
+        export_img_p = os.path.join(export_img_dir, export_img_name)
+        export_img_rel_p = str(Path(export_img_p).relative_to(export_root))
 
-            img_suffix = Path(img_p).suffix
-            export_img_name = f"{curr_img_id}{img_suffix}"
-            export_img_p = os.path.join(export_img_dir, export_img_name)
-            export_img_rel_p = str(Path(export_img_p).relative_to(export_root))
+        shutil.copy(img_p, export_img_p)
 
-            shutil.copy(img_p, export_img_p)
+        coco_img["file_name"] = export_img_rel_p
+        coco_img["height"] = img_h
+        coco_img["width"] = img_w
+        coco_img["id"] = curr_img_id
+        coco_imgs.append(coco_img)
 
-            coco_img["file_name"] = export_img_rel_p
-            coco_img["height"] = img_h
-            coco_img["width"] = img_w
-            coco_img["id"] = curr_img_id
-            coco_imgs.append(coco_img)
-
-            shape_groups = labelme_utils.get_shape_groups(labelme_dict)
-            
-            if shape_type in ["poly", "rle"]:
-                img_coco_anns, next_ann_id = shape_groups_to_coco_masks(
-                    shape_groups, cat_name_id_dict, (img_h, img_w),
-                    curr_img_id, curr_ann_id, shape_type
-                )
-            elif shape_type in ["bbox"]:
-                raise NotImplementedError
-
-            coco_anns += img_coco_anns
+        shape_groups = labelme_utils.get_shape_groups(labelme_dict)
         
-            curr_ann_id = next_ann_id
-            curr_img_id += 1
+        if shape_type in ["poly", "rle"]:
+            img_coco_anns, next_ann_id = shape_groups_to_coco_masks(
+                shape_groups, cat_name_id_dict, (img_h, img_w),
+                curr_img_id, curr_ann_id, shape_type
+            )
+        elif shape_type in ["bbox"]:
+            raise NotImplementedError
+
+        coco_anns += img_coco_anns
+    
+        curr_ann_id = next_ann_id
+        curr_img_id += 1
     
     coco_dict: coco_type.CocoDictType = {
         "annotations": coco_anns,
@@ -174,4 +161,52 @@ def labelme2coco_batch(
     }
 
     with open(export_coco_p, "w") as f:
-        json.dump(coco_dict, f)
\ No newline at end of file
+        json.dump(coco_dict, f)
+
+def labelme2coco_batch(
+    img_dirs: List[Union[str, os.PathLike]],
+    labelme_dirs: List[Union[str, os.PathLike]],
+    export_root: Union[str, os.PathLike],
+    export_img_dirname: str,
+    export_coco_name: str,
+    cat_name_id_dict: Dict[str, int],
+    shape_type: Literal["bbox", "poly", "rle"],
+) -> None:
+    ### TODO: bbox shape type
+
+    assert isinstance(img_dirs, list)
+    assert isinstance(labelme_dirs, list)
+    assert len(img_dirs) == len(labelme_dirs)
+
+    assert shape_type in ["bbox", "poly", "rle"]
+
+    p_pairs = itertools.chain.from_iterable(
+        labelme_utils.img_labelme_p_generator(img_dir, labelme_dir)
+        for img_dir, labelme_dir in zip(img_dirs, labelme_dirs)
+    )
+
+    _labelme2coco_p_pairs(
+        p_pairs, export_root, export_img_dirname, export_coco_name,
+        cat_name_id_dict, shape_type
+    )
+
+def labelme2coco_manifest(
+    manifest_p: Union[str, os.PathLike],
+    export_root: Union[str, os.PathLike],
+    export_img_dirname: str,
+    export_coco_name: str,
+    cat_name_id_dict: Dict[str, int],
+    shape_type: Literal["bbox", "poly", "rle"],
+) -> None:
+    """
+    Same as `labelme2coco_batch`, but reads images from a split manifest 
+    written by `mlops.data.split_data_manifest`.
+    """
+    assert shape_type in ["bbox", "poly", "rle"]
+
+    p_pairs = labelme_utils.img_labelme_p_generator_manifest(manifest_p)
+
+    _labelme2coco_p_pairs(
+        p_pairs, export_root, export_img_dirname, export_coco_name,
+        cat_name_id_dict, shape_type
+    )
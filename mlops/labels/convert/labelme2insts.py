@@ -1,11 +1,14 @@
 import json
 import os
-from typing import Dict, Union
+from typing import Dict, Union, Literal
 
 import numpy as np
 import pycocotools.mask as pycocomask
 
-from mlops.shapes.insts import Insts
+import mlops.labels.typedef.labelme as labelme_type
+import mlops.labels.utils.labelme as labelme_utils
+from mlops.shapes.insts import Insts, RLEInstsType
+from mlops.shapes.convert.poly2rle import poly2rle_labelme
 
 
 def labelme2insts_mask(
@@ -81,4 +84,82 @@ def labelme2insts_bbox(
 
     insts = Insts(scores, cat_ids, bboxes, None)
     
-    return insts
\ No newline at end of file
+    return insts
+
+def labelme2rle_insts(
+    labelme_dict: labelme_type.LabelmeDictType,
+    cat_name_id_dict: Dict[str, int],
+    shape_type: Literal["bbox", "mask"],
+) -> RLEInstsType:
+    """
+    Shapes sharing a `group_id` make one inst. Shapes whose label is not 
+    in `cat_name_id_dict` are left out.
+
+    Args
+    -----
+    - `labelme_dict`: `LabelmeDictType`
+    - `cat_name_id_dict`: `Dict[str, int]`
+    - `shape_type`: `Literal["bbox", "mask"]`, `"bbox"` only takes the 
+    extent of the points and does not rasterize the shapes
+    """
+    assert shape_type in ["bbox", "mask"]
+
+    img_hw = (labelme_dict["imageHeight"], labelme_dict["imageWidth"])
+    shape_groups = labelme_utils.get_shape_groups(labelme_dict)
+
+    cat_ids = []
+    bboxes = []
+    rles = []
+
+    for group_id, shape_group in shape_groups.items():
+        cat_name = shape_group[0]["label"]
+
+        if cat_name not in cat_name_id_dict.keys():
+            continue
+
+        if shape_type == "bbox":
+            points = np.concatenate(
+                [np.asarray(s["points"], dtype = np.float64).reshape(-1, 2) for s in shape_group]
+            )
+            x1, y1 = points.min(axis = 0).tolist()
+            x2, y2 = points.max(axis = 0).tolist()
+        else:
+            group_rles = []
+
+            for shape in shape_group:
+                points = shape["points"]
+
+                if shape["shape_type"] == "rectangle":
+                    (rx1, ry1), (rx2, ry2) = points
+                    points = [[rx1, ry1], [rx2, ry1], [rx2, ry2], [rx1, ry2]]
+
+                # 2 points would be read as a bbox by frPyObjects
+                if len(points) < 3:
+                    print("Abnormal poly, num_points less than 3")
+                    continue
+
+                group_rles.append(poly2rle_labelme(points, img_hw))
+            
+            if len(group_rles) == 0:
+                continue
+
+            rle = pycocomask.merge(group_rles, intersect = 0)
+            x1, y1, w, h = pycocomask.toBbox(rle).tolist()
+            x2, y2 = x1 + w, y1 + h
+            rles.append(rle)
+
+        cat_ids.append(cat_name_id_dict[cat_name])
+        bboxes.append([x1, y1, x2, y2])
+
+    cat_ids = np.asarray(cat_ids, dtype = np.int32)
+    bboxes = np.asarray(bboxes, dtype = np.int32).reshape(-1, 4)
+
+    rle_insts: RLEInstsType = {
+        "confs": np.ones_like(cat_ids, dtype = np.float32),
+        "cat_ids": cat_ids,
+        "bboxes": bboxes,
+        "rles": rles if shape_type == "mask" else None,
+        "img_hw": img_hw,
+    }
+
+    return rle_insts
@@ -1,8 +1,9 @@
+import itertools
 import json
 import shutil
 import os
 from pathlib import Path
-from typing import List, Dict, Tuple, Union, Literal
+from typing import List, Dict, Tuple, Union, Literal, Iterable
 
 import numpy as np
 
@@ -129,20 +130,13 @@ def labelme2yolo_file(
             l_txt = f"{l_txt}\n"
             f.write(l_txt)
 
-def labelme2yolo_batch(
-    img_dirs: List[Union[str, os.PathLike]],
-    labelme_dirs: List[Union[str, os.PathLike]],
+def _labelme2yolo_p_pairs(
+    p_pairs: Iterable[Tuple[str, str]],
     export_root: Union[str, os.PathLike],
     export_foldername: str,
     cat_name_id_dict: Dict[str, int],
     shape_type: Literal["bbox", "poly"]
 ) -> None:
-    assert isinstance(img_dirs, list)
-    assert isinstance(labelme_dirs, list)
-    assert len(img_dirs) == len(labelme_dirs)
-
-    assert shape_type in ["bbox", "poly"]
-
     export_img_dir = os.path.join(export_root, "images", export_foldername)
     export_label_dir = os.path.join(export_root, "labels", export_foldername)
 
@@ -151,33 +145,70 @@ def labelme2yolo_batch(
 
     curr_img_id = 0
 
-    for img_dir, labelme_dir in zip(img_dirs, labelme_dirs):
-        p_generator = labelme_utils.img_labelme_p_generator(
-            img_dir, labelme_dir
-        )
+    for img_p, labelme_p in p_pairs:
+        if not os.path.exists(img_p):
+            continue
 
-        for img_p, labelme_p in p_generator:
-            if not os.path.exists(img_p):
-                continue
+        img_suffix = Path(img_p).suffix
+        export_img_name = f"{curr_img_id}{img_suffix}"
+        export_img_p = os.path.join(export_img_dir, export_img_name)
+
+        export_label_name = f"{curr_img_id}.txt"
+        export_label_p = os.path.join(export_label_dir, export_label_name)
+
+        if os.path.exists(labelme_p):
+            labelme2yolo_file(
+                img_p, labelme_p, export_img_p, export_label_p, 
+                cat_name_id_dict, shape_type
+            )
+        else:
+            shutil.copy(img_p, export_img_p)
+            with open(export_label_p, "w") as f:
+                f.write("")
 
-            img_suffix = Path(img_p).suffix
-            export_img_name = f"{curr_img_id}{img_suffix}"
-            export_img_p = os.path.join(export_img_dir, export_img_name)
+        curr_img_id += 1
 
-            export_label_name = f"{curr_img_id}.txt"
-            export_label_p = os.path.join(export_label_dir, export_label_name)
+def labelme2yolo_batch(
+    img_dirs: List[Union[str, os.PathLike]],
+    labelme_dirs: List[Union[str, os.PathLike]],
+    export_root: Union[str, os.PathLike],
+    export_foldername: str,
+    cat_name_id_dict: Dict[str, int],
+    shape_type: Literal["bbox", "poly"]
+) -> None:
+    assert isinstance(img_dirs, list)
+    assert isinstance(labelme_dirs, list)
+    assert len(img_dirs) == len(labelme_dirs)
+
+    assert shape_type in ["bbox", "poly"]
+
+    p_pairs = itertools.chain.from_iterable(
+        labelme_utils.img_labelme_p_generator(img_dir, labelme_dir)
+        for img_dir, labelme_dir in zip(img_dirs, labelme_dirs)
+    )
+
+    _labelme2yolo_p_pairs(
+        p_pairs, export_root, export_foldername, cat_name_id_dict, shape_type
+    )
+
+def labelme2yolo_manifest(
+    manifest_p: Union[str, os.PathLike],
+    export_root: Union[str, os.PathLike],
+    export_foldername: str,
+    cat_name_id_dict: Dict[str, int],
+    shape_type: Literal["bbox", "poly"]
+) -> None:
+    """
+    Same as `labelme2yolo_batch`, but reads images from a split manifest 
+    written by `mlops.data.split_data_manifest`.
+    """
+    assert shape_type in ["bbox", "poly"]
 
-            if os.path.exists(labelme_p):
-                labelme2yolo_file(
-                    img_p, labelme_p, export_img_p, export_label_p, 
-                    cat_name_id_dict, shape_type
-                )
-            else:
-                shutil.copy(img_p, export_img_p)
-                with open(export_label_p, "w") as f:
-                    f.write("")
+    p_pairs = labelme_utils.img_labelme_p_generator_manifest(manifest_p)
 
-            curr_img_id += 1
+    _labelme2yolo_p_pairs(
+        p_pairs, export_root, export_foldername, cat_name_id_dict, shape_type
+    )
 
 def labelme2yolo_batch_split(
     img_dirs: Union[str, os.PathLike],
@@ -1,8 +1,9 @@
 import os
 from pathlib import Path
-from typing import Union, Generator, Dict, Tuple, Any
+from typing import Union, Generator, Dict, Tuple, Any, Optional, List
 
 import mlops.labels.typedef.labelme as labelme_type
+from mlops.labels.utils.manifest import read_manifest
 
 
 def img_labelme_p_generator(
@@ -25,6 +26,43 @@ def img_labelme_p_generator(
 
         yield img_p, labelme_p
 
+def img_labelme_p_generator_manifest(
+    manifest_p: Union[str, os.PathLike],
+    labelme_dir: Optional[Union[str, os.PathLike]] = None
+) -> Generator[Tuple[str, str], None, None]:
+    """
+    Args
+    -----
+    - `manifest_p`: `Union[str, os.PathLike]`, written by `write_manifest`
+    - `labelme_dir`: `Optional[Union[str, os.PathLike]]`, `None` means 
+    the labelme lies next to its image
+    """
+    img_ps = read_manifest(manifest_p)
+
+    for img_p in img_ps:
+        img_stem = Path(img_p).stem
+        labelme_name = f"{img_stem}.json"
+
+        if labelme_dir is None:
+            labelme_p = os.path.join(os.path.dirname(img_p), labelme_name)
+        else:
+            labelme_p = os.path.join(labelme_dir, labelme_name)
+
+        yield img_p, labelme_p
+
+def get_file_stamp(
+    file_p: Union[str, os.PathLike]
+) -> Optional[List[int]]:
+    """
+    `[size, mtime_ns]` of `file_p`, `None` if it does not exist, to tell 
+    whether a cached result of the file is stale
+    """
+    if not os.path.exists(file_p):
+        return None
+
+    file_stat = os.stat(file_p)
+    return [file_stat.st_size, file_stat.st_mtime_ns]
+
 def get_shape_groups(
     labelme_dict: labelme_type.LabelmeDictType
 ) -> labelme_type.LabelmeShapeGroupsType:
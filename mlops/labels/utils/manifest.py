@@ -0,0 +1,33 @@
+import os
+from typing import List, Union
+
+
+def write_manifest(
+    img_ps: List[Union[str, os.PathLike]],
+    manifest_p: Union[str, os.PathLike]
+) -> None:
+    """
+    Write a split manifest, one absolute image path per line.
+    """
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_p))
+    os.makedirs(manifest_dir, exist_ok = True)
+
+    with open(manifest_p, "w") as f:
+        for img_p in img_ps:
+            f.write(f"{os.path.abspath(img_p)}\n")
+
+def read_manifest(
+    manifest_p: Union[str, os.PathLike]
+) -> List[str]:
+    img_ps = []
+
+    with open(manifest_p, "r") as f:
+        for line in f:
+            line = line.strip()
+
+            if len(line) == 0:
+                continue
+
+            img_ps.append(line)
+    
+    return img_ps
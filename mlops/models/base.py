@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 import numpy as np
 import numpy.typing as npt
@@ -15,6 +16,16 @@ class BaseModel(ABC):
     ) -> Insts:
         raise NotImplementedError
 
+    def infer_batch(
+        self,
+        bgrs: List[npt.NDArray[np.uint8]]
+    ) -> List[Insts]:
+        """
+        Infer a batch of imgs, calls `infer` on each by default, models 
+        that batch natively should override it
+        """
+        return [self.infer(bgr) for bgr in bgrs]
+
     def infer_masks_given_bboxes(
         self,
         bgr: npt.NDArray[np.uint8],
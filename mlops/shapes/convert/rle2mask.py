@@ -1,3 +1,6 @@
+from typing import List, Tuple
+
+import numpy as np
 import pycocotools.mask as pycocomask
 
 import mlops.shapes.typedef.rles as rle_type
@@ -8,4 +11,79 @@ def rle2mask(
     rle: rle_type.RLEType,
 ) -> mask_type.MaskType:
     mask = pycocomask.decode(rle)
-    return mask
\ No newline at end of file
+    return mask
+
+def _rle2counts(
+    rle: rle_type.RLEType,
+) -> List[int]:
+    """
+    Run lengths of an rle, zeros first, column major. Compressed counts are 
+    parsed as in pycocotools `rleFrString`.
+    """
+    counts_str = rle["counts"]
+
+    if isinstance(counts_str, list):
+        return counts_str
+
+    if isinstance(counts_str, str):
+        counts_str = counts_str.encode()
+
+    counts = []
+    p = 0
+
+    while p < len(counts_str):
+        x = 0
+        k = 0
+        more = True
+
+        while more:
+            c = counts_str[p] - 48
+            x |= (c & 0x1f) << (5 * k)
+            more = bool(c & 0x20)
+            p += 1
+            k += 1
+
+            if not more and (c & 0x10):
+                x |= -1 << (5 * k)
+
+        if len(counts) > 2:
+            x += counts[-2]
+
+        counts.append(x)
+
+    return counts
+
+def rle2mask_crop(
+    rle: rle_type.RLEType,
+    bbox: Tuple[int, int, int, int],
+) -> mask_type.MaskType:
+    """
+    The part of the mask inside `bbox`, x1y1x2y2, with `x2` and `y2` 
+    exclusive and inside the img, without decoding the full mask. Only 
+    the runs of the bbox columns are expanded.
+
+    Returns
+    -----
+    - `mask_crop`: `(y2 - y1, x2 - x1)`, `bool`
+    """
+    img_h = rle["size"][0]
+    x1, y1, x2, y2 = bbox
+    counts = np.asarray(_rle2counts(rle), dtype = np.int64)
+
+    run_ends = np.cumsum(counts)
+    run_starts = run_ends - counts
+    col_start, col_end = x1 * img_h, x2 * img_h
+
+    # Runs of ones overlapping the bbox columns, clipped to them
+    fg_flags = (np.arange(len(counts)) % 2 == 1) \
+        & (run_ends > col_start) & (run_starts < col_end)
+    starts = np.maximum(run_starts[fg_flags], col_start) - col_start
+    ends = np.minimum(run_ends[fg_flags], col_end) - col_start
+
+    # +1 at each run start and -1 at each run end, cumsum marks the runs
+    marks = np.zeros(col_end - col_start + 1, dtype = np.int32)
+    np.add.at(marks, starts, 1)
+    np.add.at(marks, ends, -1)
+    cols = np.cumsum(marks[:-1]).astype(np.bool_).reshape(x2 - x1, img_h)
+
+    return cols.T[y1:y2]
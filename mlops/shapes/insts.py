@@ -1,4 +1,4 @@
-from typing import Optional, Union, List
+from typing import Optional, Union, List, TypedDict, Tuple, Dict, Any
 
 import numpy as np
 import numpy.typing as npt
@@ -6,6 +6,8 @@ import numpy.typing as npt
 from mlops.shapes.typedef.bboxes import BBoxesXYXYArrType
 from mlops.shapes.typedef.others import CatIDsType, ConfsType
 from mlops.shapes.typedef.masks import MasksType
+from mlops.shapes.typedef.rles import RLEsType
+from mlops.shapes.convert.mask2rle import masks2rles
 
 
 class Insts:
@@ -56,4 +58,94 @@ class Insts:
             new_masks
         )
 
-        return new_insts
\ No newline at end of file
+        return new_insts
+
+class RLEInstsType(TypedDict):
+    """
+    `Insts` with masks kept as rles, cheap to pickle between processes 
+    and to cache on disk
+
+    - `confs`: `(num_insts, )`, `float32`
+    - `cat_ids`: `(num_insts, )`, `int32`
+    - `bboxes`: `(num_insts, 4)`, x1y1x2y2
+    - `rles`: `Optional[RLEsType]`, `None` for bbox only insts
+    - `img_hw`: `Tuple[int, int]`
+    """
+    confs: ConfsType
+    cat_ids: CatIDsType
+    bboxes: BBoxesXYXYArrType
+    rles: Optional[RLEsType]
+    img_hw: Tuple[int, int]
+
+
+def insts2rle_insts(
+    insts: Insts,
+    img_hw: Tuple[int, int],
+    mask_flag: bool = True,
+) -> RLEInstsType:
+    """
+    Args
+    -----
+    - `insts`: `Insts`
+    - `img_hw`: `Tuple[int, int]`
+    - `mask_flag`: `bool`, encode `insts.masks` into rles if they exist
+    """
+    if mask_flag and insts.masks is not None:
+        if len(insts) > 0:
+            rles = list(masks2rles(insts.masks))
+        else:
+            rles = []
+    else:
+        rles = None
+
+    rle_insts: RLEInstsType = {
+        "confs": insts.confs,
+        "cat_ids": insts.cat_ids,
+        "bboxes": insts.bboxes,
+        "rles": rles,
+        "img_hw": tuple(img_hw),
+    }
+
+    return rle_insts
+
+def rle_insts2json_dict(
+    rle_insts: RLEInstsType
+) -> Dict[str, Any]:
+    """
+    Plain lists and str rle counts, ready for `json.dump`
+    """
+    if rle_insts["rles"] is not None:
+        rles = []
+
+        for rle in rle_insts["rles"]:
+            counts = rle["counts"]
+
+            if isinstance(counts, bytes):
+                counts = counts.decode("utf-8")
+
+            rles.append({"size": list(rle["size"]), "counts": counts})
+    else:
+        rles = None
+
+    json_dict = {
+        "confs": np.asarray(rle_insts["confs"]).tolist(),
+        "cat_ids": np.asarray(rle_insts["cat_ids"]).tolist(),
+        "bboxes": np.asarray(rle_insts["bboxes"]).tolist(),
+        "rles": rles,
+        "img_hw": list(rle_insts["img_hw"]),
+    }
+
+    return json_dict
+
+def json_dict2rle_insts(
+    json_dict: Dict[str, Any]
+) -> RLEInstsType:
+    rle_insts: RLEInstsType = {
+        "confs": np.asarray(json_dict["confs"], dtype = np.float32),
+        "cat_ids": np.asarray(json_dict["cat_ids"], dtype = np.int32),
+        "bboxes": np.asarray(json_dict["bboxes"], dtype = np.int32).reshape(-1, 4),
+        "rles": json_dict["rles"],
+        "img_hw": tuple(json_dict["img_hw"]),
+    }
+
+    return rle_insts
@@ -0,0 +1,378 @@
+from typing import Literal, Optional, Tuple, TypedDict
+
+import numpy as np
+import numpy.typing as npt
+import pycocotools.mask as pycocomask
+
+import mlops.shapes.typedef.bboxes as bbox_type
+import mlops.shapes.typedef.masks as mask_type
+import mlops.shapes.typedef.rles as rle_type
+from mlops.shapes.insts import Insts
+
+
+IousType = npt.NDArray[np.float64]
+"""
+`IousType`
+    `NDArray[np.float64]`, `(num_dts, num_gts)`
+"""
+
+
+class SparseIousType(TypedDict):
+    """
+    Ious of the dt / gt pairs whose bboxes overlap, all other pairs are 0
+
+    - `dt_ids`: `(num_pairs, )`, `int64`
+    - `gt_ids`: `(num_pairs, )`, `int64`
+    - `ious`: `(num_pairs, )`, `float64`
+    - `shape`: `Tuple[int, int]`, `(num_dts, num_gts)`
+    """
+    dt_ids: npt.NDArray[np.int64]
+    gt_ids: npt.NDArray[np.int64]
+    ious: npt.NDArray[np.float64]
+    shape: Tuple[int, int]
+
+
+def bboxes2ious(
+    dt_bboxes: bbox_type.BBoxesXYXYArrType,
+    gt_bboxes: bbox_type.BBoxesXYXYArrType,
+) -> IousType:
+    dt_bboxes = np.asarray(dt_bboxes, dtype = np.float64).reshape(-1, 4)
+    gt_bboxes = np.asarray(gt_bboxes, dtype = np.float64).reshape(-1, 4)
+
+    # (num_dts, 1) against (1, num_gts)
+    dt_x1, dt_y1, dt_x2, dt_y2 = np.split(dt_bboxes, 4, axis = 1)
+    gt_x1, gt_y1, gt_x2, gt_y2 = [c.T for c in np.split(gt_bboxes, 4, axis = 1)]
+
+    inter_w = np.clip(np.minimum(dt_x2, gt_x2) - np.maximum(dt_x1, gt_x1), 0, None)
+    inter_h = np.clip(np.minimum(dt_y2, gt_y2) - np.maximum(dt_y1, gt_y1), 0, None)
+    inters = inter_w * inter_h
+
+    dt_areas = (dt_x2 - dt_x1) * (dt_y2 - dt_y1)
+    gt_areas = (gt_x2 - gt_x1) * (gt_y2 - gt_y1)
+    unions = dt_areas + gt_areas - inters
+
+    ious = np.divide(
+        inters, unions, out = np.zeros_like(inters), where = unions > 0
+    )
+
+    return ious
+
+def rles2ious(
+    dt_rles: rle_type.RLEsType,
+    gt_rles: rle_type.RLEsType,
+) -> IousType:
+    num_dts = len(dt_rles)
+    num_gts = len(gt_rles)
+
+    if num_dts == 0 or num_gts == 0:
+        return np.zeros((num_dts, num_gts), dtype = np.float64)
+
+    # One batched call, pycocotools computes all pairs on the rles in C
+    ious = pycocomask.iou(list(dt_rles), list(gt_rles), [0] * num_gts)
+    ious = np.asarray(ious, dtype = np.float64).reshape(num_dts, num_gts)
+
+    return ious
+
+def masks2ious(
+    dt_masks: mask_type.MasksType,
+    gt_masks: mask_type.MasksType,
+    max_chunk_bytes: int = 256 * 1024 * 1024,
+) -> IousType:
+    """
+    Intersections of all pairs are one matrix multiply of the flattened 
+    masks, restricted to pixels covered by both a dt and a gt. It is done 
+    over pixel chunks so that the float copies of `(num_masks, chunk)` 
+    stay under `max_chunk_bytes`.
+    """
+    num_dts = len(dt_masks)
+    num_gts = len(gt_masks)
+
+    if num_dts == 0 or num_gts == 0:
+        return np.zeros((num_dts, num_gts), dtype = np.float64)
+
+    assert dt_masks.shape[1:] == gt_masks.shape[1:]
+
+    dt_masks = dt_masks.reshape(num_dts, -1)
+    gt_masks = gt_masks.reshape(num_gts, -1)
+
+    # 1-d count_nonzero is much faster than the axis version on bools
+    dt_areas = np.asarray([np.count_nonzero(m) for m in dt_masks], dtype = np.float64)
+    gt_areas = np.asarray([np.count_nonzero(m) for m in gt_masks], dtype = np.float64)
+
+    # Only pixels covered by some dt and some gt can add to intersections
+    overlap_pixels = np.flatnonzero(np.any(dt_masks, axis = 0) & np.any(gt_masks, axis = 0))
+    num_pixels = len(overlap_pixels)
+
+    # float32 counts are exact up to 2 ** 24
+    if num_pixels <= 2 ** 24:
+        dtype = np.float32
+    else:
+        dtype = np.float64
+
+    itemsize = np.dtype(dtype).itemsize
+    chunk = max(4096, max_chunk_bytes // ((num_dts + num_gts) * itemsize))
+
+    inters = np.zeros((num_dts, num_gts), dtype = np.float64)
+
+    for start in range(0, num_pixels, chunk):
+        chunk_pixels = overlap_pixels[start:start + chunk]
+        dt_chunk = np.take(dt_masks, chunk_pixels, axis = 1).astype(dtype)
+        gt_chunk = np.take(gt_masks, chunk_pixels, axis = 1).astype(dtype)
+        inters += dt_chunk @ gt_chunk.T
+
+    unions = dt_areas[:, None] + gt_areas[None, :] - inters
+
+    ious = np.divide(
+        inters, unions, out = np.zeros_like(inters), where = unions > 0
+    )
+
+    return ious
+
+def insts2ious(
+    dt_insts: Insts,
+    gt_insts: Insts,
+    iou_type: Literal["bbox", "mask"],
+) -> IousType:
+    assert iou_type in ["bbox", "mask"]
+
+    if iou_type == "bbox":
+        ious = bboxes2ious(dt_insts.bboxes, gt_insts.bboxes)
+    else:
+        ious = masks2ious(dt_insts.masks, gt_insts.masks)
+
+    return ious
+
+def get_bbox_overlap_pairs(
+    dt_bboxes: bbox_type.BBoxesXYXYArrType,
+    gt_bboxes: bbox_type.BBoxesXYXYArrType,
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Dt / gt pairs whose bboxes overlap with a positive area, by a sweep 
+    along x: gts are sorted by `x1`, and each dt only looks at the gts 
+    whose `x1` falls in `[dt_x1 - max_gt_w, dt_x2)`.
+
+    Returns
+    -----
+    - `dt_ids`: `(num_pairs, )`, sorted by dt then gt
+    - `gt_ids`: `(num_pairs, )`
+    """
+    dt_bboxes = np.asarray(dt_bboxes, dtype = np.float64).reshape(-1, 4)
+    gt_bboxes = np.asarray(gt_bboxes, dtype = np.float64).reshape(-1, 4)
+    num_dts = len(dt_bboxes)
+    num_gts = len(gt_bboxes)
+
+    if num_dts == 0 or num_gts == 0:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+    gt_order = np.argsort(gt_bboxes[:, 0], kind = "stable")
+    sorted_gt_x1s = gt_bboxes[gt_order, 0]
+    max_gt_w = (gt_bboxes[:, 2] - gt_bboxes[:, 0]).max()
+
+    starts = np.searchsorted(sorted_gt_x1s, dt_bboxes[:, 0] - max_gt_w, "left")
+    ends = np.searchsorted(sorted_gt_x1s, dt_bboxes[:, 2], "left")
+    counts = np.maximum(ends - starts, 0)
+
+    # Expand each dt's [start, end) range of sorted gts into pairs
+    dt_ids = np.repeat(np.arange(num_dts), counts)
+    range_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    gt_ids = gt_order[np.repeat(starts, counts) + range_offsets]
+
+    dt_cands = dt_bboxes[dt_ids]
+    gt_cands = gt_bboxes[gt_ids]
+    overlap_flags = (np.minimum(dt_cands[:, 2], gt_cands[:, 2]) > np.maximum(dt_cands[:, 0], gt_cands[:, 0])) \
+        & (np.minimum(dt_cands[:, 3], gt_cands[:, 3]) > np.maximum(dt_cands[:, 1], gt_cands[:, 1]))
+
+    dt_ids = dt_ids[overlap_flags]
+    gt_ids = gt_ids[overlap_flags]
+    order = np.lexsort((gt_ids, dt_ids))
+
+    return dt_ids[order].astype(np.int64), gt_ids[order].astype(np.int64)
+
+def _make_sparse_ious(
+    dt_ids: npt.NDArray[np.int64],
+    gt_ids: npt.NDArray[np.int64],
+    ious: npt.NDArray[np.float64],
+    shape: Tuple[int, int],
+) -> SparseIousType:
+    # Pairs that turn out not to overlap are dropped
+    keep_flags = ious > 0
+
+    sparse_ious: SparseIousType = {
+        "dt_ids": dt_ids[keep_flags],
+        "gt_ids": gt_ids[keep_flags],
+        "ious": ious[keep_flags],
+        "shape": (int(shape[0]), int(shape[1])),
+    }
+
+    return sparse_ious
+
+def bboxes2ious_sparse(
+    dt_bboxes: bbox_type.BBoxesXYXYArrType,
+    gt_bboxes: bbox_type.BBoxesXYXYArrType,
+) -> SparseIousType:
+    dt_bboxes = np.asarray(dt_bboxes, dtype = np.float64).reshape(-1, 4)
+    gt_bboxes = np.asarray(gt_bboxes, dtype = np.float64).reshape(-1, 4)
+    dt_ids, gt_ids = get_bbox_overlap_pairs(dt_bboxes, gt_bboxes)
+
+    dt_cands = dt_bboxes[dt_ids]
+    gt_cands = gt_bboxes[gt_ids]
+    inter_w = np.minimum(dt_cands[:, 2], gt_cands[:, 2]) - np.maximum(dt_cands[:, 0], gt_cands[:, 0])
+    inter_h = np.minimum(dt_cands[:, 3], gt_cands[:, 3]) - np.maximum(dt_cands[:, 1], gt_cands[:, 1])
+    inters = inter_w * inter_h
+
+    dt_areas = (dt_cands[:, 2] - dt_cands[:, 0]) * (dt_cands[:, 3] - dt_cands[:, 1])
+    gt_areas = (gt_cands[:, 2] - gt_cands[:, 0]) * (gt_cands[:, 3] - gt_cands[:, 1])
+    unions = dt_areas + gt_areas - inters
+
+    ious = np.divide(
+        inters, unions, out = np.zeros_like(inters), where = unions > 0
+    )
+
+    return _make_sparse_ious(dt_ids, gt_ids, ious, (len(dt_bboxes), len(gt_bboxes)))
+
+def masks2bboxes_tight(
+    masks: mask_type.MasksType,
+) -> bbox_type.BBoxesXYXYArrType:
+    """
+    Tight x1y1x2y2 bboxes of the masks, x2 and y2 exclusive, all 0 for 
+    empty masks
+    """
+    num_masks = len(masks)
+    bboxes = np.zeros((num_masks, 4), dtype = np.int32)
+
+    for i, mask in enumerate(masks):
+        ys = np.flatnonzero(np.any(mask, axis = 1))
+        xs = np.flatnonzero(np.any(mask, axis = 0))
+
+        if len(ys) == 0:
+            continue
+
+        bboxes[i] = [xs[0], ys[0], xs[-1] + 1, ys[-1] + 1]
+    
+    return bboxes
+
+def masks2ious_sparse(
+    dt_masks: mask_type.MasksType,
+    gt_masks: mask_type.MasksType,
+    dt_bboxes: Optional[bbox_type.BBoxesXYXYArrType] = None,
+    gt_bboxes: Optional[bbox_type.BBoxesXYXYArrType] = None,
+) -> SparseIousType:
+    """
+    Mask ious of the pairs whose bboxes overlap. Areas are counted once 
+    per mask, and the intersection of a pair is counted only inside the 
+    overlap of its two bboxes, the part of the bbox union where both 
+    masks can be set.
+
+    Args
+    -----
+    - `dt_masks`: `(num_dts, img_h, img_w)`
+    - `gt_masks`: `(num_gts, img_h, img_w)`
+    - `dt_bboxes`: `Optional[BBoxesXYXYArrType]`, must enclose the masks, 
+    `None` to take tight bboxes from the masks
+    - `gt_bboxes`: `Optional[BBoxesXYXYArrType]`
+    """
+    num_dts = len(dt_masks)
+    num_gts = len(gt_masks)
+
+    if dt_bboxes is None:
+        dt_bboxes = masks2bboxes_tight(dt_masks)
+
+    if gt_bboxes is None:
+        gt_bboxes = masks2bboxes_tight(gt_masks)
+
+    dt_bboxes = np.asarray(dt_bboxes, dtype = np.int64).reshape(-1, 4)
+    gt_bboxes = np.asarray(gt_bboxes, dtype = np.int64).reshape(-1, 4)
+    dt_ids, gt_ids = get_bbox_overlap_pairs(dt_bboxes, gt_bboxes)
+
+    if len(dt_ids) == 0:
+        return _make_sparse_ious(
+            dt_ids, gt_ids, np.zeros(0, dtype = np.float64), (num_dts, num_gts)
+        )
+
+    # The bboxes enclose the masks, areas only need counting inside them
+    dt_areas = np.asarray([
+        np.count_nonzero(m[y1:y2, x1:x2]) for m, (x1, y1, x2, y2) 
+        in zip(dt_masks, np.clip(dt_bboxes, 0, None).tolist())
+    ], dtype = np.float64)
+    gt_areas = np.asarray([
+        np.count_nonzero(m[y1:y2, x1:x2]) for m, (x1, y1, x2, y2) 
+        in zip(gt_masks, np.clip(gt_bboxes, 0, None).tolist())
+    ], dtype = np.float64)
+
+    x1s = np.maximum(np.maximum(dt_bboxes[dt_ids, 0], gt_bboxes[gt_ids, 0]), 0).tolist()
+    y1s = np.maximum(np.maximum(dt_bboxes[dt_ids, 1], gt_bboxes[gt_ids, 1]), 0).tolist()
+    x2s = np.minimum(dt_bboxes[dt_ids, 2], gt_bboxes[gt_ids, 2]).tolist()
+    y2s = np.minimum(dt_bboxes[dt_ids, 3], gt_bboxes[gt_ids, 3]).tolist()
+
+    inters = np.zeros(len(dt_ids), dtype = np.float64)
+
+    for i, (dt_idx, gt_idx) in enumerate(zip(dt_ids.tolist(), gt_ids.tolist())):
+        dt_crop = dt_masks[dt_idx, y1s[i]:y2s[i], x1s[i]:x2s[i]]
+        gt_crop = gt_masks[gt_idx, y1s[i]:y2s[i], x1s[i]:x2s[i]]
+        inters[i] = np.count_nonzero(dt_crop & gt_crop)
+
+    unions = dt_areas[dt_ids] + gt_areas[gt_ids] - inters
+    ious = np.divide(
+        inters, unions, out = np.zeros_like(inters), where = unions > 0
+    )
+
+    return _make_sparse_ious(dt_ids, gt_ids, ious, (num_dts, num_gts))
+
+def rles2ious_sparse(
+    dt_rles: rle_type.RLEsType,
+    gt_rles: rle_type.RLEsType,
+    dt_bboxes: Optional[bbox_type.BBoxesXYXYArrType] = None,
+    gt_bboxes: Optional[bbox_type.BBoxesXYXYArrType] = None,
+) -> SparseIousType:
+    """
+    Rle ious of the pairs whose bboxes overlap, one batched pycocotools 
+    call per dt against its candidate gts. `None` bboxes are taken from 
+    the rles.
+    """
+    num_dts = len(dt_rles)
+    num_gts = len(gt_rles)
+
+    if num_dts == 0 or num_gts == 0:
+        return _make_sparse_ious(
+            np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64),
+            np.zeros(0, dtype = np.float64), (num_dts, num_gts)
+        )
+
+    if dt_bboxes is None:
+        dt_bboxes = pycocomask.toBbox(list(dt_rles)).reshape(-1, 4)
+        dt_bboxes[:, 2:] += dt_bboxes[:, :2]
+
+    if gt_bboxes is None:
+        gt_bboxes = pycocomask.toBbox(list(gt_rles)).reshape(-1, 4)
+        gt_bboxes[:, 2:] += gt_bboxes[:, :2]
+
+    dt_ids, gt_ids = get_bbox_overlap_pairs(dt_bboxes, gt_bboxes)
+    ious = np.zeros(len(dt_ids), dtype = np.float64)
+
+    # Pairs are sorted by dt, each dt's candidates are one contiguous run
+    run_dt_ids, run_starts, run_counts = np.unique(
+        dt_ids, return_index = True, return_counts = True
+    )
+
+    for dt_idx, start, count in zip(run_dt_ids.tolist(), run_starts.tolist(), run_counts.tolist()):
+        cand_gt_ids = gt_ids[start:start + count].tolist()
+        run_ious = pycocomask.iou(
+            [dt_rles[dt_idx]], [gt_rles[i] for i in cand_gt_ids], [0] * count
+        )
+        ious[start:start + count] = np.asarray(run_ious).reshape(-1)
+
+    return _make_sparse_ious(dt_ids, gt_ids, ious, (num_dts, num_gts))
+
+def insts2ious_sparse(
+    dt_insts: Insts,
+    gt_insts: Insts,
+    iou_type: Literal["bbox", "mask"],
+) -> SparseIousType:
+    assert iou_type in ["bbox", "mask"]
+
+    if iou_type == "bbox":
+        sparse_ious = bboxes2ious_sparse(dt_insts.bboxes, gt_insts.bboxes)
+    else:
+        sparse_ious = masks2ious_sparse(dt_insts.masks, gt_insts.masks)
+
+    return sparse_ious
@@ -0,0 +1,387 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypedDict
+
+import cv2
+import numpy as np
+
+from mlops.data import bounded_map, frame2thumb_gray, get_thumb_diff, imgs2video
+from mlops.models.base import BaseModel
+from mlops.shapes.insts import Insts
+from mlops.visualize import draw_insts
+
+
+class VideoInferStatsType(TypedDict):
+    """
+    - `num_frames`: `int`, frames decoded and written
+    - `num_inferred`: `int`, frames the model ran on
+    - `num_skipped`: `int`, frames reusing the insts of an earlier frame
+    - `skip_ratio`: `float`, `num_skipped / num_frames`
+    - `elapsed`: `float`, seconds
+    - `fps`: `float`, frames per second through the whole pipeline
+    """
+    num_frames: int
+    num_inferred: int
+    num_skipped: int
+    skip_ratio: float
+    elapsed: float
+    fps: float
+
+
+_QUEUE_END = object()
+
+
+class _ProducerError:
+    def __init__(
+        self,
+        error: BaseException
+    ) -> None:
+        self.error = error
+
+
+def _prefetch(
+    items: Iterable[Any],
+    max_size: int,
+) -> Iterator[Any]:
+    """
+    Iterate `items` on a background thread, at most `max_size` items 
+    ahead of the consumer. Errors of the producer are raised here. Closing 
+    the returned generator stops and joins the producer, so resources it 
+    reads from can be released afterwards.
+    """
+    queue = Queue(max_size)
+    stop_event = Event()
+
+    def _put(item: Any) -> bool:
+        while not stop_event.is_set():
+            try:
+                queue.put(item, timeout = 0.1)
+                return True
+            except Full:
+                pass
+
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put(item):
+                    return
+        except BaseException as e:
+            _put(_ProducerError(e))
+        finally:
+            _put(_QUEUE_END)
+
+    producer = Thread(target = _produce, daemon = True)
+    producer.start()
+
+    try:
+        while True:
+            item = queue.get()
+
+            if item is _QUEUE_END:
+                return
+
+            if isinstance(item, _ProducerError):
+                raise item.error
+
+            yield item
+    finally:
+        stop_event.set()
+        producer.join()
+
+def _iter_queue(
+    queue: Queue,
+) -> Iterator[Any]:
+    while True:
+        item = queue.get()
+
+        if item is _QUEUE_END:
+            return
+
+        yield item
+
+def _put_until_done(
+    queue: Queue,
+    item: Any,
+    future: Future,
+) -> None:
+    """
+    `queue.put` that gives up when the consumer `future` ended, raising 
+    its error instead of blocking forever on a full queue
+    """
+    while True:
+        try:
+            queue.put(item, timeout = 0.1)
+            return
+        except Full:
+            if future.done():
+                future.result()
+                raise RuntimeError("consumer of the queue stopped early")
+
+def _decode_video(
+    cap: cv2.VideoCapture,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    frame_idx = 0
+
+    while True:
+        ret, frame = cap.read()
+
+        if not ret:
+            break
+
+        yield frame_idx, frame
+        frame_idx += 1
+
+def _gate_frames(
+    frames: Iterator[Tuple[int, np.ndarray]],
+    diff_thres: Optional[float],
+    max_skip_frames: int,
+    motion_flag: bool,
+    thumb_wh: Tuple[int, int],
+) -> Iterator[Tuple[int, np.ndarray, bool, Optional[Tuple[int, int]]]]:
+    """
+    Mark the frames to infer, those whose `get_thumb_diff` to the last 
+    inferred frame exceeds `diff_thres`, or after `max_skip_frames` 
+    skipped frames. With `motion_flag`, skipped frames also get their 
+    global shift to the last inferred frame, from `cv2.phaseCorrelate` 
+    on the thumbs, in frame pixels.
+
+    Returns
+    -----
+    - `gated_frames`: `Iterator[Tuple[int, np.ndarray, bool, Optional[Tuple[int, int]]]]`, 
+    `(frame_idx, frame, infer_flag, shift_xy)`
+    """
+    key_thumb = None
+    num_skipped = 0
+
+    for frame_idx, frame in frames:
+        if diff_thres is None:
+            yield frame_idx, frame, True, None
+            continue
+
+        thumb = frame2thumb_gray(frame, thumb_wh)
+
+        if key_thumb is None or num_skipped >= max_skip_frames \
+            or get_thumb_diff(key_thumb, thumb) > diff_thres:
+            key_thumb = thumb
+            num_skipped = 0
+            yield frame_idx, frame, True, None
+            continue
+
+        num_skipped += 1
+        shift_xy = None
+
+        if motion_flag:
+            (dx, dy), _ = cv2.phaseCorrelate(key_thumb, thumb)
+            frame_h, frame_w = frame.shape[:2]
+            shift_xy = (
+                int(round(dx * frame_w / thumb_wh[0])), 
+                int(round(dy * frame_h / thumb_wh[1]))
+            )
+
+        yield frame_idx, frame, False, shift_xy
+
+def _shift_insts(
+    insts: Insts,
+    shift_xy: Tuple[int, int],
+    img_hw: Tuple[int, int],
+) -> Insts:
+    """
+    Move `insts` by `shift_xy` pixels, clipped to the img, insts moved 
+    fully out of it are dropped
+    """
+    dx, dy = shift_xy
+
+    if len(insts) == 0 or (dx == 0 and dy == 0):
+        return insts
+
+    img_h, img_w = img_hw
+    bboxes = insts.bboxes + np.asarray([dx, dy, dx, dy], dtype = np.int32)
+    bboxes[:, [0, 2]] = np.clip(bboxes[:, [0, 2]], 0, img_w)
+    bboxes[:, [1, 3]] = np.clip(bboxes[:, [1, 3]], 0, img_h)
+
+    masks = None
+
+    if insts.masks is not None and (abs(dx) >= img_w or abs(dy) >= img_h):
+        masks = np.zeros_like(insts.masks)
+    elif insts.masks is not None:
+        # Shift by copying the overlapping window, uncovered pixels stay 0
+        masks = np.zeros_like(insts.masks)
+        src_ys = slice(max(0, -dy), min(img_h, img_h - dy))
+        src_xs = slice(max(0, -dx), min(img_w, img_w - dx))
+        dst_ys = slice(max(0, dy), min(img_h, img_h + dy))
+        dst_xs = slice(max(0, dx), min(img_w, img_w + dx))
+        masks[:, dst_ys, dst_xs] = insts.masks[:, src_ys, src_xs]
+
+    shifted_insts = Insts(insts.confs, insts.cat_ids, bboxes, masks)
+    keep_idxs = np.nonzero(
+        (bboxes[:, 2] > bboxes[:, 0]) & (bboxes[:, 3] > bboxes[:, 1])
+    )[0]
+
+    return shifted_insts[keep_idxs]
+
+def _draw_frame(
+    task: Tuple[np.ndarray, Insts, Dict[int, str]]
+) -> np.ndarray:
+    frame, insts, cat_id_name_dict = task
+
+    cat_names = np.asarray([
+        cat_id_name_dict.get(c, str(c)) for c in insts.cat_ids.tolist()
+    ])
+    frame = draw_insts(
+        frame, insts.confs, cat_names, insts.bboxes, insts.masks, "default", "default"
+    )
+
+    return frame
+
+def _iter_batches(
+    items: Iterator[Any],
+    batch_size: int,
+) -> Iterator[List[Any]]:
+    batch = []
+
+    for item in items:
+        batch.append(item)
+
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+def infer_video(
+    video_p: str,
+    output_video: str,
+    model: BaseModel,
+    cat_id_name_dict: Dict[int, str],
+    batch_size: int = 8,
+    queue_size: int = 32,
+    num_drawers: int = 2,
+    fps: Optional[float] = None,
+    codec: str = "mp4v",
+    diff_thres: Optional[float] = None,
+    max_skip_frames: int = 30,
+    motion_flag: bool = False,
+    thumb_wh: Tuple[int, int] = (64, 64),
+) -> VideoInferStatsType:
+    """
+    Run `model` on every frame of `video_p` and encode the frames with the 
+    drawn predictions into `output_video`, without writing frames to disk. 
+    A thread decodes frames into a bounded queue, the calling thread runs 
+    `model.infer_batch` on batches of them, and a writer thread draws, 
+    with `num_drawers` threads, and encodes with `imgs2video`, so decoding, 
+    inference and encoding overlap.
+
+    With `diff_thres`, the model only runs on frames whose thumb differs 
+    from the last inferred one by more than it, see `get_thumb_diff`, or 
+    after `max_skip_frames` skipped frames. Other frames reuse the last 
+    insts, shifted by the global motion estimate if `motion_flag`. This 
+    suits static cameras, where most frames barely change.
+
+    Args
+    -----
+    - `video_p`: `str`
+    - `output_video`: `str`
+    - `model`: `BaseModel`
+    - `cat_id_name_dict`: `Dict[int, str]`, ids are drawn for classes not in it
+    - `batch_size`: `int`, frames per `infer_batch` call
+    - `queue_size`: `int`, max frames waiting between two stages
+    - `num_drawers`: `int`, threads drawing predictions
+    - `fps`: `Optional[float]`, of the output, defaults to that of `video_p`
+    - `codec`: `str`
+    - `diff_thres`: `Optional[float]`, `0 ~ 255`, `None` infers every frame
+    - `max_skip_frames`: `int`, max consecutive skipped frames
+    - `motion_flag`: `bool`, shift reused insts by the global motion
+    - `thumb_wh`: `Tuple[int, int]`, of the thumbs frames are compared on
+
+    Returns
+    -----
+    - `stats`: `VideoInferStatsType`
+    """
+    assert batch_size >= 1
+
+    cap = cv2.VideoCapture(video_p)
+
+    if not cap.isOpened():
+        raise RuntimeError(f"can not open video '{video_p}'")
+
+    if fps is None:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    print(f"video info: {fps:.2f}fps, total {total_frames} frames")
+
+    write_queue = Queue(queue_size)
+    num_frames = 0
+    num_inferred = 0
+    start = time.time()
+
+    try:
+        with ThreadPoolExecutor(1) as write_executor:
+            draw_tasks = _iter_queue(write_queue)
+            write_future = write_executor.submit(
+                imgs2video, bounded_map(_draw_frame, draw_tasks, num_drawers), 
+                output_video, fps, codec
+            )
+
+            frames = _prefetch(_gate_frames(
+                _decode_video(cap), diff_thres, max_skip_frames, motion_flag, thumb_wh
+            ), queue_size)
+            insts = None
+
+            try:
+                for batch in _iter_batches(frames, batch_size):
+                    infer_frames = [frame for _, frame, infer_flag, _ in batch if infer_flag]
+                    batch_insts = iter(model.infer_batch(infer_frames)) \
+                        if len(infer_frames) > 0 else iter([])
+
+                    for _, frame, infer_flag, shift_xy in batch:
+                        if infer_flag:
+                            insts = next(batch_insts)
+                            frame_insts = insts
+                        elif shift_xy is not None:
+                            frame_insts = _shift_insts(insts, shift_xy, frame.shape[:2])
+                        else:
+                            frame_insts = insts
+
+                        _put_until_done(
+                            write_queue, (frame, frame_insts, cat_id_name_dict), write_future
+                        )
+
+                    num_frames += len(batch)
+                    num_inferred += len(infer_frames)
+
+                    if num_frames // 100 > (num_frames - len(batch)) // 100:
+                        elapsed = time.time() - start
+                        print(
+                            f"processed {num_frames}/{total_frames} frames, "
+                            f"inferred {num_inferred}, {num_frames / elapsed:.2f} fps"
+                        )
+            finally:
+                frames.close()
+                _put_until_done(write_queue, _QUEUE_END, write_future)
+
+            write_future.result()
+    finally:
+        cap.release()
+
+    elapsed = time.time() - start
+    num_skipped = num_frames - num_inferred
+    stats: VideoInferStatsType = {
+        "num_frames": num_frames,
+        "num_inferred": num_inferred,
+        "num_skipped": num_skipped,
+        "skip_ratio": num_skipped / max(num_frames, 1),
+        "elapsed": elapsed,
+        "fps": num_frames / max(elapsed, 1e-9),
+    }
+    print(
+        f"complete, {num_frames} frames in {elapsed:.2f}s, {stats['fps']:.2f} fps, "
+        f"skipped {num_skipped} ({stats['skip_ratio']:.1%})"
+    )
+
+    return stats
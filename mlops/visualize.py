@@ -1,7 +1,21 @@
-from typing import Tuple, List, Union, Optional, Literal
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Tuple, List, Union, Optional, Literal, Iterator, Dict, Iterable, Any
 
 import cv2
 import numpy as np
+import pycocotools.mask as pycocomask
+
+import mlops.shapes.typedef.masks as mask_type
+import mlops.shapes.typedef.rles as rle_type
+from mlops.labels.typedef.labelme import LabelmeDictType
+from mlops.labels.utils.labelme import get_file_stamp, img_labelme_p_generator
+from mlops.shapes.convert.rle2mask import rle2mask_crop
+from mlops.shapes.insts import json_dict2rle_insts
 
 
 TXT_DEFAULT_SIZE = 0.5
@@ -21,6 +35,8 @@ BBOX_DEFAULT_COLORS = [
     (66, 200, 237),
     (237, 66, 92)
 ]
+MASK_DEFAULT_ALPHA = 0.3
+GT_DEFAULT_COLOR = (0, 255, 0)
 
 
 def draw_scores(
@@ -136,44 +152,115 @@ def draw_polys(
 
     return img
 
+def _iter_mask_crops(
+    masks: Union[mask_type.MasksType, rle_type.RLEsType, List[np.ndarray]],
+    img_hw: Tuple[int, int],
+    bboxes: Optional[np.ndarray],
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    `(x1, y1, crop)` of each mask, `crop` is the `bool` mask inside its 
+    bbox clipped to the img. Full-size masks are cropped to the rows and 
+    cols they cover, rles to `toBbox`, other masks are crops at `bboxes`.
+    Empty masks yield empty crops so that colors stay aligned.
+    """
+    img_h, img_w = img_hw
+
+    for i, mask in enumerate(masks):
+        if isinstance(mask, dict):
+            x, y, w, h = pycocomask.toBbox(mask).tolist()
+            x1, y1 = int(x), int(y)
+            crop = rle2mask_crop(mask, (x1, y1, int(np.ceil(x + w)), int(np.ceil(y + h))))
+        elif mask.shape[:2] == (img_h, img_w):
+            row_flags = mask.any(axis = 1)
+            col_flags = mask.any(axis = 0)
+            if not row_flags.any():
+                yield 0, 0, np.zeros((0, 0), dtype = np.bool_)
+                continue
+
+            y1 = int(np.argmax(row_flags))
+            x1 = int(np.argmax(col_flags))
+            y2 = img_h - int(np.argmax(row_flags[::-1]))
+            x2 = img_w - int(np.argmax(col_flags[::-1]))
+            crop = mask[y1:y2, x1:x2]
+        else:
+            assert bboxes is not None, "masks not of img size need their bboxes"
+            x1, y1 = np.floor(bboxes[i][:2]).astype(np.int64).tolist()
+            crop = mask
+
+        x1_clip, y1_clip = max(x1, 0), max(y1, 0)
+        x2_clip = min(x1 + crop.shape[1], img_w)
+        y2_clip = min(y1 + crop.shape[0], img_h)
+        crop = crop[y1_clip - y1:max(y2_clip - y1, 0), x1_clip - x1:max(x2_clip - x1, 0)]
+
+        yield x1_clip, y1_clip, crop.astype(np.bool_)
+
 def draw_masks(
     img: np.ndarray,
-    masks: np.ndarray,
-    mask_color: np.ndarray = None
+    masks: Union[mask_type.MasksType, rle_type.RLEsType, List[np.ndarray]],
+    mask_color: Union[Tuple[int, int, int], Literal["default"], None] = None,
+    bboxes: Optional[np.ndarray] = None,
+    mask_alpha: float = MASK_DEFAULT_ALPHA,
 ) -> np.ndarray:
     """
+    Paint all masks into one color layer inside their bboxes and blend it 
+    into the img once, so each pixel takes `mask_alpha` of the last mask 
+    covering it and the cost does not grow with full-img passes per mask.
+
     Args
     -----
     - `img`: `np.ndarray`, `(img_h, img_w, 3)`
-    - `masks`: `np.ndarray`, `(num_masks, img_h, img_w)`
-    - `mask_color`: `Tuple[int, int, int]`, BGR color code
+    - `masks`: `(num_masks, img_h, img_w)`, or `RLEsType`, or with 
+    `bboxes`, masks cropped to their bboxes, `[(bbox_h, bbox_w), ...]`
+    - `mask_color`: `Union[Tuple[int, int, int], Literal["default"], None]`, 
+    BGR color code, the default colors if `"default"` or `None`
+    - `bboxes`: `Optional[np.ndarray]`, `(num_masks, 4)`, x1y1x2y2, where 
+    the cropped masks sit
+    - `mask_alpha`: `float`
 
     Returns
     -------
     - `img_with_masks`: `np.ndarray`, `(img_h, img_w, 3)`
     """
-    if isinstance(mask_color, str) and mask_color == "default":
+    if len(masks) == 0:
+        return img
+
+    if mask_color is None or (isinstance(mask_color, str) and mask_color == "default"):
         mask_colors = BBOX_DEFAULT_COLORS * (len(masks) // len(BBOX_DEFAULT_COLORS) + 1)
         mask_colors = mask_colors[:len(masks)]
     else:
         mask_colors = [mask_color] * len(masks)
 
-    for mask, mask_color in zip(masks, mask_colors):
-        mask_color = np.array(mask_color, dtype='uint8')
-        masked_img = np.where(mask[..., None], mask_color, img)
-        img = cv2.addWeighted(img, 0.7, masked_img, 0.3, 0)
+    color_img = np.copy(img)
+    cover_flags = np.zeros(img.shape[:2], dtype = np.bool_)
 
-    return img
+    for (x1, y1, crop), mask_color in zip(
+        _iter_mask_crops(masks, img.shape[:2], bboxes), mask_colors
+    ):
+        y2, x2 = y1 + crop.shape[0], x1 + crop.shape[1]
+        color_img[y1:y2, x1:x2][crop] = mask_color
+        cover_flags[y1:y2, x1:x2] |= crop
+
+    if not cover_flags.any():
+        return color_img
+
+    color_img[cover_flags] = cv2.addWeighted(
+        img[cover_flags], 1 - mask_alpha, color_img[cover_flags], mask_alpha, 0
+    )
+
+    return color_img
 
 def draw_insts(
     img: np.ndarray,
     scores: np.ndarray,
     cat_names: np.ndarray,
     bboxes: np.ndarray,
-    masks: Optional[np.ndarray],
+    masks: Optional[Union[mask_type.MasksType, rle_type.RLEsType, List[np.ndarray]]],
     bbox_color: Union[Tuple[int, int, int], Literal["default"]],
     mask_color: Union[Tuple[int, int, int], Literal["default"]]
 ) -> np.ndarray:
+    """
+    `masks` can be full-size, rles, or cropped to `bboxes`, see `draw_masks`
+    """
     if len(scores) == 0:
         return img
     
@@ -183,6 +270,450 @@ def draw_insts(
     img = draw_bboxes(img, bboxes, bbox_color)
 
     if masks is not None:
-        img = draw_masks(img, masks, mask_color)
+        img = draw_masks(img, masks, mask_color, bboxes)
         
-    return img
\ No newline at end of file
+    return img
+
+def draw_labelme_shapes(
+    img: np.ndarray,
+    labelme_dict: LabelmeDictType,
+    shape_color: Tuple[int, int, int] = GT_DEFAULT_COLOR,
+    scale: float = 1.0,
+) -> np.ndarray:
+    """
+    Draw the rectangles of a labelme as bboxes and the other shapes as 
+    polys, at `scale` of the labelme coordinates.
+
+    Args
+    -----
+    - `img`: `np.ndarray`, `(img_h, img_w, 3)`
+    - `labelme_dict`: `LabelmeDictType`
+    - `shape_color`: `Tuple[int, int, int]`, BGR color code
+    - `scale`: `float`, `img` size over the labelme img size
+
+    Returns
+    -------
+    - `img_with_shapes`: `np.ndarray`, `(img_h, img_w, 3)`
+    """
+    polys = [
+        (np.asarray(s["points"], dtype = np.float64) * scale).astype(np.int32) 
+        for s in labelme_dict["shapes"] if s["shape_type"] != "rectangle"
+    ]
+    bboxes = np.asarray([
+        (np.asarray(s["points"], dtype = np.float64) * scale).astype(np.int32).flatten() 
+        for s in labelme_dict["shapes"] if s["shape_type"] == "rectangle"
+    ], dtype = np.int32).reshape(-1, 4)
+
+    img = draw_polys(img, polys, shape_color)
+    img = draw_bboxes(img, bboxes, shape_color)
+
+    return img
+
+def _rles2scaled_crops(
+    rles: rle_type.RLEsType,
+    scale: float,
+) -> Tuple[List[np.ndarray], np.ndarray]:
+    """
+    Masks of `rles` cropped to their bboxes and resized by `scale`, with 
+    the scaled bboxes they sit at, for `draw_masks`
+    """
+    crops = []
+    crop_bboxes = []
+
+    for rle in rles:
+        x, y, w, h = pycocomask.toBbox(rle).tolist()
+        x1, y1, x2, y2 = int(x), int(y), int(np.ceil(x + w)), int(np.ceil(y + h))
+        crop = rle2mask_crop(rle, (x1, y1, x2, y2))
+        x1, y1 = int(x1 * scale), int(y1 * scale)
+        x2 = max(x1 + 1, int(round(x2 * scale)))
+        y2 = max(y1 + 1, int(round(y2 * scale)))
+
+        if crop.size == 0:
+            crop = np.zeros((0, 0), dtype = np.bool_)
+        elif scale != 1.0:
+            crop = cv2.resize(
+                crop.astype(np.uint8), (x2 - x1, y2 - y1), 
+                interpolation = cv2.INTER_NEAREST
+            ).astype(np.bool_)
+
+        crops.append(crop)
+        crop_bboxes.append((x1, y1, x2, y2))
+
+    return crops, np.asarray(crop_bboxes, dtype = np.int32).reshape(-1, 4)
+
+def _render_dataset_img(
+    task: Tuple[str, str, Optional[str], str, Dict[int, str], float, int]
+) -> bool:
+    img_p, labelme_p, pred_p, export_p, cat_id_name_dict, scale, jpeg_quality = task
+
+    img = cv2.imread(img_p)
+
+    if img is None:
+        print(f"can not read img '{img_p}', skipped")
+        return False
+
+    if scale != 1.0:
+        img_h, img_w = img.shape[:2]
+        img = cv2.resize(
+            img, (max(1, round(img_w * scale)), max(1, round(img_h * scale))), 
+            interpolation = cv2.INTER_AREA
+        )
+
+    if pred_p is not None and os.path.exists(pred_p):
+        with open(pred_p, "r") as f:
+            pred_insts = json_dict2rle_insts(json.load(f))
+
+        if pred_insts["rles"] is not None:
+            crops, crop_bboxes = _rles2scaled_crops(pred_insts["rles"], scale)
+            img = draw_masks(img, crops, "default", crop_bboxes)
+
+        cat_names = np.asarray([
+            cat_id_name_dict.get(c, str(c)) for c in pred_insts["cat_ids"].tolist()
+        ])
+        bboxes = (pred_insts["bboxes"] * scale).astype(np.int32)
+        img = draw_insts(
+            img, pred_insts["confs"], cat_names, bboxes, None, "default", "default"
+        )
+
+    if os.path.exists(labelme_p):
+        with open(labelme_p, "r") as f:
+            labelme_dict = json.load(f)
+
+        img = draw_labelme_shapes(img, labelme_dict, GT_DEFAULT_COLOR, scale)
+
+    cv2.imwrite(export_p, img, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+
+    return True
+
+def visualize_dataset(
+    dataset_root: str,
+    export_root: str,
+    pred_cache_root: Optional[str] = None,
+    cat_id_name_dict: Optional[Dict[int, str]] = None,
+    img_names: Optional[Iterable[str]] = None,
+    scale: float = 1.0,
+    jpeg_quality: int = 90,
+    num_workers: int = 4,
+) -> int:
+    """
+    Render the labelme gts (green) and, with `pred_cache_root`, the cached 
+    predictions of every img under `dataset_root` into 
+    `{export_root}/{img_stem}.jpg`, in a process pool.
+
+    Args
+    -----
+    - `dataset_root`: `str`, imgs and their labelmes side by side
+    - `export_root`: `str`
+    - `pred_cache_root`: `Optional[str]`, `{img_stem}.json` rle insts, as 
+    written by the eval with `export_pred_cache_root`
+    - `cat_id_name_dict`: `Optional[Dict[int, str]]`, names of the 
+    predicted classes, ids are drawn if `None`
+    - `img_names`: `Optional[Iterable[str]]`, names or stems of the only 
+    imgs to render, e.g. the failing imgs from `mlops.eval.get_failing_img_names`
+    - `scale`: `float`, downscale the output, shapes are drawn at that scale
+    - `jpeg_quality`: `int`, 0 ~ 100
+    - `num_workers`: `int`
+
+    Returns
+    -----
+    - `num_rendered`: `int`
+    """
+    assert 0 < scale <= 1
+
+    os.makedirs(export_root, exist_ok = True)
+
+    if cat_id_name_dict is None:
+        cat_id_name_dict = {}
+
+    if img_names is not None:
+        img_names = set(img_names)
+
+    tasks = []
+
+    for img_p, labelme_p in img_labelme_p_generator(dataset_root, dataset_root):
+        img_name = os.path.basename(img_p)
+        img_stem = Path(img_name).stem
+
+        if img_names is not None and img_name not in img_names and img_stem not in img_names:
+            continue
+
+        pred_p = None if pred_cache_root is None \
+            else os.path.join(pred_cache_root, f"{img_stem}.json")
+        export_p = os.path.join(export_root, f"{img_stem}.jpg")
+        tasks.append((
+            img_p, labelme_p, pred_p, export_p, cat_id_name_dict, scale, jpeg_quality
+        ))
+
+    num_rendered = 0
+    start = time.time()
+
+    with ProcessPoolExecutor(max(1, num_workers)) as executor:
+        for i, rendered_flag in enumerate(executor.map(_render_dataset_img, tasks, chunksize = 8)):
+            num_rendered += int(rendered_flag)
+
+            if (i + 1) % 100 == 0:
+                elapsed = time.time() - start
+                print(f"rendered {i + 1}/{len(tasks)} imgs, {(i + 1) / elapsed:.2f} imgs/s")
+
+    elapsed = time.time() - start
+    print(
+        f"complete, {num_rendered} imgs rendered in {elapsed:.2f}s, "
+        f"{len(tasks) - num_rendered} unreadable skipped, saved at {export_root}"
+    )
+
+    return num_rendered
+
+
+def _render_thumb(
+    task: Tuple[str, str, str, Tuple[int, int], int]
+) -> bool:
+    img_p, labelme_p, thumb_p, tile_hw, jpeg_quality = task
+    tile_h, tile_w = tile_hw
+
+    labelme_dict = None
+    img_hw = None
+
+    if os.path.exists(labelme_p):
+        with open(labelme_p, "r") as f:
+            labelme_dict = json.load(f)
+
+        img_hw = (labelme_dict["imageHeight"], labelme_dict["imageWidth"])
+
+    # The labelme knows the img size before decoding, so the decoder can 
+    # skip to the largest reduction that still covers the thumbnail
+    imread_flag = cv2.IMREAD_COLOR
+
+    if img_hw is not None:
+        inv_scale = max(img_hw[0] / tile_h, img_hw[1] / tile_w)
+
+        for factor, flag in [
+            (8, cv2.IMREAD_REDUCED_COLOR_8), 
+            (4, cv2.IMREAD_REDUCED_COLOR_4), 
+            (2, cv2.IMREAD_REDUCED_COLOR_2)
+        ]:
+            if factor <= inv_scale:
+                imread_flag = flag
+                break
+
+    img = cv2.imread(img_p, imread_flag)
+
+    if img is None:
+        print(f"can not read img '{img_p}', thumbnail skipped")
+
+        if os.path.exists(thumb_p):
+            os.remove(thumb_p)
+
+        return False
+
+    if img_hw is None:
+        img_hw = img.shape[:2]
+
+    scale = min(tile_h / img_hw[0], tile_w / img_hw[1])
+    thumb_wh = (max(1, round(img_hw[1] * scale)), max(1, round(img_hw[0] * scale)))
+    thumb = cv2.resize(img, thumb_wh, interpolation = cv2.INTER_AREA)
+
+    if labelme_dict is not None:
+        thumb = draw_labelme_shapes(thumb, labelme_dict, GT_DEFAULT_COLOR, scale)
+
+    cv2.imwrite(thumb_p, thumb, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+
+    return True
+
+def make_gallery(
+    dataset_root: str,
+    export_root: str,
+    tile_hw: Tuple[int, int] = (180, 240),
+    grid_hw: Tuple[int, int] = (6, 8),
+    jpeg_quality: int = 90,
+    num_workers: int = 4,
+) -> Dict[str, Any]:
+    """
+    Contact sheets of the imgs under `dataset_root` with their labelme 
+    shapes. Imgs are decoded at reduced resolution, drawn at thumbnail 
+    scale and tiled row by row into `{export_root}/page_{idx:04d}.jpg`. 
+    Thumbnails are cached in `{export_root}/thumbs` by the size and mtime 
+    of the img and its labelme, so after label edits only the changed imgs 
+    are redrawn.
+
+    Args
+    -----
+    - `dataset_root`: `str`, imgs and their labelmes side by side
+    - `export_root`: `str`
+    - `tile_hw`: `Tuple[int, int]`, each thumbnail fits in a tile
+    - `grid_hw`: `Tuple[int, int]`, tile rows and cols of a page
+    - `jpeg_quality`: `int`, of the thumbnails and pages
+    - `num_workers`: `int`, processes drawing thumbnails
+
+    Returns
+    -----
+    - `index`: `Dict[str, Any]`, also saved as `{export_root}/index.json`, 
+    `{"tile_hw", "grid_hw", "pages": [{"page_name", "tiles": [{"img_p", 
+    "labelme_p", "row", "col", "bbox"}]}]}`, `bbox` x1y1x2y2 of the 
+    thumbnail in the page, `None` for imgs that can not be read
+    """
+    tile_h, tile_w = tile_hw
+    num_rows, num_cols = grid_hw
+    thumb_root = os.path.join(export_root, "thumbs")
+    thumb_cache_p = os.path.join(thumb_root, "cache.json")
+    os.makedirs(thumb_root, exist_ok = True)
+
+    thumb_config = {"tile_hw": list(tile_hw), "jpeg_quality": jpeg_quality}
+    old_entries = {}
+
+    if os.path.exists(thumb_cache_p):
+        with open(thumb_cache_p, "r") as f:
+            thumb_cache = json.load(f)
+
+        if thumb_cache["config"] == thumb_config:
+            old_entries = thumb_cache["imgs"]
+
+    p_pairs = list(img_labelme_p_generator(dataset_root, dataset_root))
+    new_entries = {}
+    render_tasks = []
+    start = time.time()
+
+    for img_p, labelme_p in p_pairs:
+        img_name = os.path.basename(img_p)
+        thumb_p = os.path.join(thumb_root, f"{Path(img_name).stem}.jpg")
+        entry = {
+            "img_stamp": get_file_stamp(img_p),
+            "labelme_stamp": get_file_stamp(labelme_p),
+        }
+        new_entries[img_name] = entry
+
+        if old_entries.get(img_name) != entry or not os.path.exists(thumb_p):
+            render_tasks.append((img_p, labelme_p, thumb_p, tuple(tile_hw), jpeg_quality))
+
+    if len(render_tasks) > 0:
+        with ProcessPoolExecutor(max(1, num_workers)) as executor:
+            rendered_flags = executor.map(_render_thumb, render_tasks, chunksize = 16)
+
+            # Unreadable imgs stay out of the cache, so they are retried
+            for task, rendered_flag in zip(render_tasks, rendered_flags):
+                if not rendered_flag:
+                    new_entries.pop(os.path.basename(task[0]))
+
+    with open(thumb_cache_p, "w") as f:
+        json.dump({"config": thumb_config, "imgs": new_entries}, f)
+
+    num_tiles_per_page = num_rows * num_cols
+    num_pages = (len(p_pairs) + num_tiles_per_page - 1) // num_tiles_per_page
+    index = {"tile_hw": list(tile_hw), "grid_hw": list(grid_hw), "pages": []}
+    num_empty_tiles = 0
+
+    for page_idx in range(num_pages):
+        page = np.zeros((num_rows * tile_h, num_cols * tile_w, 3), dtype = np.uint8)
+        page_name = f"page_{page_idx:04d}.jpg"
+        page_p_pairs = p_pairs[page_idx * num_tiles_per_page:(page_idx + 1) * num_tiles_per_page]
+        tiles = []
+
+        for tile_idx, (img_p, labelme_p) in enumerate(page_p_pairs):
+            row, col = divmod(tile_idx, num_cols)
+            img_stem = Path(img_p).stem
+            thumb_p = os.path.join(thumb_root, f"{img_stem}.jpg")
+            thumb = cv2.imread(thumb_p) if os.path.exists(thumb_p) else None
+
+            if thumb is None:
+                # Unreadable img, or thumbnail removed since it was drawn
+                num_empty_tiles += 1
+                bbox = None
+            else:
+                # Centered in the tile
+                thumb_h, thumb_w = thumb.shape[:2]
+                x1 = col * tile_w + (tile_w - thumb_w) // 2
+                y1 = row * tile_h + (tile_h - thumb_h) // 2
+                page[y1:y1 + thumb_h, x1:x1 + thumb_w] = thumb
+                bbox = [x1, y1, x1 + thumb_w, y1 + thumb_h]
+
+            page = cv2.putText(
+                page, img_stem, (col * tile_w + 4, (row + 1) * tile_h - 6), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.4, TXT_DEFAULT_COLOR, 1, cv2.LINE_AA
+            )
+
+            tiles.append({
+                "img_p": img_p,
+                "labelme_p": labelme_p,
+                "row": row,
+                "col": col,
+                "bbox": bbox,
+            })
+
+        cv2.imwrite(
+            os.path.join(export_root, page_name), page, 
+            [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        )
+        index["pages"].append({"page_name": page_name, "tiles": tiles})
+
+    # Pages left over from a larger dataset
+    for filename in os.listdir(export_root):
+        page_idx_str = Path(filename).stem[len("page_"):]
+
+        if filename.startswith("page_") and filename.endswith(".jpg") \
+            and page_idx_str.isdigit() and int(page_idx_str) >= num_pages:
+            os.remove(os.path.join(export_root, filename))
+
+    with open(os.path.join(export_root, "index.json"), "w") as f:
+        json.dump(index, f, indent = 2)
+
+    elapsed = time.time() - start
+    print(
+        f"complete, {len(p_pairs)} imgs in {num_pages} pages, "
+        f"{len(render_tasks)} thumbnails redrawn, {num_empty_tiles} tiles empty, "
+        f"in {elapsed:.2f}s"
+    )
+
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest = "command", required = True)
+
+    dataset_parser = subparsers.add_parser("dataset")
+    dataset_parser.add_argument("--dataset-root", type = str, required = True)
+    dataset_parser.add_argument("--export-root", type = str, required = True)
+    dataset_parser.add_argument("--pred-cache-root", type = str, default = None)
+    dataset_parser.add_argument("--cat-names", type = str, nargs = "+", default = None)
+    dataset_parser.add_argument("--img-names-p", type = str, default = None)
+    dataset_parser.add_argument("--scale", type = float, default = 1.0)
+    dataset_parser.add_argument("--jpeg-quality", type = int, default = 90)
+    dataset_parser.add_argument("--num-workers", type = int, default = 4)
+
+    gallery_parser = subparsers.add_parser("gallery")
+    gallery_parser.add_argument("--dataset-root", type = str, required = True)
+    gallery_parser.add_argument("--export-root", type = str, required = True)
+    gallery_parser.add_argument("--tile-hw", type = int, nargs = 2, default = [180, 240])
+    gallery_parser.add_argument("--grid-hw", type = int, nargs = 2, default = [6, 8])
+    gallery_parser.add_argument("--jpeg-quality", type = int, default = 90)
+    gallery_parser.add_argument("--num-workers", type = int, default = 4)
+
+    args = parser.parse_args()
+
+    if args.command == "gallery":
+        make_gallery(
+            args.dataset_root, args.export_root, tuple(args.tile_hw), 
+            tuple(args.grid_hw), args.jpeg_quality, args.num_workers
+        )
+        return
+
+    cat_id_name_dict = None
+
+    if args.cat_names is not None:
+        cat_id_name_dict = {i: cat_name for i, cat_name in enumerate(args.cat_names)}
+
+    # json list of img names, e.g. written by the eval with --export-failing-names-p
+    img_names = None
+
+    if args.img_names_p is not None:
+        with open(args.img_names_p, "r") as f:
+            img_names = json.load(f)
+
+    visualize_dataset(
+        args.dataset_root, args.export_root, args.pred_cache_root, 
+        cat_id_name_dict, img_names, args.scale, args.jpeg_quality, 
+        args.num_workers
+    )
+
+
+if __name__ == "__main__":
+    main()